@@ -611,6 +611,7 @@ from cupy.core import size  # NOQA
 # -----------------------------------------------------------------------------
 
 from cupy.util import clear_memo  # NOQA
+from cupy.util import get_memo_stats  # NOQA
 from cupy.util import memoize  # NOQA
 
 from cupy.core import ElementwiseKernel  # NOQA
@@ -1,10 +1,14 @@
 from __future__ import division
+import functools
+import hashlib
+import re
 import string
 import threading
 
 import numpy
 import six
 
+from cupy.cuda import autotune
 from cupy.cuda import compiler
 from cupy import util
 
@@ -27,16 +31,50 @@ from cupy.core cimport internal
 
 _thread_local = threading.local()
 
+# Maximum number of launch plans cached for each kernel. Zero disables the
+# launch plan cache.
+cdef Py_ssize_t _launch_plan_cache_size = 256
+
+
+cpdef Py_ssize_t _set_launch_plan_cache_size(Py_ssize_t size):
+    """Sets the number of launch plans cached for each kernel.
+
+    Returns the previous size. If ``size`` is zero, launch plans are not
+    cached and the arguments are preprocessed on every call.
+
+    """
+    global _launch_plan_cache_size
+    prev = _launch_plan_cache_size
+    _launch_plan_cache_size = size
+    return prev
+
+
+# Variants of elementwise kernels. Contiguous variants are used if all the
+# arrays are C-contiguous and have the shape of the indexer. They index the
+# arrays by flat pointers instead of the CIndexer arithmetic.
+_GENERIC = 0
+_CONTIGUOUS = 1
+_CONTIGUOUS_INT32 = 2
+
+# Maximum size for which contiguous variants use 32-bit indices. The index
+# plus the number of threads, which is at most the size plus the block
+# size, must fit in int.
+cdef Py_ssize_t _int32_index_max_size = (1 << 30) - 1024
+
+# Block sizes tried by the autotuner for elementwise kernels.
+_elementwise_block_sizes = (64, 128, 256, 512, 1024)
+
 
 cpdef _get_simple_elementwise_kernel(
         params, operation, name, preamble,
-        loop_prep='', after_loop='', options=()):
+        loop_prep='', after_loop='', options=(), int32_index=False,
+        set_index=True):
     module_code = string.Template('''
     ${preamble}
     extern "C" __global__ void ${name}(${params}) {
       ${loop_prep};
-      CUPY_FOR(i, _ind.size()) {
-        _ind.set(i);
+      ${loop}(i, _ind.size()) {
+        ${set_index}
         ${operation};
       }
       ${after_loop};
@@ -47,7 +85,9 @@ cpdef _get_simple_elementwise_kernel(
         name=name,
         preamble=preamble,
         loop_prep=loop_prep,
-        after_loop=after_loop)
+        after_loop=after_loop,
+        loop='CUPY_FOR_INT32' if int32_index else 'CUPY_FOR',
+        set_index='_ind.set(i);' if set_index else '')
     module = compile_with_cache(module_code, options)
     return module.get_function(name)
 
@@ -376,9 +416,195 @@ cdef list _get_out_args_with_params(
     return out_args
 
 
+cdef int _get_kernel_variant(tuple params, list inout_args) except -1:
+    cdef Indexer indexer = inout_args[-1]
+    cdef vector.vector[Py_ssize_t] shape = indexer.shape
+    cdef ParameterInfo p
+    cdef ndarray arr
+    cdef Py_ssize_t i
+    for i in range(len(inout_args) - 1):
+        p = params[i]
+        a = inout_args[i]
+        if p.raw or not isinstance(a, ndarray):
+            continue
+        arr = a
+        if not (internal.vector_equal(arr._shape, shape) and
+                internal.get_c_contiguity(
+                    arr._shape, arr._strides, arr.dtype.itemsize)):
+            return _GENERIC
+    if indexer.size <= _int32_index_max_size:
+        return _CONTIGUOUS_INT32
+    return _CONTIGUOUS
+
+
+_ind_pattern = re.compile(r'\b_ind\b')
+
+
+cdef bint _needs_index(int variant, tuple params, codes) except *:
+    # Returns True if the kernel must set the indexer for each element, i.e.,
+    # if the arrays are indexed by the indexer, or if the code may use it.
+    cdef ParameterInfo p
+    if variant == _GENERIC:
+        return True
+    for p in params:
+        if p.raw:
+            return True
+    for code in codes:
+        if code and _ind_pattern.search(code):
+            return True
+    return False
+
+
+cdef str _get_element_ref(str name, int variant):
+    if variant == _GENERIC:
+        return '_raw_%s[_ind.get()]' % name
+    return '_raw_%s.data()[i]' % name
+
+
+cdef class _LaunchPlan:
+
+    """Launch configuration derived from the layout of the arguments.
+
+    A plan holds everything determined by the dtypes, shapes and strides of
+    the arguments: the types, the output shape, the reduced shapes and
+    strides of the arrays, the indexer, the kernel variant and the kernel.
+    Calls whose arguments have the same layout reuse the plan and skip
+    broadcasting, type resolution and dimension reduction.
+
+    """
+
+    cdef:
+        readonly tuple in_types
+        readonly tuple out_types
+        readonly tuple out_shape
+        readonly object routine
+        readonly tuple types
+        readonly tuple args_info
+        readonly Indexer indexer
+        readonly int variant
+        public function.Function kernel
+        public Py_ssize_t block_size
+        vector.vector[Py_ssize_t] _view_indexes
+        vector.vector[vector.vector[Py_ssize_t]] _view_shapes
+        vector.vector[vector.vector[Py_ssize_t]] _view_strides
+
+    def __init__(self, tuple in_types, tuple out_types, tuple out_shape,
+                 routine, tuple types):
+        self.in_types = in_types
+        self.out_types = out_types
+        self.out_shape = out_shape
+        self.routine = routine
+        self.types = types
+
+    cdef _set_args(self, tuple params, list orig_args, list inout_args):
+        # Records the views made by broadcasting and dimension reduction,
+        # and the indexer appended to the arguments.
+        cdef Py_ssize_t i
+        cdef ndarray arr
+        for i in range(len(orig_args)):
+            a = inout_args[i]
+            if a is orig_args[i] or not isinstance(a, ndarray):
+                continue
+            arr = a
+            self._view_indexes.push_back(i)
+            self._view_shapes.push_back(arr._shape)
+            self._view_strides.push_back(arr._strides)
+        self.indexer = inout_args[-1]
+        self.args_info = _get_args_info(inout_args)
+        self.variant = _get_kernel_variant(params, inout_args)
+
+    cdef list _make_args(self, list args):
+        cdef Py_ssize_t i, j
+        cdef ndarray arr
+        for i in range(<Py_ssize_t>self._view_indexes.size()):
+            j = self._view_indexes[i]
+            arr = (<ndarray>args[j]).view()
+            # The view is only passed to the kernel, whose variant has been
+            # decided by the shapes and strides, so its contiguity flags are
+            # not updated.
+            arr._set_shape_and_strides(
+                self._view_shapes[i], self._view_strides[i], False, False)
+            args[j] = arr
+        args.append(self.indexer)
+        return args
+
+
+cdef tuple _get_launch_plan_key(list args, tuple options,
+                                bint use_min_scalar_type):
+    # Kinds of scalars are enough for ElementwiseKernel. Ufuncs also need
+    # the minimum scalar types, on which the value-based casting depends.
+    cdef ndarray arr
+    key = [device.get_device_id(), options]
+    for a in args:
+        if type(a) is ndarray:
+            arr = a
+            key.append(arr.dtype)
+            key.append(arr.shape)
+            key.append(arr.strides)
+        elif use_min_scalar_type:
+            key.append(type(a))
+            key.append(numpy.min_scalar_type(a))
+        else:
+            key.append(type(a))
+    return tuple(key)
+
+
+cdef _store_launch_plan(dict plans, key, _LaunchPlan plan):
+    if len(plans) >= _launch_plan_cache_size:
+        plans.clear()
+    plans[key] = plan
+
+
+cdef str _get_tuning_key(str kind, name, tuple args_info, tuple extra):
+    # The key is stable across processes so that it can be stored on disk.
+    digest = hashlib.md5(six.b(repr((args_info, extra)))).hexdigest()
+    return '%s:%s:%s' % (kind, name, digest)
+
+
+cdef list _get_tuning_args(list args, Py_ssize_t n_in, bint copy_out):
+    # Returns the arguments on which the kernel can be launched repeatedly
+    # by the autotuner. Output arrays that the kernel may read after writing
+    # are replaced with scratch copies: all of them if ``copy_out`` is
+    # ``True``, and otherwise those sharing memory with an input array. The
+    # input arrays are not written, so they are not copied.
+    cdef ndarray arr
+    in_mems = [(<ndarray>a).data.mem for a in args[:n_in]
+               if isinstance(a, ndarray)]
+    ret = list(args)
+    for i in range(n_in, len(args)):
+        a = args[i]
+        if isinstance(a, ndarray):
+            arr = a
+            if copy_out or arr.data.mem in in_mems:
+                ret[i] = arr.copy()
+    return ret
+
+
+def _run_elementwise(function.Function kern, Py_ssize_t size, list args,
+                     stream, tuple config):
+    kern.linear_launch(size, args, 0, config[0], stream)
+
+
+cdef Py_ssize_t _tune_elementwise_block_size(
+        _LaunchPlan plan, str key, list inout_args, Py_ssize_t n_in,
+        bint copy_out, stream) except -1:
+    # Returns the block size chosen by the autotuner, and also records it
+    # in the launch plan.
+    shape_class = autotune.get_shape_class(plan.indexer.size)
+    config = autotune.get_config(key, shape_class)
+    if config is None:
+        args = _get_tuning_args(inout_args, n_in, copy_out)
+        config = autotune.tune(
+            key, shape_class, [(b,) for b in _elementwise_block_sizes],
+            functools.partial(_run_elementwise, plan.kernel,
+                              plan.indexer.size, args, stream), stream)
+    plan.block_size = config[0]
+    return plan.block_size
+
+
 cdef function.Function _get_elementwise_kernel(
         tuple args_info, tuple types, tuple params, operation, name,
-        preamble, dict kwargs):
+        preamble, dict kwargs, int variant):
     kernel_params = _get_kernel_params(params, args_info)
     types_preamble = '\n'.join(
         'typedef %s %s;' % (_get_typename(v), k) for k, v in types)
@@ -388,15 +614,20 @@ cdef function.Function _get_elementwise_kernel(
     for p, a in zip(params, args_info):
         if not p.raw and a[0] == ndarray:
             if p.is_const:
-                fmt = 'const {t} &{n} = _raw_{n}[_ind.get()];'
+                fmt = 'const {t} &{n} = {ref};'
             else:
-                fmt = '{t} &{n} = _raw_{n}[_ind.get()];'
-            op.append(fmt.format(t=p.ctype, n=p.name))
+                fmt = '{t} &{n} = {ref};'
+            op.append(fmt.format(
+                t=p.ctype, n=p.name, ref=_get_element_ref(p.name, variant)))
+    set_index = _needs_index(
+        variant, params, (operation, kwargs.get('loop_prep'),
+                          kwargs.get('after_loop')))
     op.append(operation)
     operation = '\n'.join(op)
     return _get_simple_elementwise_kernel(
         kernel_params, operation, name,
-        preamble, **kwargs)
+        preamble, int32_index=variant == _CONTIGUOUS_INT32,
+        set_index=set_index, **kwargs)
 
 
 cdef class ElementwiseKernel:
@@ -455,6 +686,7 @@ cdef class ElementwiseKernel:
         readonly dict kwargs
         readonly dict _kernel_memo
         readonly dict _params_type_memo
+        dict _launch_plans
 
     def __init__(self, in_params, out_params, operation,
                  name='kernel', reduce_dims=True, preamble='',
@@ -479,6 +711,7 @@ cdef class ElementwiseKernel:
         self.kwargs = kwargs
         self._kernel_memo = {}
         self._params_type_memo = {}
+        self._launch_plans = {}
         names = [p.name for p in self.in_params + self.out_params]
         if 'i' in names:
             raise ValueError("Can not use 'i' as a parameter name")
@@ -506,11 +739,77 @@ cdef class ElementwiseKernel:
 
         """
         cdef function.Function kern
+        cdef _LaunchPlan plan
+        cdef Py_ssize_t block_size
+
+        stream = kwargs.pop('stream', None)
+        ret, inout_args, plan = self._prepare(args, kwargs)
+        if inout_args is None:
+            return ret
+        kern = plan.kernel
+        if kern is None:
+            kern = self._get_elementwise_kernel(
+                plan.args_info, plan.types, plan.variant)
+            plan.kernel = kern
+        block_size = plan.block_size
+        if block_size == 0:
+            block_size = 128
+            if autotune.is_enabled():
+                block_size = _tune_elementwise_block_size(
+                    plan, _get_tuning_key(
+                        'elementwise', self.name, plan.args_info,
+                        (self.operation, self.preamble, plan.types,
+                         plan.variant, sorted(self.kwargs.items()))),
+                    inout_args, self.nin, True, stream)
+        kern.linear_launch(plan.indexer.size, inout_args, shared_mem=0,
+                           block_max_size=block_size, stream=stream)
+        return ret
+
+    def precompile(self, *args, **kwargs):
+        """Compiles the kernel for the arguments in the background.
+
+        The kernel is compiled by the default
+        :class:`~cupy.cuda.compiler.CompileExecutor` but not invoked, so
+        that the following calls with arguments of the same dtypes and
+        dimensions do not wait for the compilation. The output arrays are
+        allocated if not given, as in :meth:`__call__`.
+
+        Args:
+            args: Arguments of the kernel.
+            size (int): Range size of the indices.
+
+        Returns:
+            cupy.cuda.compiler.CompileFuture: Future of the compiled kernel.
+            The result is ``None`` if the kernel is not needed for the
+            arguments, e.g., for empty arrays.
+
+        """
+        cdef _LaunchPlan plan
+
+        ret, inout_args, plan = self._prepare(args, kwargs)
+        future = compiler.CompileFuture()
+        if inout_args is None:
+            future.set_result(None)
+            return future
+        key = (device.get_device_id(), plan.args_info, plan.types,
+               plan.variant)
+        kern = self._kernel_memo.get(key)
+        if kern is not None:
+            future.set_result(kern)
+            return future
+        return compiler.get_compile_executor().submit(
+            self._get_elementwise_kernel, plan.args_info, plan.types,
+            plan.variant, key=(self, key))
+
+    cpdef tuple _prepare(self, args, dict kwargs):
+        # Returns the return value, the arguments of the kernel and the
+        # launch plan. The arguments are None if the kernel need not be
+        # invoked.
         cdef Py_ssize_t size
+        cdef _LaunchPlan plan = None
 
         size = -1
         size = kwargs.pop('size', -1)
-        stream = kwargs.pop('stream', None)
         if len(kwargs):
             raise TypeError('Wrong arguments %s' % kwargs)
 
@@ -519,6 +818,13 @@ cdef class ElementwiseKernel:
             raise TypeError('Wrong number of arguments for %s' % self.name)
         args = _preprocess_args(args, True)
 
+        key = None
+        if _launch_plan_cache_size > 0:
+            key = _get_launch_plan_key(args, (size,), False)
+            plan = self._launch_plans.get(key)
+            if plan is not None:
+                return self._prepare_from_plan(args, plan)
+
         values, shape = _broadcast(args, self.params, size != -1)
         in_args = values[:self.nin]
         out_args = args[self.nin:]
@@ -543,32 +849,49 @@ cdef class ElementwiseKernel:
 
         out_args = _get_out_args_with_params(
             out_args, out_types, shape, self.out_params, is_size_specified)
-        if self.no_return:
-            ret = None
-        elif not self.return_tuple and self.nout == 1:
-            ret = out_args[0]
-        else:
-            ret = tuple(out_args)
+        ret = self._get_return_value(out_args)
+        plan = _LaunchPlan(in_types, out_types, shape, None, types)
 
         if 0 in shape:
-            return ret
+            inout_args = None
+        else:
+            for i, x in enumerate(in_args):
+                if type(x) is _scalar.CScalar:
+                    (<_scalar.CScalar>x).apply_dtype(in_types[i])
 
-        for i, x in enumerate(in_args):
-            if type(x) is _scalar.CScalar:
-                (<_scalar.CScalar>x).apply_dtype(in_types[i])
+            inout_args = in_args + out_args
 
-        inout_args = in_args + out_args
+            if self.reduce_dims:
+                shape = _reduce_dims(inout_args, self.params, shape)
+            inout_args.append(Indexer(shape))
+            plan._set_args(
+                self.params, args[:self.nin] + out_args, inout_args)
 
-        if self.reduce_dims:
-            shape = _reduce_dims(inout_args, self.params, shape)
-        indexer = Indexer(shape)
-        inout_args.append(indexer)
+        if key is not None:
+            _store_launch_plan(self._launch_plans, key, plan)
+        return ret, inout_args, plan
 
-        args_info = _get_args_info(inout_args)
-        kern = self._get_elementwise_kernel(args_info, types)
-        kern.linear_launch(indexer.size, inout_args, shared_mem=0,
-                           block_max_size=128, stream=stream)
-        return ret
+    cdef tuple _prepare_from_plan(self, list args, _LaunchPlan plan):
+        in_args = args[:self.nin]
+        out_args = args[self.nin:]
+        if not out_args:
+            out_args = [ndarray(plan.out_shape, t) for t in plan.out_types]
+        ret = self._get_return_value(out_args)
+        if plan.indexer is None:
+            return ret, None, plan
+
+        for i, x in enumerate(in_args):
+            if type(x) is _scalar.CScalar:
+                (<_scalar.CScalar>x).apply_dtype(plan.in_types[i])
+        return ret, plan._make_args(in_args + out_args), plan
+
+    cdef _get_return_value(self, list out_args):
+        if self.no_return:
+            return None
+        elif not self.return_tuple and self.nout == 1:
+            return out_args[0]
+        else:
+            return tuple(out_args)
 
     cpdef tuple _decide_params_type(
             self, tuple in_args_dtype, tuple out_args_dtype):
@@ -581,14 +904,14 @@ cdef class ElementwiseKernel:
         return ret
 
     cpdef function.Function _get_elementwise_kernel(
-            self, tuple args_info, tuple types):
+            self, tuple args_info, tuple types, int variant=_GENERIC):
         id = device.get_device_id()
-        key = (id, args_info, types)
+        key = (id, args_info, types, variant)
         if key in self._kernel_memo:
             return self._kernel_memo[key]
         kern = _get_elementwise_kernel(
             args_info, types, self.params, self.operation,
-            self.name, self.preamble, self.kwargs)
+            self.name, self.preamble, self.kwargs, variant)
         self._kernel_memo[key] = kern
         return kern
 
@@ -596,7 +919,7 @@ cdef class ElementwiseKernel:
 @util.memoize(for_each_device=True)
 def _get_ufunc_kernel(
         in_types, out_types, routine, args_info, params, name, preamble,
-        loop_prep):
+        loop_prep, variant):
     kernel_params = _get_kernel_params(params, args_info)
 
     types = []
@@ -605,13 +928,14 @@ def _get_ufunc_kernel(
         types.append('typedef %s in%d_type;' % (_get_typename(x), i))
         if args_info[i][0] is ndarray:
             op.append(
-                'const in{0}_type in{0}(_raw_in{0}[_ind.get()]);'
-                .format(i))
+                'const in{0}_type in{0}({1});'
+                .format(i, _get_element_ref('in%d' % i, variant)))
 
     for i, x in enumerate(out_types):
         types.append('typedef %s out%d_type;' % (
             _get_typename(args_info[i + len(in_types)][1]), i))
-        op.append('out{0}_type &out{0} = _raw_out{0}[_ind.get()];'.format(i))
+        op.append('out{0}_type &out{0} = {1};'.format(
+            i, _get_element_ref('out%d' % i, variant)))
 
     op.append(routine)
     operation = '\n'.join(op)
@@ -619,8 +943,13 @@ def _get_ufunc_kernel(
     types.append(preamble)
     preamble = '\n'.join(types)
 
-    return _get_simple_elementwise_kernel(
-        kernel_params, operation, name, preamble, loop_prep=loop_prep)
+    signature = ('ufunc', name, [numpy.dtype(t).char for t in in_types],
+                 [numpy.dtype(t).char for t in out_types])
+    with compiler._kernel_signature(signature):
+        return _get_simple_elementwise_kernel(
+            kernel_params, operation, name, preamble, loop_prep=loop_prep,
+            int32_index=variant == _CONTIGUOUS_INT32,
+            set_index=_needs_index(variant, params, (routine, loop_prep)))
 
 
 cdef tuple _guess_routine_from_in_types(list ops, tuple in_types):
@@ -732,6 +1061,7 @@ class ufunc(object):
         self._params = _in_params + _out_params + (
             ParameterInfo('CIndexer _ind', False),)
         self._routine_cache = {}
+        self._launch_plans = {}
 
     def __repr__(self):
         return "<ufunc '%s'>" % self.name
@@ -770,6 +1100,37 @@ class ufunc(object):
             return _thread_local.history.call_ufunc(self, args, kwargs)
 
         cdef function.Function kern
+        cdef _LaunchPlan plan
+        cdef Py_ssize_t block_size
+
+        ret, inout_args, plan = self._prepare(args, kwargs)
+        if inout_args is None:
+            return ret
+        kern = plan.kernel
+        if kern is None:
+            kern = _get_ufunc_kernel(
+                plan.in_types, plan.out_types, plan.routine, plan.args_info,
+                self._params, self.name, self._preamble, self._loop_prep,
+                plan.variant)
+            plan.kernel = kern
+        block_size = plan.block_size
+        if block_size == 0:
+            block_size = 128
+            if autotune.is_enabled():
+                block_size = _tune_elementwise_block_size(
+                    plan, _get_tuning_key(
+                        'ufunc', self.name, plan.args_info,
+                        (plan.routine, self._preamble, self._loop_prep,
+                         plan.variant)),
+                    inout_args, self.nin, False, None)
+        kern.linear_launch(plan.indexer.size, inout_args, 0, block_size)
+        return ret
+
+    def _prepare(self, args, dict kwargs):
+        # Returns the return value, the arguments of the kernel and the
+        # launch plan. The arguments are None if the kernel need not be
+        # invoked.
+        cdef _LaunchPlan plan = None
 
         out = kwargs.pop('out', None)
         dtype = kwargs.pop('dtype', None)
@@ -799,6 +1160,14 @@ class ufunc(object):
             out_args = _preprocess_args((out,))
             args += out_args
 
+        key = None
+        if _launch_plan_cache_size > 0:
+            key = _get_launch_plan_key(args, (dtype, casting), True)
+            plan = self._launch_plans.get(key)
+            if plan is not None:
+                return _prepare_ufunc_from_plan(
+                    self.nout, in_args, out_args, plan)
+
         broad = broadcast(*args)
         shape = broad.shape
 
@@ -810,27 +1179,44 @@ class ufunc(object):
             ret = out_args[0]
         else:
             ret = tuple(out_args)
+        plan = _LaunchPlan(in_types, out_types, shape, routine, None)
 
         if broad.size == 0:
-            return ret
-
-        inout_args = []
-        for i, t in enumerate(in_types):
-            x = broad.values[i]
-            inout_args.append(x if isinstance(x, ndarray) else
-                              _scalar.get_scalar_from_numpy(x, t))
-        inout_args.extend(out_args)
-        shape = _reduce_dims(inout_args, self._params, shape)
-        indexer = Indexer(shape)
-        inout_args.append(indexer)
-        args_info = _get_args_info(inout_args)
-
-        kern = _get_ufunc_kernel(
-            in_types, out_types, routine, args_info,
-            self._params, self.name, self._preamble, self._loop_prep)
-
-        kern.linear_launch(indexer.size, inout_args)
-        return ret
+            inout_args = None
+        else:
+            inout_args = []
+            for i, t in enumerate(in_types):
+                x = broad.values[i]
+                inout_args.append(x if isinstance(x, ndarray) else
+                                  _scalar.get_scalar_from_numpy(x, t))
+            inout_args.extend(out_args)
+            shape = _reduce_dims(inout_args, self._params, shape)
+            inout_args.append(Indexer(shape))
+            plan._set_args(self._params, in_args + out_args, inout_args)
+
+        if key is not None:
+            _store_launch_plan(self._launch_plans, key, plan)
+        return ret, inout_args, plan
+
+
+cdef tuple _prepare_ufunc_from_plan(
+        Py_ssize_t nout, list in_args, list out_args, _LaunchPlan plan):
+    if not out_args:
+        out_args = [ndarray(plan.out_shape, t) for t in plan.out_types]
+    if nout == 1:
+        ret = out_args[0]
+    else:
+        ret = tuple(out_args)
+    if plan.indexer is None:
+        return ret, None, plan
+
+    inout_args = []
+    for i, t in enumerate(plan.in_types):
+        x = in_args[i]
+        inout_args.append(x if isinstance(x, ndarray) else
+                          _scalar.get_scalar_from_numpy(x, t))
+    inout_args.extend(out_args)
+    return ret, plan._make_args(inout_args), plan
 
 
 cpdef create_ufunc(name, ops, routine=None, preamble='', doc='',
@@ -13,6 +13,8 @@ cdef ndarray _ndarray_cumprod(ndarray self, axis, dtype, out)
 cdef ndarray _ndarray_clip(ndarray self, a_min, a_max, out)
 
 cdef ndarray scan(ndarray a, ndarray out=*)
+cpdef ndarray _scan(
+    ndarray a, Py_ssize_t axis, str op, bint exclusive, ndarray out)
 cdef object _sum_auto_dtype
 cdef object _add
 cdef object _conj
@@ -13,6 +13,7 @@ from cupy import util
 from cupy.core._dtype cimport get_dtype
 from cupy.core.core cimport compile_with_cache
 from cupy.core.core cimport ndarray
+from cupy.core cimport internal
 
 
 # ndarray members
@@ -104,91 +105,328 @@ cdef ndarray _ndarray_clip(ndarray self, a_min, a_max, out):
 # private/internal
 
 
-@util.memoize(for_each_device=True)
-def _inclusive_scan_kernel(dtype, block_size):
-    """return Prefix Sum(Scan) cuda kernel
-
-    e.g
-    if blocksize * 2 >= len(src)
-    src [1, 2, 3, 4]
-    dst [1, 3, 6, 10]
-
-    if blocksize * 2 < len(src)
-    block_size: 2
-    src [1, 2, 3, 4, 5, 6]
-    dst [1, 3, 6, 10, 5, 11]
-
-    Args:
-        dtype: src, dst array type
-        block_size: block_size
-
-    Returns:
-         cupy.cuda.Function: cuda function
-    """
-
-    name = "inclusive_scan_kernel"
-    dtype = get_typename(dtype)
-    source = string.Template("""
-    extern "C" __global__ void ${name}(const CArray<${dtype}, 1> src,
-        CArray<${dtype}, 1> dst){
-        long long n = src.size();
-        extern __shared__ ${dtype} temp[];
-        unsigned int thid = threadIdx.x;
-        unsigned int block = 2 * blockIdx.x * blockDim.x;
-
-        unsigned int idx0 = thid + block;
-        unsigned int idx1 = thid + blockDim.x + block;
-
-        temp[thid] = (idx0 < n) ? src[idx0] : (${dtype})0;
-        temp[thid + blockDim.x] = (idx1 < n) ? src[idx1] : (${dtype})0;
-        __syncthreads();
-
-        for(int i = 1; i <= ${block_size}; i <<= 1){
-            int index = (threadIdx.x + 1) * i * 2 - 1;
-            if (index < (${block_size} << 1)){
-                temp[index] = temp[index] + temp[index - i];
-            }
-            __syncthreads();
-        }
-
-        for(int i = ${block_size} >> 1; i > 0; i >>= 1){
-            int index = (threadIdx.x + 1) * i * 2 - 1;
-            if(index + i < (${block_size} << 1)){
-                temp[index + i] = temp[index + i] + temp[index];
-            }
-            __syncthreads();
-        }
-
-        if(idx0 < n){
-            dst[idx0] = temp[thid];
+_scan_ops = {
+    'sum': 'a + b',
+    'prod': 'a * b',
+    'max': '_scan_max(a, b)',
+    'min': '_scan_min(a, b)',
+}
+
+# Scan kernels. The serial kernel scans each segment in a thread, the batch
+# kernel scans each segment in a block with a carry across the tiles, and
+# the look-back kernel scans a single long segment in one pass, in which
+# each tile takes its prefix from the preceding tiles by the decoupled
+# look-back of Merrill and Garland.
+_scan_source = string.Template("""
+typedef ${in_type} in_type;
+typedef ${out_type} T;
+#define SCAN_OP(a, b) (${op})
+#define BLOCK ${block_size}
+#define ITEMS ${items}
+
+template <typename U>
+__device__ U _scan_max(U a, U b) {
+  return (a > b || a != a) ? a : b;
+}
+
+template <typename U>
+__device__ U _scan_min(U a, U b) {
+  return (a < b || a != a) ? a : b;
+}
+
+// Loads the items of the thread in the tile at base and scans them in
+// place. Returns the aggregate of the items.
+__device__ T _scan_load(
+    const char* src, ptrdiff_t step, ptrdiff_t base, ptrdiff_t n,
+    T identity, T (&v)[ITEMS]) {
+  for (int j = 0; j < ITEMS; ++j) {
+    ptrdiff_t k = base + threadIdx.x * ITEMS + j;
+    v[j] = k < n ? T(*reinterpret_cast<const in_type*>(src + k * step))
+                 : identity;
+  }
+  T total = v[0];
+  for (int j = 1; j < ITEMS; ++j) {
+    total = SCAN_OP(total, v[j]);
+  }
+  return total;
+}
+
+// Stores the inclusive or exclusive scan of the items following prefix.
+__device__ void _scan_store(
+    char* dst, ptrdiff_t step, ptrdiff_t base, ptrdiff_t n, T prefix,
+    const T (&v)[ITEMS], int exclusive) {
+  for (int j = 0; j < ITEMS; ++j) {
+    ptrdiff_t k = base + threadIdx.x * ITEMS + j;
+    T next = SCAN_OP(prefix, v[j]);
+    if (k < n) {
+      *reinterpret_cast<T*>(dst + k * step) = exclusive ? prefix : next;
+    }
+    prefix = next;
+  }
+}
+
+// Returns the exclusive scan of x over the block and sets the aggregate.
+__device__ T _scan_block(T x, T* smem, T identity, T* aggregate) {
+  unsigned int tid = threadIdx.x;
+  smem[tid] = x;
+  __syncthreads();
+  for (unsigned int offset = 1; offset < BLOCK; offset <<= 1) {
+    T y;
+    if (tid >= offset) {
+      y = smem[tid - offset];
+    }
+    __syncthreads();
+    if (tid >= offset) {
+      smem[tid] = SCAN_OP(y, smem[tid]);
+    }
+    __syncthreads();
+  }
+  T ret = tid == 0 ? identity : smem[tid - 1];
+  *aggregate = smem[BLOCK - 1];
+  __syncthreads();
+  return ret;
+}
+
+// Reads a value written by another block.
+__device__ T _scan_load_volatile(const T* p) {
+  __align__(16) char w[sizeof(T)];
+  const volatile char* q = reinterpret_cast<const volatile char*>(p);
+  for (int k = 0; k < sizeof(T); ++k) {
+    w[k] = q[k];
+  }
+  return *reinterpret_cast<T*>(w);
+}
+
+extern "C" __global__ void ${name}_serial(
+    const CArray<in_type, ${ndim}> src, CArray<T, ${ndim}> dst,
+    T identity, int exclusive) {
+  const ptrdiff_t n = dst.shape()[${ndim} - 1];
+  const ptrdiff_t src_step = src.strides()[${ndim} - 1];
+  const ptrdiff_t dst_step = dst.strides()[${ndim} - 1];
+  CUPY_FOR(seg, dst.size() / n) {
+    const char* src_ptr = reinterpret_cast<const char*>(&src[seg * n]);
+    char* dst_ptr = reinterpret_cast<char*>(&dst[seg * n]);
+    T prefix = identity;
+    for (ptrdiff_t k = 0; k < n; ++k) {
+      const in_type* x =
+          reinterpret_cast<const in_type*>(src_ptr + k * src_step);
+      T next = SCAN_OP(prefix, T(*x));
+      *reinterpret_cast<T*>(dst_ptr + k * dst_step) =
+          exclusive ? prefix : next;
+      prefix = next;
+    }
+  }
+}
+
+extern "C" __global__ void ${name}_batch(
+    const CArray<in_type, ${ndim}> src, CArray<T, ${ndim}> dst,
+    T identity, int exclusive) {
+  __shared__ char smem_raw[BLOCK * sizeof(T)];
+  T* smem = reinterpret_cast<T*>(smem_raw);
+  const ptrdiff_t n = dst.shape()[${ndim} - 1];
+  const ptrdiff_t src_step = src.strides()[${ndim} - 1];
+  const ptrdiff_t dst_step = dst.strides()[${ndim} - 1];
+  for (ptrdiff_t seg = blockIdx.x; seg < dst.size() / n; seg += gridDim.x) {
+    const char* src_ptr = reinterpret_cast<const char*>(&src[seg * n]);
+    char* dst_ptr = reinterpret_cast<char*>(&dst[seg * n]);
+    T carry = identity;
+    for (ptrdiff_t base = 0; base < n; base += BLOCK * ITEMS) {
+      T v[ITEMS];
+      T aggregate;
+      T total = _scan_load(src_ptr, src_step, base, n, identity, v);
+      T prev = _scan_block(total, smem, identity, &aggregate);
+      _scan_store(dst_ptr, dst_step, base, n, SCAN_OP(carry, prev), v,
+                  exclusive);
+      carry = SCAN_OP(carry, aggregate);
+    }
+  }
+}
+
+// status holds the flags of the tiles followed by the tile counter. The
+// flag of a tile is 1 when its aggregate is in values[tile] and 2 when its
+// inclusive prefix is in values[n_tiles + tile].
+extern "C" __global__ void ${name}_lookback(
+    const CArray<in_type, ${ndim}> src, CArray<T, ${ndim}> dst,
+    T identity, int exclusive, CArray<int, 1> status, CArray<T, 1> values) {
+  __shared__ char smem_raw[BLOCK * sizeof(T)];
+  __shared__ char prefix_raw[sizeof(T)];
+  __shared__ int tile_raw;
+  T* smem = reinterpret_cast<T*>(smem_raw);
+  const ptrdiff_t n = dst.size();
+  const ptrdiff_t n_tiles = status.size() - 1;
+  volatile int* flags = status.data();
+  T* aggregates = values.data();
+  T* prefixes = aggregates + n_tiles;
+
+  // Tiles are numbered in the order the blocks start, so that the
+  // preceding tiles are always being processed.
+  if (threadIdx.x == 0) {
+    tile_raw = atomicAdd(status.data() + n_tiles, 1);
+  }
+  __syncthreads();
+  const ptrdiff_t tile = tile_raw;
+  const ptrdiff_t base = tile * BLOCK * ITEMS;
+  const char* src_ptr = reinterpret_cast<const char*>(&src[0]);
+  char* dst_ptr = reinterpret_cast<char*>(&dst[0]);
+  const ptrdiff_t src_step = src.strides()[${ndim} - 1];
+  const ptrdiff_t dst_step = dst.strides()[${ndim} - 1];
+
+  T v[ITEMS];
+  T aggregate;
+  T total = _scan_load(src_ptr, src_step, base, n, identity, v);
+  T prev = _scan_block(total, smem, identity, &aggregate);
+
+  if (threadIdx.x == 0) {
+    T prefix = identity;
+    if (tile == 0) {
+      prefixes[0] = aggregate;
+      __threadfence();
+      flags[0] = 2;
+    } else {
+      aggregates[tile] = aggregate;
+      __threadfence();
+      flags[tile] = 1;
+      bool first = true;
+      for (ptrdiff_t p = tile - 1; ; ) {
+        int flag = flags[p];
+        if (flag == 0) {
+          continue;
         }
-        if(idx1 < n){
-            dst[idx1] = temp[thid + blockDim.x];
+        __threadfence();
+        T x = _scan_load_volatile(
+            flag == 2 ? prefixes + p : aggregates + p);
+        prefix = first ? x : SCAN_OP(x, prefix);
+        first = false;
+        if (flag == 2) {
+          break;
         }
+        --p;
+      }
+      prefixes[tile] = SCAN_OP(prefix, aggregate);
+      __threadfence();
+      flags[tile] = 2;
     }
-    """).substitute(name=name, dtype=dtype, block_size=block_size)
-    module = compile_with_cache(source)
-    return module.get_function(name)
+    *reinterpret_cast<T*>(prefix_raw) = prefix;
+  }
+  __syncthreads();
+  T prefix = *reinterpret_cast<T*>(prefix_raw);
+  _scan_store(dst_ptr, dst_step, base, n, SCAN_OP(prefix, prev), v,
+              exclusive);
+}
+""")
+
+# Threads per block and items per thread of the batch and look-back
+# kernels. Segments not longer than _scan_serial_max_length are scanned by
+# the serial kernel. So are more than _scan_serial_min_segments segments if
+# the axis is not the fastest-varying one, as the threads of the serial
+# kernel then read adjacent elements.
+_scan_block_size = 256
+_scan_items_per_thread = 4
+_scan_serial_max_length = 32
+_scan_serial_min_segments = 16384
 
 
 @util.memoize(for_each_device=True)
-def _add_scan_blocked_sum_kernel(dtype):
-    name = "add_scan_blocked_sum_kernel"
-    dtype = get_typename(dtype)
-    source = string.Template("""
-    extern "C" __global__ void ${name}(CArray<${dtype}, 1> src_dst){
-        long long n = src_dst.size();
-        unsigned int idxBase = (blockDim.x + 1) * (blockIdx.x + 1);
-        unsigned int idxAdded = idxBase + threadIdx.x;
-        unsigned int idxAdd = idxBase - 1;
-
-        if(idxAdded < n){
-            src_dst[idxAdded] += src_dst[idxAdd];
-        }
-    }
-    """).substitute(name=name, dtype=dtype)
+def _get_scan_kernel(in_dtype, out_dtype, ndim, op, block_size, kind):
+    name = 'cupy_scan_' + op
+    source = _scan_source.substitute(
+        name=name, in_type=get_typename(in_dtype),
+        out_type=get_typename(out_dtype), op=_scan_ops[op], ndim=ndim,
+        block_size=block_size, items=_scan_items_per_thread)
     module = compile_with_cache(source)
-    return module.get_function(name)
+    return module.get_function('%s_%s' % (name, kind))
+
+
+cdef _get_scan_identity(str op, dtype):
+    dtype = numpy.dtype(dtype)
+    if op == 'sum':
+        return dtype.type(0)
+    if op == 'prod':
+        return dtype.type(1)
+    if dtype.kind in 'cV':
+        raise TypeError('%s scan is not supported for %s' % (op, dtype))
+    if dtype.kind == 'b':
+        return dtype.type(op == 'min')
+    if dtype.kind in 'iu':
+        info = numpy.iinfo(dtype)
+        return dtype.type(info.max if op == 'min' else info.min)
+    return dtype.type(numpy.inf if op == 'min' else -numpy.inf)
+
+
+cdef bint _is_fastest_axis(ndarray a, Py_ssize_t axis):
+    # Returns True if no other axis of length > 1 has a smaller stride.
+    cdef Py_ssize_t i, stride
+    stride = abs(a._strides[axis])
+    for i in range(a._shape.size()):
+        if i != axis and a._shape[i] > 1 and abs(a._strides[i]) < stride:
+            return False
+    return True
+
+
+cpdef ndarray _scan(
+        ndarray a, Py_ssize_t axis, str op, bint exclusive, ndarray out):
+    """Scans the array along the axis into the output array.
+
+    The output array must have the same shape as the input. Each segment
+    along the axis is scanned independently. The arrays are indexed through
+    strided views, so that no copy is made for any axis.
+
+    Args:
+        a (cupy.ndarray): Input array.
+        axis (int): Axis along which the scan is taken.
+        op (str): One of ``'sum'``, ``'prod'``, ``'max'`` and ``'min'``.
+        exclusive (bool): If ``True``, each element of the output does not
+            include the corresponding input element. The first elements are
+            the identity of the operator.
+        out (cupy.ndarray): Output array.
+
+    Returns:
+        cupy.ndarray: The output array.
+
+    """
+    cdef Py_ssize_t n, n_seg, n_tiles, block_size, tile_size
+    if op not in _scan_ops:
+        raise ValueError('Unsupported scan operator: %s' % op)
+    identity = _get_scan_identity(op, out.dtype)
+    if not 0 <= axis < a.ndim:
+        raise ValueError('Invalid scan axis: %d' % axis)
+    if a.shape != out.shape:
+        raise ValueError('Provided out is the wrong shape')
+    if out.size == 0:
+        return out
+
+    ndim = a.ndim
+    axes = [i for i in range(ndim) if i != axis] + [axis]
+    src = a.transpose(axes)
+    dst = out.transpose(axes)
+    n = a._shape[axis]
+    n_seg = out.size // n
+    args = [src, dst, identity, numpy.int32(exclusive)]
+
+    block_size = _scan_block_size
+    tile_size = block_size * _scan_items_per_thread
+    if n <= _scan_serial_max_length or (
+            n_seg >= _scan_serial_min_segments and
+            not _is_fastest_axis(a, axis) and
+            not _is_fastest_axis(out, axis)):
+        kern = _get_scan_kernel(
+            a.dtype, out.dtype, ndim, op, block_size, 'serial')
+        kern.linear_launch(n_seg, args)
+    elif n_seg == 1 and n > tile_size:
+        n_tiles = (n + tile_size - 1) // tile_size
+        status = cupy.zeros(n_tiles + 1, 'i')
+        values = ndarray((2 * n_tiles,), out.dtype)
+        kern = _get_scan_kernel(
+            a.dtype, out.dtype, ndim, op, block_size, 'lookback')
+        kern((n_tiles,), (block_size,), args + [status, values])
+    else:
+        # Short segments are scanned by smaller blocks.
+        block_size = min(block_size, max(32, internal.clp2(
+            (n + _scan_items_per_thread - 1) // _scan_items_per_thread)))
+        kern = _get_scan_kernel(
+            a.dtype, out.dtype, ndim, op, block_size, 'batch')
+        kern((min(n_seg, 1 << 30),), (block_size,), args)
+    return out
 
 
 cdef ndarray scan(ndarray a, ndarray out=None):
@@ -206,28 +444,13 @@ cdef ndarray scan(ndarray a, ndarray out=None):
     if a._shape.size() != 1:
         raise TypeError("Input array should be 1D array.")
 
-    cdef Py_ssize_t block_size = 256
-
     if out is None:
         out = ndarray(a.shape, dtype=a.dtype)
     else:
         if a.size != out.size:
             raise ValueError("Provided out is the wrong size")
 
-    kern_scan = _inclusive_scan_kernel(a.dtype, block_size)
-    kern_scan(grid=((a.size - 1) // (2 * block_size) + 1,),
-              block=(block_size,),
-              args=(a, out),
-              shared_mem=a.itemsize * block_size * 2)
-
-    if (a.size - 1) // (block_size * 2) > 0:
-        blocked_sum = out[block_size * 2 - 1:None:block_size * 2]
-        scan(blocked_sum, blocked_sum)
-        kern_add = _add_scan_blocked_sum_kernel(out.dtype)
-        kern_add(grid=((a.size - 1) // (2 * block_size),),
-                 block=(2 * block_size - 1,),
-                 args=(out,))
-    return out
+    return _scan(a, 0, 'sum', False, out)
 
 
 # Only for test
@@ -244,6 +467,20 @@ _sum_auto_dtype = create_reduction_func(
     ('in0', 'a + b', 'out0 = type_out0_raw(a)', None), 0)
 
 
+# Used from cupyx.sum_sumsq.
+sum_sumsq = create_reduction_func(
+    'cupy_sum_sumsq',
+    ('?->ll', 'b->ll', 'B->LL', 'h->ll', 'H->LL', 'i->ll', 'I->LL', 'l->ll',
+     'L->LL', 'q->qq', 'Q->QQ',
+     ('e->ee', (('float(in0)', 'float(in0) * float(in0)'), None, None,
+                ('float', 'float'))),
+     'f->ff', 'd->dd', 'F->FF', 'D->DD'),
+    (('type_out0_raw(in0)', 'type_out0_raw(in0) * type_out0_raw(in0)'),
+     ('a._0 + b._0', 'a._1 + b._1'),
+     ('out0 = type_out0_raw(a._0)', 'out1 = type_out1_raw(a._1)'),
+     ('type_out0_raw', 'type_out1_raw')), ('0', '0'))
+
+
 _sum_keep_dtype = create_reduction_func(
     'cupy_sum_with_dtype',
     ('?->?', 'b->b', 'B->B', 'h->h', 'H->H', 'i->i', 'I->I', 'l->l', 'L->L',
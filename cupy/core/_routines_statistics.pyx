@@ -1,3 +1,8 @@
+import numpy
+
+from cupy.core._kernel import _get_axis
+from cupy.core._kernel import _get_out_shape
+from cupy.core._kernel import _set_reduce_type_size
 from cupy.core._kernel import create_reduction_func
 from cupy.core._kernel import ReductionKernel
 
@@ -251,30 +256,60 @@ cdef _argmax = create_reduction_func(
     None, _min_max_preamble)
 
 
+# Reductions with multiple outputs computed in a single pass. They are used
+# from cupyx.
+max_argmax = create_reduction_func(
+    'cupy_max_argmax',
+    ('?->?q', 'b->bq', 'B->Bq', 'h->hq', 'H->Hq', 'i->iq', 'I->Iq', 'l->lq',
+     'L->Lq', 'q->qq', 'Q->Qq',
+     ('e->eq', (None, 'my_argmax_float(a, b)', None, None)),
+     ('f->fq', (None, 'my_argmax_float(a, b)', None, None)),
+     ('d->dq', (None, 'my_argmax_float(a, b)', None, None)),
+     ('F->Fq', (None, 'my_argmax_complex(a, b)', None, None)),
+     ('D->Dq', (None, 'my_argmax_complex(a, b)', None, None))),
+    ('min_max_st<type_in0_raw>(in0, _J)', 'my_argmax(a, b)',
+     ('out0 = a.value', 'out1 = a.index'), 'min_max_st<type_in0_raw>'),
+    None, _min_max_preamble)
+
+
+min_argmin = create_reduction_func(
+    'cupy_min_argmin',
+    ('?->?q', 'b->bq', 'B->Bq', 'h->hq', 'H->Hq', 'i->iq', 'I->Iq', 'l->lq',
+     'L->Lq', 'q->qq', 'Q->Qq',
+     ('e->eq', (None, 'my_argmin_float(a, b)', None, None)),
+     ('f->fq', (None, 'my_argmin_float(a, b)', None, None)),
+     ('d->dq', (None, 'my_argmin_float(a, b)', None, None)),
+     ('F->Fq', (None, 'my_argmin_complex(a, b)', None, None)),
+     ('D->Dq', (None, 'my_argmin_complex(a, b)', None, None))),
+    ('min_max_st<type_in0_raw>(in0, _J)', 'my_argmin(a, b)',
+     ('out0 = a.value', 'out1 = a.index'), 'min_max_st<type_in0_raw>'),
+    None, _min_max_preamble)
+
+
+cdef _min_max_float = ('my_min_float(a._0, b._0)', 'my_max_float(a._1, b._1)')
+cdef _min_max_complex = (
+    'my_min_complex(a._0, b._0)', 'my_max_complex(a._1, b._1)')
+
+
+min_max = create_reduction_func(
+    'cupy_min_max',
+    ('?->??', 'b->bb', 'B->BB', 'h->hh', 'H->HH', 'i->ii', 'I->II', 'l->ll',
+     'L->LL', 'q->qq', 'Q->QQ',
+     ('e->ee', (None, _min_max_float, None, None)),
+     ('f->ff', (None, _min_max_float, None, None)),
+     ('d->dd', (None, _min_max_float, None, None)),
+     ('F->FF', (None, _min_max_complex, None, None)),
+     ('D->DD', (None, _min_max_complex, None, None))),
+    (('min_max_st<type_in0_raw>(in0)', 'min_max_st<type_in0_raw>(in0)'),
+     ('my_min(a._0, b._0)', 'my_max(a._1, b._1)'),
+     ('out0 = a._0.value', 'out1 = a._1.value'),
+     ('min_max_st<type_in0_raw>', 'min_max_st<type_in0_raw>')),
+    None, _min_max_preamble)
+
+
 cdef ndarray _var(
         ndarray a, axis=None, dtype=None, out=None, ddof=0, keepdims=False):
-    assert a.dtype.kind != 'c', 'Variance for complex numbers is not ' \
-                                'implemented. Current implemention does not ' \
-                                'convert the dtype'
-    if axis is None:
-        axis = tuple(range(a.ndim))
-    if not isinstance(axis, tuple):
-        axis = (axis,)
-
-    if dtype is None and a.dtype.kind in 'biu':
-        dtype = 'd'
-
-    shape = a.shape
-    items = 1
-    for ax in axis:
-        items *= shape[ax]
-    alpha = 1. / max(items - ddof, 0)
-    arrmean = a.mean(axis=axis, dtype=dtype, out=None, keepdims=True)
-    if out is None:
-        return _var_core(a, arrmean, alpha, axis=axis, keepdims=keepdims)
-    else:
-        return _var_core_out(
-            a, arrmean, alpha, out, axis=axis, keepdims=keepdims)
+    return _moments(a, axis, dtype, out, None, ddof, keepdims)[1]
 
 
 cdef ndarray _std(
@@ -284,15 +319,91 @@ cdef ndarray _std(
     return _math._sqrt(ret, dtype=dtype, out=out)
 
 
-cdef _var_core = ReductionKernel(
-    'S x, T mean, T alpha', 'T out',
-    '(x - mean) * (x - mean)',
-    'a + b', 'out = alpha * a', '0', '_var_core')
+cdef tuple _moments(
+        ndarray a, axis, dtype, ndarray out_var, ndarray out_mean, ddof,
+        bint keepdims, bint with_mean=False):
+    # Computes the variance, and the mean if with_mean is True, in a single
+    # pass. The output arrays are allocated if not given.
+    assert a.dtype.kind != 'c', 'Variance for complex numbers is not ' \
+                                'implemented. Current implemention does not ' \
+                                'convert the dtype'
+    if dtype is None:
+        dtype = 'd' if a.dtype.kind in 'biu' else a.dtype
+    dtype = numpy.dtype(dtype)
+    if out_var is None or (with_mean and out_mean is None):
+        reduce_axis, out_axis = _get_axis(axis, a.ndim)
+        out_shape = _get_out_shape(a.shape, reduce_axis, out_axis, keepdims)
+        if out_var is None:
+            out_var = ndarray(out_shape, dtype)
+        if with_mean and out_mean is None:
+            out_mean = ndarray(out_shape, dtype)
+
+    # float16 and float32 are accumulated in float32.
+    acc = 'float' if dtype.char in 'ef' else 'double'
+    if with_mean:
+        _mean_var_kernels[acc](
+            a, ddof, out_mean, out_var, axis=axis, keepdims=keepdims)
+    else:
+        _var_kernels[acc](a, ddof, out_var, axis=axis, keepdims=keepdims)
+    return out_mean, out_var
+
+
+cdef _welford_preamble = '''
+template <typename T>
+struct welford_st {
+    T count;
+    T mean;
+    T m2;
+    __device__ welford_st() : count(0), mean(0), m2(0) { }
+    __device__ welford_st(T x) : count(1), mean(x), m2(0) { }
+    __device__ welford_st(T count, T mean, T m2)
+        : count(count), mean(mean), m2(m2) { }
+};
+
+// Merges the moments of two sets by the parallel algorithm of Chan et al.
+template <typename T>
+__device__ welford_st<T> welford_merge(
+        const welford_st<T>& a, const welford_st<T>& b) {
+    if (a.count == 0) {
+        return b;
+    }
+    if (b.count == 0) {
+        return a;
+    }
+    T count = a.count + b.count;
+    T delta = b.mean - a.mean;
+    T r = b.count / count;
+    return welford_st<T>(
+        count, a.mean + delta * r, a.m2 + b.m2 + delta * delta * a.count * r);
+}
+'''
+
+
+cdef dict _var_kernels = {}
+cdef dict _mean_var_kernels = {}
+
+
+cdef _setup_welford_kernels():
+    for acc, size in (('float', 4), ('double', 8)):
+        reduce_type = 'welford_st<%s>' % acc
+        _set_reduce_type_size(reduce_type, 3 * size)
+        _var_kernels[acc] = ReductionKernel(
+            'S x, float64 ddof', 'T var',
+            '%s(x)' % reduce_type, 'welford_merge(a, b)',
+            'var = T(a.m2 / max(a.count - ddof, 0.0))', '',
+            'cupy_var_welford',
+            reduce_type=reduce_type, preamble=_welford_preamble)
+        _mean_var_kernels[acc] = ReductionKernel(
+            'S x, float64 ddof', 'T mean, T var',
+            '%s(x)' % reduce_type, 'welford_merge(a, b)',
+            'mean = T(a.mean), var = T(a.m2 / max(a.count - ddof, 0.0))',
+            '',
+            'cupy_mean_var_welford',
+            reduce_type=reduce_type, preamble=_welford_preamble)
+
+
+_setup_welford_kernels()
 
-cdef _var_core_out = ReductionKernel(
-    'S x, T mean, T alpha', 'U out',
-    '(x - mean) * (x - mean)',
-    'a + b', 'out = alpha * a', '0', '_var_core')
 
 # TODO(okuta) needs cast
 cdef _mean = create_reduction_func(
@@ -311,3 +422,7 @@ cdef _mean = create_reduction_func(
 
 amax = _amax
 amin = _amin
+
+
+def _mean_var(a, axis=None, dtype=None, ddof=0, keepdims=False):
+    return _moments(a, axis, dtype, None, None, ddof, keepdims, True)
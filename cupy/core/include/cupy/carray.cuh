@@ -169,6 +169,17 @@ __device__ int signbit(float16 x) {return x.signbit();}
          i < (n); \
          i += static_cast<ptrdiff_t>(blockDim.x) * gridDim.x)
 
+// Loop with a 32-bit counter. The index i is still ptrdiff_t as in
+// CUPY_FOR, since operations may use it in expressions of that type. n plus
+// the total number of threads must be less than 2^31.
+#define CUPY_FOR_INT32(i, n) \
+    ptrdiff_t i; \
+    for (int _i_int32 = \
+            static_cast<int>(blockIdx.x * blockDim.x + threadIdx.x), \
+            _n_int32 = static_cast<int>(n); \
+         _i_int32 < _n_int32 && ((i = _i_int32), true); \
+         _i_int32 += static_cast<int>(blockDim.x * gridDim.x))
+
 template <typename T, int _ndim>
 class CArray {
 public:
@@ -184,6 +195,10 @@ public:
     return size_;
   }
 
+  __device__ T* data() const {
+    return data_;
+  }
+
   __device__ const ptrdiff_t* shape() const {
     return shape_;
   }
@@ -237,6 +252,10 @@ public:
     return size_;
   }
 
+  __device__ T* data() const {
+    return data_;
+  }
+
   __device__ const ptrdiff_t* shape() const {
     return NULL;
   }
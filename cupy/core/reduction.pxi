@@ -7,18 +7,42 @@ import numpy
 
 from cupy.core import _errors
 from cupy.cuda import compiler
+from cupy.cuda import memory
 from cupy import util
 
 
+# Stages of reduction kernels. A single-stage kernel reduces each output
+# in one block. For small outputs, the partial stage splits the reduction
+# of each output among gridDim.y blocks and the finalize stage reduces
+# their partial results.
+_SINGLE_STAGE = 0
+_PARTIAL_STAGE = 1
+_FINALIZE_STAGE = 2
+
+
 cpdef _get_simple_reduction_kernel(
         name, block_size, reduce_type, params, identity,
         pre_map_expr, reduce_expr, post_map_expr,
-        type_preamble, input_expr, output_expr, preamble, options):
+        type_preamble, input_expr, output_expr, preamble, options,
+        int stage=_SINGLE_STAGE, bint warp=False):
+    if isinstance(reduce_type, tuple):
+        reduce_type, preamble, identity, pre_map_expr, reduce_expr = (
+            _expand_tuple_reduce_type(
+                reduce_type, preamble, identity, pre_map_expr, reduce_expr))
+    if isinstance(post_map_expr, tuple):
+        post_map_expr = ', '.join(post_map_expr)
     if identity is None:
         identity = ''
+    if stage == _PARTIAL_STAGE:
+        name += '_partial'
+    elif stage == _FINALIZE_STAGE:
+        name += '_finalize'
+    if stage != _SINGLE_STAGE:
+        params += ', void* _partial, int _n_partial'
     module_code = string.Template('''
 ${type_preamble}
 ${preamble}
+#define _REDUCE_STAGE ${stage}
 #define REDUCE(a, b) (${reduce_expr})
 #define POST_MAP(a) (${post_map_expr})
 #define _REDUCE(_offset) if (_tid < _offset) { \
@@ -26,6 +50,26 @@ ${preamble}
   _sdata[_tid] = REDUCE(_a, _b); \
 }
 
+#if ${warp} && (!defined(__CUDA_ARCH__) || __CUDA_ARCH__ >= 300)
+#define _REDUCE_WARP 1
+// Shuffles a value of any type as 32-bit words.
+template <typename T>
+__device__ T _shfl_down(const T& v, unsigned int delta) {
+  __align__(16) int _w[(sizeof(T) + sizeof(int) - 1) / sizeof(int)];
+  *reinterpret_cast<T*>(_w) = v;
+  for (int _k = 0; _k < sizeof(_w) / sizeof(int); ++_k) {
+#if __CUDACC_VER_MAJOR__ >= 9
+    _w[_k] = __shfl_down_sync(0xffffffff, _w[_k], delta);
+#else
+    _w[_k] = __shfl_down(_w[_k], delta);
+#endif
+  }
+  return *reinterpret_cast<T*>(_w);
+}
+#else
+#define _REDUCE_WARP 0
+#endif
+
 typedef ${reduce_type} _type_reduce;
 extern "C" __global__ void ${name}(${params}) {
   __shared__ char _sdata_raw[${block_size} * sizeof(_type_reduce)];
@@ -43,37 +87,97 @@ extern "C" __global__ void ${name}(${params}) {
     _type_reduce _s = _type_reduce(${identity});
     ptrdiff_t _i =
         _i_base + (_tid & (_block_stride - 1));  // _tid % _block_stride
+#if _REDUCE_STAGE == 2
+    const _type_reduce* _partial_in =
+        static_cast<const _type_reduce*>(_partial);
+    for (ptrdiff_t _j = _i + _j_offset;
+         _j < (ptrdiff_t)_n_partial * _out_ind.size(); _j += _j_stride) {
+      _type_reduce _a = _partial_in[_j];
+#else
+#if _REDUCE_STAGE == 1
+    int _J = _J_offset + blockIdx.y * _J_stride;
+    for (ptrdiff_t _j = _i + _j_offset + (ptrdiff_t)blockIdx.y * _j_stride;
+         _j < _in_ind.size();
+         _j += _j_stride * gridDim.y, _J += _J_stride * gridDim.y) {
+#else
     int _J = _J_offset;
     for (ptrdiff_t _j = _i + _j_offset; _j < _in_ind.size();
          _j += _j_stride, _J += _J_stride) {
+#endif
       _in_ind.set(_j);
       ${input_expr}
       _type_reduce _a = static_cast<_type_reduce>(${pre_map_expr});
+#endif
       _s = REDUCE(_s, _a);
     }
+#if _REDUCE_WARP
+    if (_block_stride == 1) {
+      // Reduces each warp by shuffles and then the per-warp partials.
+      for (int _o = 16; _o > 0; _o >>= 1) {
+        _type_reduce _b = _shfl_down(_s, _o);
+        _s = REDUCE(_s, _b);
+      }
+      if ((_tid & 31) == 0) {
+        _sdata[_tid >> 5] = _s;
+      }
+      __syncthreads();
+      if (_tid < 32) {
+        _s = _sdata[_tid];
+        for (int _o = ${block_size} / 64; _o > 0; _o >>= 1) {
+          _type_reduce _b = _shfl_down(_s, _o);
+          if (_tid < _o) {
+            _s = REDUCE(_s, _b);
+          }
+        }
+      }
+      __syncthreads();
+    } else
+#endif
     if (_block_stride < ${block_size}) {
       _sdata[_tid] = _s;
       __syncthreads();
       for (unsigned int _block = ${block_size} / 2;
-           _block >= _block_stride; _block >>= 1) {
+           _block >= _block_stride && _block >= (_REDUCE_WARP ? 32 : 1);
+           _block >>= 1) {
         if (_tid < _block) {
           _REDUCE(_block);
         }
         __syncthreads();
       }
+#if _REDUCE_WARP
+      if (_block_stride < 32) {
+        // The last levels are reduced in the first warp by shuffles.
+        if (_tid < 32) {
+          _s = _sdata[_tid];
+          for (unsigned int _o = 16; _o >= _block_stride; _o >>= 1) {
+            _type_reduce _b = _shfl_down(_s, _o);
+            if (_tid < _o) {
+              _s = REDUCE(_s, _b);
+            }
+          }
+        }
+      } else
+#endif
       if (_tid < _block_stride) {
         _s = _sdata[_tid];
       }
       __syncthreads();
     }
     if (_tid < _block_stride && _i < _out_ind.size()) {
+#if _REDUCE_STAGE == 1
+      static_cast<_type_reduce*>(_partial)[
+          (ptrdiff_t)blockIdx.y * _out_ind.size() + _i] = _s;
+#else
       _out_ind.set(static_cast<ptrdiff_t>(_i));
       ${output_expr}
       POST_MAP(_s);
+#endif
     }
   }
 }''').substitute(
         name=name,
+        stage=stage,
+        warp=int(warp),
         block_size=block_size,
         reduce_type=reduce_type,
         params=params,
@@ -89,6 +193,42 @@ extern "C" __global__ void ${name}(${params}) {
     return module.get_function(name)
 
 
+cdef tuple _expand_tuple_reduce_type(
+        tuple reduce_type, preamble, identity, pre_map_expr, reduce_expr):
+    # Defines a struct of the member types as the reduce type, in which the
+    # i-th member is named _i. The identity, the pre-map expression and the
+    # reduction expression can be given as tuples of the expressions of the
+    # members.
+    cdef Py_ssize_t i, n = len(reduce_type)
+    for expr in (identity, pre_map_expr, reduce_expr):
+        if isinstance(expr, tuple) and len(expr) != n:
+            raise ValueError(
+                'Expected %d expressions for the reduce type %s: %s'
+                % (n, reduce_type, expr))
+    members = '\n'.join(
+        ['  %s _%d;' % (t, i) for i, t in enumerate(reduce_type)])
+    params = ', '.join(
+        ['const %s& _v%d' % (t, i) for i, t in enumerate(reduce_type)])
+    init = ', '.join(['_%d(_v%d)' % (i, i) for i in range(n)])
+    default_init = ', '.join(['_%d()' % i for i in range(n)])
+    preamble += string.Template('''
+struct _type_reduce_tuple {
+${members}
+  __device__ _type_reduce_tuple() : ${default_init} { }
+  __device__ _type_reduce_tuple(${params}) : ${init} { }
+};
+''').substitute(members=members, default_init=default_init, params=params,
+                   init=init)
+    if isinstance(identity, tuple):
+        identity = ', '.join(identity)
+    if isinstance(pre_map_expr, tuple):
+        pre_map_expr = '_type_reduce_tuple(%s)' % ', '.join(pre_map_expr)
+    if isinstance(reduce_expr, tuple):
+        reduce_expr = '_type_reduce_tuple(%s)' % ', '.join(reduce_expr)
+    return ('_type_reduce_tuple', preamble, identity, pre_map_expr,
+            reduce_expr)
+
+
 cpdef tuple _get_axis(object axis, Py_ssize_t ndim):
     cdef Py_ssize_t dim
     if axis is None:
@@ -141,30 +281,243 @@ cpdef list _get_inout_args(
             out_args, params[len(in_args):], out_indexer.shape)
         in_indexer.shape = in_shape
         out_indexer.shape = out_shape
+    return in_args + out_args + [
+        in_indexer, out_indexer, _get_block_stride_arg(block_stride)]
+
+
+cdef _scalar.CScalar _get_block_stride_arg(Py_ssize_t block_stride):
     cdef _scalar.CScalar s = _scalar.CScalar.__new__(_scalar.CScalar)
     (<int32_t *>s.ptr)[0] = block_stride
     s.kind = b'i'
     s.size = 4
-    return in_args + out_args + [in_indexer, out_indexer, s]
+    return s
+
+
+cdef Py_ssize_t _get_block_stride(
+        Py_ssize_t block_size, Py_ssize_t in_size, Py_ssize_t out_size):
+    cdef Py_ssize_t reduce_block_size
+    reduce_block_size = max(1, internal.clp2(in_size // out_size))
+    return max(1, block_size // reduce_block_size)
+
+
+cdef _launch_reduction(
+        function.Function kern, list inout_args, Py_ssize_t in_size,
+        Py_ssize_t out_size, Py_ssize_t block_size, Py_ssize_t grid_cap,
+        stream):
+    # Launches a reduction kernel compiled for the block size. If the block
+    # stride in the arguments is for another block size, it is replaced.
+    # If grid_cap is positive, the number of blocks is limited to it and
+    # each block reduces multiple groups of outputs.
+    cdef Py_ssize_t block_stride, out_block_num
+    cdef _scalar.CScalar s = inout_args[-1]
+    block_stride = _get_block_stride(block_size, in_size, out_size)
+    if (<int32_t *>s.ptr)[0] != block_stride:
+        inout_args = inout_args[:-1]
+        inout_args.append(_get_block_stride_arg(block_stride))
+    out_block_num = (out_size + block_stride - 1) // block_stride
+    if 0 < grid_cap < out_block_num:
+        out_block_num = grid_cap
+    kern.linear_launch(
+        out_block_num * block_size, inout_args, 0, block_size, stream)
+
+
+# Number of blocks per multiprocessor targeted by two-stage reductions and
+# the minimum number of elements each thread reduces in the partial stage.
+_two_stage_blocks_per_sm = 4
+_two_stage_min_items = 16
+
+cdef dict _reduce_type_sizes = {
+    _get_typename(t): numpy.dtype(t).itemsize for t in '?bhilqBHILQefdFD'}
+
+
+cpdef _set_reduce_type_size(str reduce_type, Py_ssize_t size):
+    """Registers the size of a struct used as a reduce type.
+
+    Reductions can use the two-stage kernels and the warp shuffles only for
+    reduce types whose size is known on the host.
+
+    """
+    _reduce_type_sizes[reduce_type] = size
+
+
+cdef Py_ssize_t _get_reduce_type_size(reduce_type, types):
+    # Returns the size of the reduce type, or 0 if it is unknown on the
+    # host, e.g., for structs. types is a sequence of the typedefs.
+    cdef Py_ssize_t size, align, member_size
+    if isinstance(reduce_type, tuple):
+        # Aligning the members to their sizes never underestimates the size
+        # of the struct.
+        size = align = 0
+        for t in reduce_type:
+            member_size = _get_reduce_type_size(t, types)
+            if member_size == 0:
+                return 0
+            size = (size + member_size - 1) // member_size * member_size
+            size += member_size
+            align = max(align, member_size)
+        return (size + align - 1) // align * align
+    for name, t in types:
+        if name == reduce_type:
+            return numpy.dtype(t).itemsize
+    return _reduce_type_sizes.get(reduce_type, 0)
+
+
+# If True, the in-block reductions of scalar reduce types use warp
+# shuffles. Structs and types unknown on the host always use shared memory.
+_warp_reduce = True
+
+
+cdef bint _use_warp_reduce(Py_ssize_t reduce_type_size) except *:
+    return _warp_reduce and 0 < reduce_type_size <= 16
+
+
+cdef Py_ssize_t _get_n_partials(
+        Py_ssize_t block_size, Py_ssize_t in_size, Py_ssize_t out_size,
+        Py_ssize_t reduce_type_size) except -1:
+    # Returns the number of blocks among which the reduction of each output
+    # is split. It is 1 if the outputs alone occupy the device, if the
+    # reduction is too short to split, or if the partial results cannot be
+    # stored.
+    cdef Py_ssize_t block_stride, out_block_num, n_partials
+    if reduce_type_size == 0:
+        return 1
+    block_stride = _get_block_stride(block_size, in_size, out_size)
+    n_partials = (in_size // out_size) // (
+        block_size // block_stride * _two_stage_min_items)
+    if n_partials < 2:
+        return 1
+    out_block_num = (out_size + block_stride - 1) // block_stride
+    n_partials = min(
+        n_partials,
+        autotune.get_multiprocessor_count() * _two_stage_blocks_per_sm //
+        out_block_num)
+    return max(1, n_partials)
+
+
+cdef _launch_two_stage_reduction(
+        function.Function partial_kern, function.Function finalize_kern,
+        list inout_args, Py_ssize_t in_size, Py_ssize_t out_size,
+        Py_ssize_t block_size, Py_ssize_t n_partials,
+        Py_ssize_t reduce_type_size, stream):
+    # Launches the partial stage on n_partials blocks per group of outputs,
+    # which writes the partial results to a temporary buffer, and then the
+    # finalize stage, which reduces them into the outputs.
+    cdef Py_ssize_t block_stride, out_block_num
+    if stream is not None:
+        # The temporary buffer is freed on return, so it must belong to the
+        # stream the kernels run on.
+        with stream:
+            _launch_two_stage_reduction(
+                partial_kern, finalize_kern, inout_args, in_size, out_size,
+                block_size, n_partials, reduce_type_size, None)
+        return
+    partial = memory.alloc(n_partials * out_size * reduce_type_size)
+    partial_args = [numpy.uintp(partial.ptr), numpy.int32(n_partials)]
+    args = inout_args[:-1]
+
+    block_stride = _get_block_stride(block_size, in_size, out_size)
+    out_block_num = (out_size + block_stride - 1) // block_stride
+    partial_kern(
+        (out_block_num, n_partials), (block_size,),
+        args + [_get_block_stride_arg(block_stride)] + partial_args,
+        0, stream)
+
+    block_stride = _get_block_stride(
+        block_size, n_partials * out_size, out_size)
+    out_block_num = (out_size + block_stride - 1) // block_stride
+    finalize_kern.linear_launch(
+        out_block_num * block_size,
+        args + [_get_block_stride_arg(block_stride)] + partial_args,
+        0, block_size, stream)
+
+
+def _get_two_stage_kernels(get_kernel, block_size):
+    return (get_kernel(block_size, _PARTIAL_STAGE),
+            get_kernel(block_size, _FINALIZE_STAGE))
+
+
+cdef _submit_reduction_kernels(get_kernel, Py_ssize_t block_size, sizes,
+                               tuple key):
+    # Submits the kernels launched by a reduction of the sizes to the
+    # default compile executor, and returns the future of the kernel, or of
+    # the tuple of the kernels of the two stages.
+    # get_kernel(block_size, stage) returns the kernel of the stage.
+    cdef Py_ssize_t in_size, out_size, reduce_type_size
+    if sizes is None:
+        future = compiler.CompileFuture()
+        future.set_result(None)
+        return future
+    in_size, out_size, reduce_type_size = sizes
+    executor = compiler.get_compile_executor()
+    if _get_n_partials(block_size, in_size, out_size, reduce_type_size) > 1:
+        return executor.submit(_get_two_stage_kernels, get_kernel,
+                               block_size, key=key + (_PARTIAL_STAGE,))
+    return executor.submit(get_kernel, block_size, _SINGLE_STAGE,
+                           key=key + (_SINGLE_STAGE,))
+
+
+# Block sizes and multiples of the number of multiprocessors used as the
+# grid caps tried by the autotuner for reduction kernels.
+_reduction_block_sizes = (128, 256, 512, 1024)
+_reduction_grid_cap_factors = (2, 8)
+
+
+def _run_reduction(get_kernel, list args, Py_ssize_t in_size,
+                   Py_ssize_t out_size, stream, tuple config):
+    block_size, grid_cap = config
+    _launch_reduction(get_kernel(block_size), args, in_size, out_size,
+                      block_size, grid_cap, stream)
+
+
+cdef tuple _tune_reduction(
+        str key, get_kernel, list inout_args, Py_ssize_t n_in,
+        bint copy_out, Py_ssize_t in_size, Py_ssize_t out_size, stream):
+    # Returns the (block_size, grid_cap) chosen by the autotuner.
+    # get_kernel(block_size) returns the kernel for the block size.
+    cdef Py_ssize_t block_size, block_stride, out_block_num
+    shape_class = autotune.get_shape_class(in_size // out_size, out_size)
+    config = autotune.get_config(key, shape_class)
+    if config is not None:
+        return config
+
+    n_sm = autotune.get_multiprocessor_count()
+    candidates = []
+    for block_size in _reduction_block_sizes:
+        candidates.append((block_size, 0))
+        block_stride = _get_block_stride(block_size, in_size, out_size)
+        out_block_num = (out_size + block_stride - 1) // block_stride
+        for factor in _reduction_grid_cap_factors:
+            if n_sm * factor < out_block_num:
+                candidates.append((block_size, n_sm * factor))
+    args = _get_tuning_args(inout_args, n_in, copy_out)
+    return autotune.tune(
+        key, shape_class, candidates,
+        functools.partial(_run_reduction, get_kernel, args, in_size,
+                          out_size, stream), stream)
 
 
 @util.memoize(for_each_device=True)
 def _get_simple_reduction_function(
-        routine, params, args_info, in_arg_dtype, out_arg_dtype, out_types,
+        routine, params, args_info, in_arg_dtype, out_arg_dtypes, out_types,
         name, block_size, identity, input_expr, output_expr, _preamble,
-        options):
+        options, warp, stage):
     reduce_type = routine[3]
     if reduce_type is None:
         reduce_type = _get_typename(out_types[0])
 
-    t = (_get_typename(in_arg_dtype), _get_typename(out_arg_dtype))
-    type_preamble = 'typedef %s type_in0_raw; typedef %s type_out0_raw;' % t
+    type_preamble = 'typedef %s type_in0_raw;' % _get_typename(in_arg_dtype)
+    for i, t in enumerate(out_arg_dtypes):
+        type_preamble += ' typedef %s type_out%d_raw;' % (_get_typename(t), i)
 
     params = _get_kernel_params(params, args_info)
-    return _get_simple_reduction_kernel(
-        name, block_size, reduce_type, params, identity,
-        routine[0], routine[1], routine[2],
-        type_preamble, input_expr, output_expr, _preamble, options)
+    signature = ('reduction', name, [numpy.dtype(in_arg_dtype).char],
+                 [numpy.dtype(t).char for t in out_types])
+    with compiler._kernel_signature(signature):
+        return _get_simple_reduction_kernel(
+            name, block_size, reduce_type, params, identity,
+            routine[0], routine[1], routine[2],
+            type_preamble, input_expr, output_expr, _preamble, options,
+            stage, warp)
 
 
 class simple_reduction_function(object):
@@ -177,23 +530,85 @@ class simple_reduction_function(object):
         self.identity = identity
         self._preamble = preamble
         self.nin = 1
-        self.nout = 1
+        # Each output of a reduction with multiple outputs is assigned by
+        # the post-map expression from the same reduced value.
+        self.nout = len(ops[0][1]) if ops else 1
         in_params = _get_param_info('T in0', True)
-        out_params = _get_param_info('T out0', False)
+        out_params = _get_param_info(
+            ', '.join(['T out%d' % i for i in range(self.nout)]), False)
         self._params = (
             in_params + out_params +
             _get_param_info('CIndexer _in_ind, CIndexer _out_ind', False) +
             _get_param_info('int32 _block_stride', True))
         self._input_expr = 'const type_in0_raw in0 = _raw_in0[_in_ind.get()];'
-        self._output_expr = 'type_out0_raw &out0 = _raw_out0[_out_ind.get()];'
+        self._output_expr = '\n'.join([
+            'type_out{0}_raw &out{0} = _raw_out{0}[_out_ind.get()];'.format(i)
+            for i in range(self.nout)])
         self._routine_cache = {}
 
-    def __call__(self, ndarray a, axis=None, dtype=None, ndarray out=None,
+    def __call__(self, ndarray a, axis=None, dtype=None, out=None,
                  bint keepdims=False):
+        cdef Py_ssize_t block_size, grid_cap
+        cdef Py_ssize_t in_size, out_size, n_partials, reduce_type_size
+        ret, kernel_args, inout_args, sizes = self._prepare(
+            a, axis, dtype, out, keepdims)
+        if kernel_args is None:
+            return ret
+
+        in_size, out_size, reduce_type_size = sizes
+        block_size = self._block_size
+        n_partials = _get_n_partials(
+            block_size, in_size, out_size, reduce_type_size)
+        if n_partials > 1:
+            _launch_two_stage_reduction(
+                self._get_kernel(
+                    *(kernel_args + (block_size, _PARTIAL_STAGE))),
+                self._get_kernel(
+                    *(kernel_args + (block_size, _FINALIZE_STAGE))),
+                inout_args, in_size, out_size, block_size, n_partials,
+                reduce_type_size, None)
+            return ret
+
+        grid_cap = 0
+        if autotune.is_enabled():
+            block_size, grid_cap = _tune_reduction(
+                _get_tuning_key(
+                    'reduction', self.name, kernel_args[1],
+                    (kernel_args[0], self.identity, self._preamble)),
+                functools.partial(self._get_kernel, *kernel_args),
+                inout_args, 1, False, in_size, out_size, None)
+        kern = self._get_kernel(*(kernel_args + (block_size,)))
+        _launch_reduction(kern, inout_args, in_size, out_size, block_size,
+                          grid_cap, None)
+        return ret
+
+    def precompile(self, ndarray a, axis=None, dtype=None, out=None,
+                   bint keepdims=False):
+        """Compiles the kernels for the arguments in the background.
+
+        See :meth:`ReductionKernel.precompile` for the details.
+
+        Returns:
+            cupy.cuda.compiler.CompileFuture: Future of the compiled kernel,
+            or of the tuple of the kernels of the two stages.
+
+        """
+        ret, kernel_args, inout_args, sizes = self._prepare(
+            a, axis, dtype, out, keepdims)
+        return _submit_reduction_kernels(
+            functools.partial(self._get_kernel, *(kernel_args or ())),
+            self._block_size, sizes,
+            (self, device.get_device_id(), kernel_args))
+
+    def _prepare(self, ndarray a, axis, dtype, out, bint keepdims):
+        # Returns the return value, the arguments to get the kernel except
+        # the block size, the arguments of the kernel and the input and
+        # output sizes with the size of the reduce type. The arguments are
+        # None if the kernel need not be invoked.
         cdef list in_args, out_args
         cdef tuple in_sahpe, reduce_axis, out_axis
-        cdef Py_ssize_t block_size, reduce_block_size, block_stride
-        cdef Py_ssize_t out_block_num
+        cdef Py_ssize_t block_size, block_stride
+        cdef Py_ssize_t in_size, out_size, reduce_type_size
         if dtype is not None:
             dtype = get_dtype(dtype).type
 
@@ -203,8 +618,10 @@ class simple_reduction_function(object):
             _preprocess_args((a,))
             out_args = []
         else:
-            _preprocess_args((a, out))
-            out_args = [out]
+            out_args = [out] if self.nout == 1 else list(out)
+            if len(out_args) != self.nout:
+                raise ValueError('Invalid number of output arguments')
+            _preprocess_args([a] + out_args)
 
         in_types, out_types, routine = _guess_routine(
             self.name, self._routine_cache, self._ops, in_args, dtype)
@@ -215,7 +632,7 @@ class simple_reduction_function(object):
         out_args = _get_out_args(out_args, out_types, out_shape, 'unsafe')
         ret = out_args[0] if len(out_args) == 1 else tuple(out_args)
         if (<ndarray>out_args[0]).size == 0:
-            return ret
+            return ret, None, None, None
         if a.size == 0 and self.identity is None:
             raise ValueError(('zero-size array to reduction operation'
                               ' %s which has no identity') % self.name)
@@ -226,34 +643,42 @@ class simple_reduction_function(object):
         block_size = self._block_size
         in_indexer = Indexer(in_shape)
         out_indexer = Indexer(out_shape)
-        reduce_block_size = max(
-            1, internal.clp2(in_indexer.size // out_indexer.size))
-        block_stride = max(1, block_size // reduce_block_size)
+        in_size = in_indexer.size
+        out_size = out_indexer.size
+        block_stride = _get_block_stride(block_size, in_size, out_size)
 
         inout_args = _get_inout_args(
             in_args, out_args, in_indexer, out_indexer, block_stride,
             self._params, True)
         args_info = _get_args_info(inout_args)
-
-        kern = _get_simple_reduction_function(
-            routine, self._params, args_info,
-            in_args[0].dtype.type, out_args[0].dtype.type, out_types,
-            self.name, block_size, self.identity,
-            self._input_expr, self._output_expr, self._preamble, ())
-
-        out_block_num = (
-            out_indexer.size + block_stride - 1) // block_stride
-
-        kern.linear_launch(
-            out_block_num * block_size, inout_args, 0, block_size)
-        return ret
+        in_arg_dtype = in_args[0].dtype.type
+        out_arg_dtypes = tuple([x.dtype.type for x in out_args])
+        reduce_type = routine[3]
+        if reduce_type is None:
+            reduce_type = _get_typename(out_types[0])
+        reduce_type_size = _get_reduce_type_size(
+            reduce_type, [('type_in0_raw', in_arg_dtype)] + [
+                ('type_out%d_raw' % i, t)
+                for i, t in enumerate(out_arg_dtypes)])
+        kernel_args = (routine, args_info, in_arg_dtype, out_arg_dtypes,
+                       out_types, _use_warp_reduce(reduce_type_size))
+        return ret, kernel_args, inout_args, (
+            in_size, out_size, reduce_type_size)
+
+    def _get_kernel(self, routine, args_info, in_arg_dtype, out_arg_dtypes,
+                    out_types, warp, block_size, stage=_SINGLE_STAGE):
+        return _get_simple_reduction_function(
+            routine, self._params, args_info, in_arg_dtype, out_arg_dtypes,
+            out_types, self.name, block_size, self.identity,
+            self._input_expr, self._output_expr, self._preamble, (), warp,
+            stage)
 
 
 @util.memoize(for_each_device=True)
 def _get_reduction_kernel(
         nin, nout, params, args_info, types,
         name, block_size, reduce_type, identity, map_expr, reduce_expr,
-        post_map_expr, preamble, options):
+        post_map_expr, preamble, options, warp, stage):
     kernel_params = _get_kernel_params(params, args_info)
     params = params[:nin + nout]
     args_info = args_info[:nin + nout]
@@ -275,7 +700,14 @@ def _get_reduction_kernel(
     return _get_simple_reduction_kernel(
         name, block_size, reduce_type, kernel_params, identity,
         map_expr, reduce_expr, post_map_expr,
-        type_preamble, input_expr, output_expr, preamble, options)
+        type_preamble, input_expr, output_expr, preamble, options, stage,
+        warp)
+
+
+def _get_reduction_kernel_with_block_size(
+        tuple kernel_args, block_size, stage=_SINGLE_STAGE):
+    return _get_reduction_kernel(
+        *(kernel_args[:6] + (block_size,) + kernel_args[7:] + (stage,)))
 
 
 class ReductionKernel(object):
@@ -296,12 +728,20 @@ class ReductionKernel(object):
         out_params (str): Output argument list.
         map_expr (str): Mapping expression for input values.
         reduce_expr (str): Reduction expression.
-        post_map_expr (str): Mapping expression for reduced values.
+        post_map_expr (str): Mapping expression for reduced values. It
+            assigns all the outputs, e.g., ``'y = a.value, i = a.index'``.
+            A tuple of the expressions of the outputs can also be given.
         identity (str): Identity value for starting the reduction.
         name (str): Name of the kernel function. It should be set for
             readability of the performance profiling.
-        reduce_type (str): Type of values to be used for reduction. This type
-            is used to store the special variables ``a``.
+        reduce_type (str or tuple of str): Type of values to be used for
+            reduction. This type is used to store the special variables
+            ``a``. If a tuple of types is given, the values are structs whose
+            ``i``-th member ``_i`` is of the ``i``-th type, and
+            ``map_expr``, ``reduce_expr`` and ``identity`` can be tuples of
+            the expressions of the members, e.g.,
+            ``('x', 'x * x')``, ``('a._0 + b._0', 'a._1 + b._1')`` and
+            ``('0', '0')``.
         reduce_dims (bool): If ``True``, input arrays are reshaped without copy
             to smaller dimensions for efficiency.
         preamble (str): Fragment of the CUDA-C/C++ code that is inserted at the
@@ -359,13 +799,79 @@ class ReductionKernel(object):
             ``__init__`` method.
 
         """
-        cdef Py_ssize_t block_size, reduce_block_size, block_stride
-        cdef Py_ssize_t out_block_num
+        stream = kwargs.pop('stream', None)
+        ret, kernel_args, inout_args, sizes = self._prepare(args, kwargs)
+        if kernel_args is None:
+            return ret
+
+        in_size, out_size, reduce_type_size = sizes
+        block_size = kernel_args[6]
+        n_partials = _get_n_partials(
+            block_size, in_size, out_size, reduce_type_size)
+        if n_partials > 1:
+            _launch_two_stage_reduction(
+                _get_reduction_kernel_with_block_size(
+                    kernel_args, block_size, _PARTIAL_STAGE),
+                _get_reduction_kernel_with_block_size(
+                    kernel_args, block_size, _FINALIZE_STAGE),
+                inout_args, in_size, out_size, block_size, n_partials,
+                reduce_type_size, stream)
+            return ret
+
+        grid_cap = 0
+        if autotune.is_enabled():
+            block_size, grid_cap = _tune_reduction(
+                _get_tuning_key('reduction', self.name, kernel_args[3],
+                                kernel_args[4:6] + kernel_args[7:]),
+                functools.partial(
+                    _get_reduction_kernel_with_block_size, kernel_args),
+                inout_args, self.nin, True, in_size, out_size, stream)
+        kern = _get_reduction_kernel_with_block_size(kernel_args, block_size)
+        _launch_reduction(kern, inout_args, in_size, out_size, block_size,
+                          grid_cap, stream)
+        return ret
+
+    def precompile(self, *args, **kwargs):
+        """Compiles the kernel for the arguments in the background.
+
+        The kernel is compiled by the default
+        :class:`~cupy.cuda.compiler.CompileExecutor` but not invoked, so
+        that the following calls with arguments of the same dtypes,
+        dimensions, axis and sizes do not wait for the compilation. The output
+        arrays are allocated if not given, as in :meth:`__call__`.
+
+        Args:
+            args: Arguments of the kernel.
+            axis (int or tuple of ints): Axis or axes along which the
+                reduction is performed.
+            keepdims (bool): If ``True``, the specified axes are remained as
+                axes of length one.
+
+        Returns:
+            cupy.cuda.compiler.CompileFuture: Future of the compiled kernel.
+            If the reduction is split into two stages for the arguments,
+            the result is the tuple of the kernels of the partial and the
+            finalize stages. The result is ``None`` if the kernel is not
+            needed for the arguments, e.g., for empty arrays.
+
+        """
+        ret, kernel_args, inout_args, sizes = self._prepare(args, kwargs)
+        return _submit_reduction_kernels(
+            functools.partial(
+                _get_reduction_kernel_with_block_size, kernel_args),
+            kernel_args[6] if kernel_args is not None else 0, sizes,
+            (device.get_device_id(), kernel_args))
+
+    def _prepare(self, args, kwargs):
+        # Returns the return value, the arguments to get the kernel, the
+        # arguments of the kernel and the input and output sizes with the
+        # size of the reduce type. The arguments are None if the kernel need
+        # not be invoked.
+        cdef Py_ssize_t block_size, block_stride
 
         out = kwargs.pop('out', None)
         axis = kwargs.pop('axis', None)
         keepdims = kwargs.pop('keepdims', False)
-        stream = kwargs.pop('stream', None)
         if kwargs:
             raise TypeError('Wrong arguments %s' % kwargs)
 
@@ -375,12 +881,12 @@ class ReductionKernel(object):
 
         out_args = list(args[self.nin:])
         if out is not None:
-            if self.nout != 1:
-                raise NotImplementedError('')
             if len(out_args) != 0:
                 raise ValueError("cannot specify 'out' as both "
                                  "a positional and keyword argument")
-            out_args = [out]
+            out_args = [out] if self.nout == 1 else list(out)
+            if len(out_args) != self.nout:
+                raise ValueError('Invalid number of output arguments')
 
         in_args = _preprocess_args(args[:self.nin])
         out_args = _preprocess_args(out_args)
@@ -405,9 +911,9 @@ class ReductionKernel(object):
             broad_shape, reduce_axis, out_axis, keepdims)
         out_args = _get_out_args_with_params(
             out_args, out_types, out_shape, self.out_params, False)
-        ret = out_args[0]
+        ret = out_args[0] if self.nout == 1 else tuple(out_args)
         if 0 in out_shape:
-            return ret
+            return ret, None, None, None
 
         in_args = [x if isinstance(x, ndarray) else
                    _scalar.get_scalar_from_numpy(x, t)
@@ -418,27 +924,23 @@ class ReductionKernel(object):
         block_size = 512
         in_indexer = Indexer(in_shape)
         out_indexer = Indexer(out_shape)
-        reduce_block_size = max(
-            1, internal.clp2(in_indexer.size // out_indexer.size))
-        block_stride = max(1, block_size // reduce_block_size)
+        block_stride = _get_block_stride(
+            block_size, in_indexer.size, out_indexer.size)
 
         inout_args = _get_inout_args(
             in_args, out_args, in_indexer, out_indexer, block_stride,
             self.params, self.reduce_dims)
         args_info = _get_args_info(inout_args)
+        reduce_type_size = _get_reduce_type_size(self.reduce_type, types)
 
-        kern = _get_reduction_kernel(
+        kernel_args = (
             self.nin, self.nout, self.params, args_info, types,
             self.name, block_size, self.reduce_type, self.identity,
             self.map_expr, self.reduce_expr, self.post_map_expr,
-            self.preamble, self.options)
+            self.preamble, self.options, _use_warp_reduce(reduce_type_size))
 
-        out_block_num = (
-            out_indexer.size + block_stride - 1) // block_stride
-
-        kern.linear_launch(
-            out_block_num * block_size, inout_args, 0, block_size, stream)
-        return ret
+        return (ret, kernel_args, inout_args,
+                (in_indexer.size, out_indexer.size, reduce_type_size))
 
 
 cpdef create_reduction_func(name, ops, routine=None, identity=None,
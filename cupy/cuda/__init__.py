@@ -1,6 +1,7 @@
 import contextlib
 import os
 
+from cupy.cuda import autotune  # NOQA
 from cupy.cuda import compiler  # NOQA
 from cupy.cuda import device  # NOQA
 from cupy.cuda import driver  # NOQA
@@ -76,13 +77,16 @@ from cupy.cuda.device import get_cublas_handle  # NOQA
 from cupy.cuda.device import get_device_id  # NOQA
 from cupy.cuda.function import Function  # NOQA
 from cupy.cuda.function import Module  # NOQA
+from cupy.cuda.memory import add_reclaim_callback  # NOQA
 from cupy.cuda.memory import alloc  # NOQA
 from cupy.cuda.memory import BaseMemory  # NOQA
+from cupy.cuda.memory import get_reclaim_stats  # NOQA
 from cupy.cuda.memory import malloc_managed  # NOQA
 from cupy.cuda.memory import ManagedMemory  # NOQA
 from cupy.cuda.memory import Memory  # NOQA
 from cupy.cuda.memory import MemoryPointer  # NOQA
 from cupy.cuda.memory import MemoryPool  # NOQA
+from cupy.cuda.memory import remove_reclaim_callback  # NOQA
 from cupy.cuda.memory import set_allocator  # NOQA
 from cupy.cuda.memory import UnownedMemory  # NOQA
 from cupy.cuda.memory_hook import MemoryHook  # NOQA
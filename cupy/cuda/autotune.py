@@ -0,0 +1,251 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from cupy.cuda import compiler
+from cupy.cuda import device
+from cupy.cuda import driver
+from cupy.cuda import runtime
+from cupy.cuda import stream as stream_module
+
+
+_enabled = compiler._get_bool_env_variable('CUPY_AUTOTUNE', False)
+_persist = compiler._get_bool_env_variable('CUPY_AUTOTUNE_PERSIST', False)
+
+_n_warmup = 1
+_n_trials = 3
+
+# Map from (device_id, kernel key, shape class) to (config, time).
+_configs = {}
+# Map from device ID to the description used in the persistent keys.
+_device_descs = {}
+# Map from cache directory to the configs stored in the file.
+_stored_configs = {}
+_lock = threading.RLock()
+
+_configs_name = 'autotune.json'
+_configs_version = 1
+
+
+def is_enabled():
+    """Returns whether the launch configurations are autotuned.
+
+    Autotuning is disabled by default. It is enabled by the environment
+    variable ``CUPY_AUTOTUNE=1`` or by :func:`set_enabled`.
+
+    """
+    return _enabled
+
+
+def set_enabled(enabled=True, persist=None):
+    """Enables or disables autotuning of the launch configurations.
+
+    When enabled, elementwise and reduction kernels benchmark a few launch
+    configurations the first time a combination of a kernel, a shape class
+    and a device is seen, and use the fastest one for the following calls.
+
+    Args:
+        enabled (bool): If ``True``, autotuning is enabled.
+        persist (bool): If ``True``, the chosen configurations are also
+            stored in ``autotune.json`` under the kernel cache directory
+            and reused by other processes. If ``None``, the current setting
+            (``CUPY_AUTOTUNE_PERSIST`` by default) is kept.
+
+    """
+    global _enabled, _persist
+    _enabled = bool(enabled)
+    if persist is not None:
+        _persist = bool(persist)
+
+
+def get_shape_class(*sizes):
+    """Returns the shape class of sizes.
+
+    Sizes in the same power-of-two interval belong to the same class.
+
+    """
+    return tuple([int(size).bit_length() for size in sizes])
+
+
+def _get_device_desc(device_id):
+    desc = _device_descs.get(device_id)
+    if desc is None:
+        dev = device.Device(device_id)
+        n_sm = runtime.deviceGetAttribute(
+            runtime.cudaDevAttrMultiProcessorCount, device_id)
+        desc = 'sm_%s/%d' % (dev.compute_capability, n_sm)
+        _device_descs[device_id] = desc
+    return desc
+
+
+def get_multiprocessor_count():
+    """Returns the number of multiprocessors of the current device."""
+    return int(_get_device_desc(device.get_device_id()).split('/')[1])
+
+
+def _get_persistent_key(device_id, key, shape_class):
+    return '%s|%s|%s' % (_get_device_desc(device_id), key,
+                         ','.join([str(c) for c in shape_class]))
+
+
+def _load_stored_configs(cache_dir):
+    path = os.path.join(cache_dir, _configs_name)
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if data.get('version') != _configs_version:
+        return {}
+    return data.get('configs', {})
+
+
+def _get_stored_configs(cache_dir):
+    configs = _stored_configs.get(cache_dir)
+    if configs is None:
+        configs = _load_stored_configs(cache_dir)
+        _stored_configs[cache_dir] = configs
+    return configs
+
+
+def _store_config(cache_dir, persistent_key, config, time):
+    # Merges the entries written by other processes before saving.
+    configs = _load_stored_configs(cache_dir)
+    configs[persistent_key] = {'config': list(config), 'time': time}
+    _stored_configs[cache_dir] = configs
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            if not os.path.isdir(cache_dir):
+                raise
+    with tempfile.NamedTemporaryFile(
+            mode='w', dir=cache_dir, delete=False) as tf:
+        json.dump({'version': _configs_version, 'configs': configs}, tf,
+                  indent=1, sort_keys=True)
+        temp_path = tf.name
+    shutil.move(temp_path, os.path.join(cache_dir, _configs_name))
+
+
+def get_config(key, shape_class):
+    """Returns the tuned configuration of a kernel on the current device.
+
+    Args:
+        key (str): Key of the kernel.
+        shape_class (tuple of ints): Shape class of the arguments. See
+            :func:`get_shape_class`.
+
+    Returns:
+        tuple: The configuration, or ``None`` if it has not been tuned.
+
+    """
+    device_id = device.get_device_id()
+    entry = _configs.get((device_id, key, shape_class))
+    if entry is not None:
+        return entry[0]
+    if not _persist:
+        return None
+    with _lock:
+        stored = _get_stored_configs(compiler.get_cache_dir()).get(
+            _get_persistent_key(device_id, key, shape_class))
+        if stored is None:
+            return None
+        config = tuple(stored['config'])
+        _configs[device_id, key, shape_class] = (config, stored['time'])
+        return config
+
+
+def _measure(run, config, stream):
+    for _ in range(_n_warmup):
+        run(config)
+    start = stream_module.Event()
+    end = stream_module.Event()
+    start.record(stream)
+    for _ in range(_n_trials):
+        run(config)
+    end.record(stream)
+    end.synchronize()
+    return stream_module.get_elapsed_time(start, end) / _n_trials
+
+
+def tune(key, shape_class, candidates, run, stream=None):
+    """Chooses the fastest configuration of a kernel.
+
+    Each candidate is launched by ``run`` and timed with CUDA events
+    recorded on ``stream``. The fastest one is cached for the current
+    device, and also stored on disk if persistence is enabled. Candidates
+    that fail to launch, e.g., due to the lack of resources, are skipped.
+
+    Args:
+        key (str): Key of the kernel.
+        shape_class (tuple of ints): Shape class of the arguments.
+        candidates (list of tuples): Configurations to try.
+        run (callable): Function that launches the kernel once with a
+            configuration given as the argument. It must be safe to call
+            repeatedly.
+        stream (cupy.cuda.Stream): Stream on which ``run`` launches the
+            kernel. If ``None``, the current stream is used.
+
+    Returns:
+        tuple: The fastest configuration.
+
+    """
+    if stream is None:
+        stream = stream_module.get_current_stream()
+    best = None
+    best_time = None
+    error = None
+    for config in candidates:
+        try:
+            time = _measure(run, config, stream)
+        except driver.CUDADriverError as e:
+            error = e
+            continue
+        if best is None or time < best_time:
+            best = config
+            best_time = time
+    if best is None:
+        raise error
+
+    device_id = device.get_device_id()
+    with _lock:
+        _configs[device_id, key, shape_class] = (best, best_time)
+        if _persist:
+            _store_config(
+                compiler.get_cache_dir(),
+                _get_persistent_key(device_id, key, shape_class),
+                best, best_time)
+    return best
+
+
+def get_configs():
+    """Returns the tuned configurations.
+
+    Returns:
+        list of dict: Each entry has ``device`` (device ID), ``kernel`` (key
+        of the kernel), ``shape_class``, ``config`` (the chosen
+        configuration) and ``time`` (elapsed time of the configuration in
+        milliseconds). Configurations of reduction kernels are
+        ``(block_size, grid_cap)``, and those of elementwise kernels are
+        ``(block_size,)``.
+
+    """
+    with _lock:
+        return [{'device': device_id, 'kernel': key,
+                 'shape_class': shape_class, 'config': config, 'time': time}
+                for (device_id, key, shape_class), (config, time)
+                in sorted(_configs.items())]
+
+
+def clear_configs():
+    """Clears the tuned configurations in memory.
+
+    The configurations stored on disk are kept. They can be removed by
+    deleting ``autotune.json`` in the kernel cache directory.
+
+    """
+    with _lock:
+        _configs.clear()
+        _stored_configs.clear()
@@ -1,10 +1,17 @@
+import atexit
+import contextlib
 import hashlib
+import json
 import math
+import mmap
+import multiprocessing
 import os
 import re
 import shutil
+import struct
 import sys
 import tempfile
+import threading
 
 import six
 
@@ -70,23 +77,19 @@ def compile_using_nvrtc(source, options=(), arch=None, filename='kern.cu'):
 
     options += ('-arch={}'.format(arch),)
 
-    with TemporaryDirectory() as root_dir:
-        cu_path = os.path.join(root_dir, filename)
-
-        with open(cu_path, 'w') as cu_file:
-            cu_file.write(source)
-
-        prog = _NVRTCProgram(source, cu_path)
-        try:
-            ptx = prog.compile(options)
-        except CompileException as e:
-            dump = _get_bool_env_variable(
-                'CUPY_DUMP_CUDA_SOURCE_ON_ERROR', False)
-            if dump:
-                e.dump(sys.stderr)
-            raise
+    # NVRTC compiles the source in memory. The file name is only used in
+    # the messages.
+    prog = _NVRTCProgram(source, filename)
+    try:
+        ptx = prog.compile(options)
+    except CompileException as e:
+        dump = _get_bool_env_variable(
+            'CUPY_DUMP_CUDA_SOURCE_ON_ERROR', False)
+        if dump:
+            e.dump(sys.stderr)
+        raise
 
-        return ptx
+    return ptx
 
 
 def _preprocess(source, options, arch):
@@ -113,6 +116,270 @@ def get_cache_dir():
     return os.environ.get('CUPY_CACHE_DIR', _default_cache_dir)
 
 
+def _get_int_env_variable(name, default):
+    val = os.environ.get(name)
+    if val is None or len(val) == 0:
+        return default
+    return int(val)
+
+
+def get_cache_max_size():
+    """Returns the maximum total size in bytes of the kernel cache.
+
+    The value is taken from ``CUPY_CACHE_MAX_SIZE``. ``0`` means unlimited.
+    """
+    return _get_int_env_variable('CUPY_CACHE_MAX_SIZE', 0)
+
+
+def get_cache_max_entries():
+    """Returns the maximum number of kernels in the kernel cache.
+
+    The value is taken from ``CUPY_CACHE_MAX_ENTRIES``. ``0`` means
+    unlimited.
+    """
+    return _get_int_env_variable('CUPY_CACHE_MAX_ENTRIES', 0)
+
+
+_cache_stats_name = 'cache_stats.log'
+
+# Map from a cache directory to [hits, misses] of the current process.
+_cache_stats = {}
+
+
+def _record_cache_lookup(cache_dir, hit):
+    stats = _cache_stats.get(cache_dir)
+    if stats is None:
+        stats = _cache_stats[cache_dir] = [0, 0]
+    stats[0 if hit else 1] += 1
+
+
+def _read_cache_stats(cache_dir):
+    hits = misses = 0
+    try:
+        with open(os.path.join(cache_dir, _cache_stats_name)) as f:
+            for line in f:
+                fields = line.split()
+                # A partial line may be left by a process being killed.
+                if len(fields) == 2:
+                    hits += int(fields[0])
+                    misses += int(fields[1])
+    except (IOError, OSError, ValueError):
+        pass
+    return hits, misses
+
+
+@atexit.register
+def _save_cache_stats():
+    # The counts of the process are added to those in the file, which is
+    # then replaced, so that the file stays a single line. The counts of
+    # processes exiting at the same time may be lost.
+    for cache_dir, (hits, misses) in _cache_stats.items():
+        saved_hits, saved_misses = _read_cache_stats(cache_dir)
+        try:
+            with tempfile.NamedTemporaryFile(
+                    'w', dir=cache_dir, delete=False) as tf:
+                tf.write('%d %d\n' % (saved_hits + hits,
+                                      saved_misses + misses))
+                temp_path = tf.name
+            shutil.move(temp_path, os.path.join(cache_dir, _cache_stats_name))
+        except (IOError, OSError):
+            pass
+    _cache_stats.clear()
+
+
+def get_cache_stats(cache_dir=None):
+    """Returns the hit and miss statistics of the kernel cache.
+
+    Statistics of processes that have exited are read from the cache
+    directory and those of the current process are added to them.
+
+    Args:
+        cache_dir (str): Cache directory. If ``None``, the value of
+            :func:`get_cache_dir` is used.
+
+    Returns:
+        dict: ``hits`` and ``misses`` of cache lookups.
+    """
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    hits, misses = _cache_stats.get(cache_dir, (0, 0))
+    saved_hits, saved_misses = _read_cache_stats(cache_dir)
+    return {'hits': hits + saved_hits, 'misses': misses + saved_misses}
+
+
+def reset_cache_stats(cache_dir=None):
+    """Clears the hit and miss statistics of the kernel cache."""
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    _cache_stats.pop(cache_dir, None)
+    try:
+        os.unlink(os.path.join(cache_dir, _cache_stats_name))
+    except OSError:
+        pass
+
+
+def list_cache(cache_dir=None):
+    """Lists the kernels in the kernel cache.
+
+    The modification time of a cache file is updated each time the kernel is
+    loaded from the cache, and is used as the last access time.
+
+    Args:
+        cache_dir (str): Cache directory. If ``None``, the value of
+            :func:`get_cache_dir` is used.
+
+    Returns:
+        list: A list of ``(path, size, last_access)`` tuples sorted from the
+        least recently used kernel. ``size`` includes the saved CUDA source
+        file if any.
+    """
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return []
+    names = set(names)
+    entries = []
+    for name in names:
+        if not name.endswith('.cubin'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            # Removed by another process.
+            continue
+        size = st.st_size
+        if name + '.cu' in names:
+            try:
+                size += os.path.getsize(path + '.cu')
+            except OSError:
+                pass
+        entries.append((path, size, st.st_mtime))
+    entries.sort(key=lambda entry: entry[2])
+    return entries
+
+
+def _remove_cache_entry(path):
+    for p in (path, path + '.cu'):
+        try:
+            os.unlink(p)
+        except OSError:
+            pass
+
+
+def prune_cache(cache_dir=None, max_size=None, max_entries=None):
+    """Removes the least recently used kernels from the kernel cache.
+
+    Kernels are removed until both the total size and the number of kernels
+    are within the limits.
+
+    Args:
+        cache_dir (str): Cache directory. If ``None``, the value of
+            :func:`get_cache_dir` is used.
+        max_size (int): Maximum total size in bytes. If ``None``, the value
+            of :func:`get_cache_max_size` is used. ``0`` means unlimited.
+        max_entries (int): Maximum number of kernels. If ``None``, the value
+            of :func:`get_cache_max_entries` is used. ``0`` means unlimited.
+
+    Returns:
+        list of str: Paths of the removed cache files.
+    """
+    if max_size is None:
+        max_size = get_cache_max_size()
+    if max_entries is None:
+        max_entries = get_cache_max_entries()
+    if max_size <= 0 and max_entries <= 0:
+        return []
+    return _prune_cache(cache_dir, max_size, max_entries)[0]
+
+
+def _within_cache_limits(total_size, n_entries, max_size, max_entries):
+    return ((max_size <= 0 or total_size <= max_size) and
+            (max_entries <= 0 or n_entries <= max_entries))
+
+
+def _prune_cache(cache_dir, max_size, max_entries):
+    # Returns the removed paths with the total size and the number of the
+    # remaining kernels.
+    entries = list_cache(cache_dir)
+    total_size = sum(entry[1] for entry in entries)
+    n_entries = len(entries)
+    removed = []
+    for path, size, _ in entries:
+        if _within_cache_limits(total_size, n_entries, max_size, max_entries):
+            break
+        _remove_cache_entry(path)
+        removed.append(path)
+        total_size -= size
+        n_entries -= 1
+    return removed, total_size, n_entries
+
+
+# Estimates of the total size, the number of kernels and the number of
+# misses since the last scan of each cache directory. The directory is
+# scanned only when the estimates exceed the limits, or every
+# _cache_scan_interval misses to count the kernels saved by other
+# processes.
+_cache_usage = {}
+_cache_scan_interval = 64
+
+
+def _prune_cache_on_miss(cache_dir, size):
+    max_size = get_cache_max_size()
+    max_entries = get_cache_max_entries()
+    if max_size <= 0 and max_entries <= 0:
+        return
+    usage = _cache_usage.get(cache_dir)
+    if usage is not None:
+        usage[0] += size
+        usage[1] += 1
+        usage[2] += 1
+        if (usage[2] < _cache_scan_interval and _within_cache_limits(
+                usage[0], usage[1], max_size, max_entries)):
+            return
+    _, total_size, n_entries = _prune_cache(cache_dir, max_size, max_entries)
+    _cache_usage[cache_dir] = [total_size, n_entries, 0]
+
+
+def _read_cache_file(path):
+    # Returns the cubin, or None if the file is corrupted.
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) >= 32:
+        hash = data[:32]
+        cubin = data[32:]
+        cubin_hash = six.b(hashlib.md5(cubin).hexdigest())
+        if hash == cubin_hash:
+            return cubin
+    return None
+
+
+def verify_cache(cache_dir=None, remove=False):
+    """Verifies the hashes of the kernels in the kernel cache.
+
+    Args:
+        cache_dir (str): Cache directory. If ``None``, the value of
+            :func:`get_cache_dir` is used.
+        remove (bool): If ``True``, corrupted files are removed.
+
+    Returns:
+        list of str: Paths of the corrupted cache files.
+    """
+    corrupted = []
+    for path, _, _ in list_cache(cache_dir):
+        try:
+            cubin = _read_cache_file(path)
+        except (IOError, OSError):
+            continue
+        if cubin is None:
+            corrupted.append(path)
+            if remove:
+                _remove_cache_entry(path)
+    return corrupted
+
+
 _empty_file_preprocess_cache = {}
 
 
@@ -125,6 +392,7 @@ def compile_with_cache(source, options=(), arch=None, cache_dir=None,
     if arch is None:
         arch = _get_arch()
 
+    orig_options = options
     options += ('-ftz=true',)
     if _get_bool_env_variable('CUPY_CUDA_COMPILE_WITH_DEBUG', False):
         options += ('--device-debug', '--generate-line-info')
@@ -133,39 +401,77 @@ def compile_with_cache(source, options=(), arch=None, cache_dir=None,
     base = _empty_file_preprocess_cache.get(env, None)
     if base is None:
         # This is checking of NVRTC compiler internal version
-        base = _preprocess('', options, arch)
+        base = _get_preprocess_fingerprint(env, options, arch, cache_dir)
         _empty_file_preprocess_cache[env] = base
     key_src = '%s %s %s %s' % (env, base, source, extra_source)
 
     key_src = key_src.encode('utf-8')
     name = '%s_2.cubin' % hashlib.md5(key_src).hexdigest()
 
-    if not os.path.isdir(cache_dir):
-        try:
-            os.makedirs(cache_dir)
-        except OSError:
-            if not os.path.isdir(cache_dir):
-                raise
+    if _recorders:
+        _record_kernel(name, source, orig_options, arch, extra_source)
+    device_id = device.get_device_id()
+    if _warm_modules:
+        mod = _warm_modules.pop((device_id, name), None)
+        if mod is not None:
+            return mod
+
+    # Identical compilations running in other threads are waited for
+    # instead of being run twice.
+    key = (device_id, cache_dir, name)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = _in_flight[key] = CompileFuture()
+    if not is_owner:
+        return future.result()
+    try:
+        mod = _load_or_compile(source, options, arch, cache_dir, name)
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(mod)
+        return mod
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
 
+
+def _load_or_compile(source, options, arch, cache_dir, name):
     mod = function.Module()
+    if get_cache_backend() == 'pack':
+        cache = _get_packed_cache(cache_dir)
+        cubin = cache.get(name)
+        _record_cache_lookup(cache_dir, cubin is not None)
+        if cubin is None:
+            cubin = _compile_cubin(source, options, arch, name)
+            cache.put(name, cubin)
+            cache.prune()
+        mod.load(cubin)
+        return mod
+
+    _make_cache_dir(cache_dir)
+
     # To handle conflicts in concurrent situation, we adopt lock-free method
     # to avoid performance degradation.
     path = os.path.join(cache_dir, name)
     if os.path.exists(path):
-        with open(path, 'rb') as file:
-            data = file.read()
-        if len(data) >= 32:
-            hash = data[:32]
-            cubin = data[32:]
-            cubin_hash = six.b(hashlib.md5(cubin).hexdigest())
-            if hash == cubin_hash:
-                mod.load(cubin)
-                return mod
+        cubin = _read_cache_file(path)
+        if cubin is not None:
+            # The modification time is used as the last access time for
+            # LRU eviction.
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            _record_cache_lookup(cache_dir, True)
+            mod.load(cubin)
+            return mod
+    _record_cache_lookup(cache_dir, False)
 
-    ptx = compile_using_nvrtc(source, options, arch, name + '.cu')
-    ls = function.LinkState()
-    ls.add_ptr_data(ptx, u'cupy.ptx')
-    cubin = ls.complete()
+    cubin = _compile_cubin(source, options, arch, name)
     cubin_hash = six.b(hashlib.md5(cubin).hexdigest())
 
     # shutil.move is not atomic operation, so it could result in a corrupted
@@ -178,14 +484,640 @@ def compile_with_cache(source, options=(), arch=None, cache_dir=None,
     shutil.move(temp_path, path)
 
     # Save .cu source file along with .cubin
+    size = len(cubin_hash) + len(cubin)
     if _get_bool_env_variable('CUPY_CACHE_SAVE_CUDA_SOURCE', False):
         with open(path + '.cu', 'w') as f:
             f.write(source)
+        size += len(source)
+
+    _prune_cache_on_miss(cache_dir, size)
 
     mod.load(cubin)
     return mod
 
 
+def _get_preprocess_fingerprint(env, options, arch, cache_dir):
+    # The output of NVRTC for the empty source is persisted in the cache
+    # directory, so that it is not computed in each process. Even if NVRTC
+    # is updated without changing the version, the cached kernels compiled
+    # by the old NVRTC are still valid for the architecture.
+    key = hashlib.md5(repr(env).encode('utf-8')).hexdigest()
+    path = os.path.join(cache_dir, 'nvrtc_%s.txt' % key)
+    try:
+        data = _read_cache_file(path)
+    except (IOError, OSError):
+        data = None
+    if data is not None:
+        return data.decode('utf-8')
+
+    base = _preprocess('', options, arch)
+    data = base.encode('utf-8')
+    try:
+        _make_cache_dir(cache_dir)
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as tf:
+            tf.write(six.b(hashlib.md5(data).hexdigest()))
+            tf.write(data)
+            temp_path = tf.name
+        shutil.move(temp_path, path)
+    except (IOError, OSError):
+        pass
+    return base
+
+
+def _make_cache_dir(cache_dir):
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            if not os.path.isdir(cache_dir):
+                raise
+
+
+def _compile_cubin(source, options, arch, name):
+    ptx = compile_using_nvrtc(source, options, arch, name + '.cu')
+    ls = function.LinkState()
+    ls.add_ptr_data(ptx, u'cupy.ptx')
+    return ls.complete()
+
+
+def get_cache_backend():
+    """Returns the backend of the kernel cache.
+
+    The value is taken from ``CUPY_CACHE_BACKEND``. ``'file'`` (default)
+    stores each kernel in a file, and ``'pack'`` stores all kernels in a
+    single packed file (see :class:`PackedKernelCache`).
+    """
+    backend = os.environ.get('CUPY_CACHE_BACKEND') or 'file'
+    if backend not in ('file', 'pack'):
+        raise ValueError('invalid CUPY_CACHE_BACKEND: %s' % backend)
+    return backend
+
+
+_pack_name = 'kernel_cache.pack'
+_pack_magic = b'CUPYKRN1'
+# magic, md5 of the key, length of the cubin, md5 of the cubin
+_pack_header = struct.Struct('<8s16sQ16s')
+
+
+class PackedKernelCache(object):
+
+    """Kernel cache stored in a single append-only file.
+
+    Each record consists of a header, which has the hashes of the key and
+    the cubin, and the cubin. The file is memory-mapped at the first lookup
+    and all the record headers are indexed at once, so that a lookup
+    does not touch the file system unless it misses the index. On a miss,
+    records appended by other processes are indexed before giving up.
+
+    Records are appended by a single ``write`` without locks, in the same
+    manner as the file backend. If records are corrupted, e.g., by
+    concurrent writes on a network file system, they are skipped while
+    indexing or detected by the hash of the cubin on lookup, and the kernel
+    is compiled again. If the file is replaced by the compaction in another
+    process, the index is rebuilt.
+
+    The compaction removes the least recently used records. The records are
+    ordered by the last hit in this process, or by the position in the file
+    for the others, and rewritten in that order, so that the order in the
+    file approximates the recency for the compactions in other processes.
+
+    Args:
+        cache_dir (str): Cache directory to store the packed file.
+    """
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(cache_dir, _pack_name)
+        self._cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._inode = None
+        self._scanned = 0
+        self._index = {}
+        # Map from the key to the tick of its last hit.
+        self._hits = {}
+        self._tick = 0
+
+    def _scan(self, rebuild=False):
+        # Indexes the records appended since the last scan.
+        try:
+            f = open(self.path, 'rb')
+        except (IOError, OSError):
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            if rebuild or st.st_ino != self._inode or size < self._scanned:
+                # The file has been replaced, e.g., compacted by another
+                # process.
+                self._index = {}
+                self._scanned = 0
+                self._inode = st.st_ino
+            if size <= self._scanned:
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mm
+
+        pos = self._scanned
+        header_size = _pack_header.size
+        while pos + header_size <= size:
+            magic, key, length, digest = _pack_header.unpack_from(mm, pos)
+            end = pos + header_size + length
+            if magic != _pack_magic or (
+                    end < size and
+                    mm[end:end + len(_pack_magic)] != _pack_magic):
+                # Skip to the next record.
+                pos = mm.find(_pack_magic, pos + 1)
+                if pos < 0:
+                    pos = size
+                continue
+            if end > size:
+                next_pos = mm.find(_pack_magic, pos + header_size)
+                if next_pos < 0:
+                    # Being written by another process.
+                    break
+                # Appends are not interleaved, so the record was truncated.
+                pos = next_pos
+                continue
+            self._index[key] = (pos + header_size, length, digest)
+            pos = end
+        self._scanned = pos
+
+    def get(self, name):
+        """Returns the cubin of the kernel, or ``None`` if not found."""
+        key = hashlib.md5(name.encode('utf-8')).digest()
+        for rebuild in (False, True):
+            with self._lock:
+                entry = None if rebuild else self._index.get(key)
+                if entry is None:
+                    self._scan(rebuild)
+                    entry = self._index.get(key)
+                    if entry is None:
+                        return None
+                offset, length, digest = entry
+                cubin = self._mmap[offset:offset + length]
+                if hashlib.md5(cubin).digest() == digest:
+                    self._tick += 1
+                    self._hits[key] = self._tick
+                    return cubin
+            # The index may be stale, so it is rebuilt once.
+        return None
+
+    def put(self, name, cubin):
+        """Appends the cubin of the kernel to the packed file."""
+        key = hashlib.md5(name.encode('utf-8')).digest()
+        record = _pack_header.pack(
+            _pack_magic, key, len(cubin),
+            hashlib.md5(cubin).digest()) + cubin
+        _make_cache_dir(self._cache_dir)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                     0o644)
+        try:
+            while record:
+                record = record[os.write(fd, record):]
+        finally:
+            os.close(fd)
+
+    def __len__(self):
+        with self._lock:
+            self._scan()
+            return len(self._index)
+
+    def prune(self, max_size=None, max_entries=None):
+        """Compacts the packed file if it exceeds the limits.
+
+        Args:
+            max_size (int): Maximum size in bytes. If ``None``, the value of
+                :func:`get_cache_max_size` is used. ``0`` means unlimited.
+            max_entries (int): Maximum number of kernels. If ``None``, the
+                value of :func:`get_cache_max_entries` is used. ``0`` means
+                unlimited.
+
+        Returns:
+            int: The number of removed kernels.
+        """
+        if max_size is None:
+            max_size = get_cache_max_size()
+        if max_entries is None:
+            max_entries = get_cache_max_entries()
+        if max_size <= 0 and max_entries <= 0:
+            return 0
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        if ((max_size <= 0 or size <= max_size) and
+                (max_entries <= 0 or len(self) <= max_entries)):
+            return 0
+        return self.compact(max_size, max_entries)
+
+    def compact(self, max_size=0, max_entries=0):
+        """Rewrites the packed file without stale or corrupted records.
+
+        Records appended by other processes during the compaction may be
+        lost, in which case the kernels are compiled again.
+
+        Args:
+            max_size (int): Maximum size in bytes of the packed file. If
+                exceeded, the least recently used records are removed. ``0``
+                means unlimited.
+            max_entries (int): Maximum number of kernels. If exceeded, the
+                least recently used records are removed. ``0`` means
+                unlimited.
+
+        Returns:
+            int: The number of removed kernels.
+        """
+        with self._lock:
+            self._scan()
+            if self._mmap is None:
+                return 0
+            records = []
+            for key, (offset, length, digest) in self._index.items():
+                cubin = self._mmap[offset:offset + length]
+                if hashlib.md5(cubin).digest() == digest:
+                    records.append((
+                        (self._hits.get(key, 0), offset), key,
+                        _pack_header.pack(
+                            _pack_magic, key, length, digest) + cubin))
+            # From the least recently used.
+            records.sort()
+            total_size = sum(len(record) for _, _, record in records)
+            while records and (
+                    (max_size > 0 and total_size > max_size) or
+                    (max_entries > 0 and len(records) > max_entries)):
+                _, key, record = records.pop(0)
+                total_size -= len(record)
+                self._hits.pop(key, None)
+            n_removed = len(self._index) - len(records)
+
+            with tempfile.NamedTemporaryFile(
+                    dir=self._cache_dir, delete=False) as tf:
+                for _, _, record in records:
+                    tf.write(record)
+                temp_path = tf.name
+            self._mmap.close()
+            self._mmap = None
+            self._scanned = 0
+            self._index = {}
+            shutil.move(temp_path, self.path)
+        return n_removed
+
+
+_packed_caches = {}
+_packed_caches_lock = threading.Lock()
+
+
+def _get_packed_cache(cache_dir):
+    with _packed_caches_lock:
+        cache = _packed_caches.get(cache_dir)
+        if cache is None:
+            cache = _packed_caches[cache_dir] = PackedKernelCache(cache_dir)
+    return cache
+
+
+class CompileFuture(object):
+
+    """Result of a compilation that may be running in another thread.
+
+    It has a subset of the interface of :class:`concurrent.futures.Future`.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    def done(self):
+        """Returns ``True`` if the compilation has finished."""
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """Waits for the compilation and returns the result.
+
+        If the compilation has failed, the exception is raised.
+
+        Args:
+            timeout (float): Seconds to wait for. If ``None``, waits
+                indefinitely.
+        """
+        if not self._event.wait(timeout):
+            raise RuntimeError('compilation has not finished in time')
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout=None):
+        """Waits for the compilation and returns the exception raised."""
+        if not self._event.wait(timeout):
+            raise RuntimeError('compilation has not finished in time')
+        return self._exception
+
+    def add_done_callback(self, fn):
+        """Calls ``fn(future)`` when the compilation finishes."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, result, exception):
+        with self._lock:
+            self._result = result
+            self._exception = exception
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+    def set_result(self, result):
+        self._finish(result, None)
+
+    def set_exception(self, exception):
+        self._finish(None, exception)
+
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+class CompileExecutor(object):
+
+    """Thread pool to compile kernels in the background.
+
+    NVRTC and the CUDA driver release the GIL while compiling and loading
+    kernels, so that kernels are compiled in parallel. Each task runs on
+    the device that is current when it is submitted. Tasks submitted with
+    the same key while one of them is running or pending share the same
+    future.
+
+    Args:
+        max_workers (int): Number of worker threads. If ``None``, the value
+            of ``CUPY_COMPILE_THREADS`` or the number of CPUs is used.
+    """
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = _get_int_env_variable(
+                'CUPY_COMPILE_THREADS', multiprocessing.cpu_count())
+        if max_workers <= 0:
+            raise ValueError('max_workers must be positive')
+        self.max_workers = max_workers
+        self._queue = six.moves.queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._threads = []
+        self._shutdown = False
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedules ``fn(*args, **kwargs)`` and returns its future.
+
+        Args:
+            fn: Function to call.
+            key: Hashable key to deduplicate the task. Optional.
+            args, kwargs: Arguments of ``fn``.
+
+        Returns:
+            CompileFuture: Future of the result.
+        """
+        key = kwargs.pop('key', None)
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('executor has been shut down')
+            if key is not None:
+                future = self._pending.get(key)
+                if future is not None:
+                    return future
+            future = CompileFuture()
+            if key is not None:
+                self._pending[key] = future
+            self._queue.put(
+                (future, key, device.get_device_id(), fn, args, kwargs))
+            if len(self._threads) < self.max_workers:
+                t = threading.Thread(target=self._worker)
+                t.daemon = True
+                t.start()
+                self._threads.append(t)
+        return future
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            future, key, device_id, fn, args, kwargs = task
+            try:
+                with device.Device(device_id):
+                    result = fn(*args, **kwargs)
+            except Exception as e:
+                exception = e
+            else:
+                exception = None
+            if key is not None:
+                with self._lock:
+                    del self._pending[key]
+            if exception is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exception)
+
+    def shutdown(self, wait=True):
+        """Stops the worker threads after the pending tasks finish."""
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for t in threads:
+                t.join()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_compile_executor():
+    """Returns the default :class:`CompileExecutor`."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = CompileExecutor()
+    return _executor
+
+
+_thread_local = threading.local()
+_recorders = []
+_recorders_lock = threading.Lock()
+
+# Map from (device ID, cache name) to the module loaded by warmup().
+_warm_modules = {}
+
+
+@contextlib.contextmanager
+def _kernel_signature(signature):
+    # Annotates kernels compiled in the block with the signature, e.g., the
+    # name and the dtypes of the ufunc, for kernel manifests.
+    prev = getattr(_thread_local, 'signature', None)
+    _thread_local.signature = signature
+    try:
+        yield
+    finally:
+        _thread_local.signature = prev
+
+
+def _record_kernel(name, source, options, arch, extra_source):
+    signature = getattr(_thread_local, 'signature', None)
+    entry = {
+        'name': name,
+        'source': source,
+        'options': list(options),
+        'arch': arch,
+        'signature': None if signature is None else list(signature),
+    }
+    with _recorders_lock:
+        for manifest in _recorders:
+            manifest._add(entry, extra_source)
+
+
+class KernelManifest(object):
+
+    """List of kernels compiled by a process.
+
+    A manifest records the source, the compile options and the architecture
+    of each kernel compiled by :func:`compile_with_cache`, together with the
+    signature (the name and the dtypes) of the ufunc or the reduction that
+    compiled the kernel. It is recorded by :func:`record_kernels` and used
+    by :func:`warmup` to load the kernels at startup.
+    """
+
+    def __init__(self):
+        self.kernels = []
+        self.extra_sources = {}
+        self._names = set()
+
+    def __len__(self):
+        return len(self.kernels)
+
+    def _add(self, entry, extra_source):
+        if entry['name'] in self._names:
+            return
+        self._names.add(entry['name'])
+        entry = dict(entry)
+        if extra_source is not None:
+            key = hashlib.md5(extra_source.encode('utf-8')).hexdigest()
+            self.extra_sources[key] = extra_source
+            entry['extra_source'] = key
+        else:
+            entry['extra_source'] = None
+        self.kernels.append(entry)
+
+    def save(self, file):
+        """Writes the manifest to a text file-like object as JSON."""
+        json.dump({'version': 1, 'kernels': self.kernels,
+                   'extra_sources': self.extra_sources}, file)
+
+    @classmethod
+    def load(cls, file):
+        """Reads a manifest written by :meth:`save`."""
+        data = json.load(file)
+        if data.get('version') != 1:
+            raise ValueError('unsupported kernel manifest')
+        manifest = cls()
+        manifest.extra_sources = data['extra_sources']
+        for entry in data['kernels']:
+            manifest._names.add(entry['name'])
+            manifest.kernels.append(entry)
+        return manifest
+
+
+@contextlib.contextmanager
+def record_kernels(manifest=None):
+    """Records kernels compiled or loaded from the cache in the block.
+
+    Kernels that have already been loaded in the process before the block
+    are not recorded, as they are memoized by the callers.
+
+    Example:
+        >>> with cupy.cuda.compiler.record_kernels() as manifest:
+        ...     # run a workload
+        ...     pass
+        >>> with open('kernels.json', 'w') as f:
+        ...     manifest.save(f)
+
+    Args:
+        manifest (KernelManifest): Manifest to add the kernels to. If
+            ``None``, a new manifest is created.
+
+    Yields:
+        KernelManifest: The manifest.
+    """
+    if manifest is None:
+        manifest = KernelManifest()
+    with _recorders_lock:
+        _recorders.append(manifest)
+    try:
+        yield manifest
+    finally:
+        with _recorders_lock:
+            _recorders.remove(manifest)
+
+
+def _warmup_kernel(entry, extra_sources, device_id):
+    extra_source = entry['extra_source']
+    if extra_source is not None:
+        extra_source = extra_sources[extra_source]
+    with device.Device(device_id):
+        mod = compile_with_cache(
+            entry['source'], tuple(entry['options']), entry['arch'],
+            extra_source=extra_source)
+    _warm_modules[(device_id, entry['name'])] = mod
+
+
+def warmup(manifest, n_threads=1):
+    """Compiles and loads the kernels in the manifest.
+
+    Kernels are compiled or loaded from the cache on the current device,
+    and are kept in the process so that the first call that needs each
+    kernel does not access the cache. Kernels compiled for a different
+    architecture from the current device are skipped.
+
+    Args:
+        manifest (KernelManifest): Manifest recorded by
+            :func:`record_kernels`.
+        n_threads (int): Number of threads to compile kernels in parallel.
+
+    Returns:
+        dict: ``loaded`` and ``skipped`` kernels.
+    """
+    device_id = device.get_device_id()
+    arch = _get_arch()
+    entries = [entry for entry in manifest.kernels
+               if entry['arch'] == arch and
+               (device_id, entry['name']) not in _warm_modules]
+    n_skipped = len(manifest.kernels) - len(entries)
+
+    if n_threads <= 1:
+        for entry in entries:
+            _warmup_kernel(entry, manifest.extra_sources, device_id)
+    else:
+        executor = CompileExecutor(n_threads)
+        try:
+            futures = [
+                executor.submit(_warmup_kernel, entry,
+                                manifest.extra_sources, device_id)
+                for entry in entries]
+            for future in futures:
+                future.result()
+        finally:
+            executor.shutdown()
+
+    return {'loaded': len(entries), 'skipped': n_skipped}
+
+
 class CompileException(Exception):
 
     def __init__(self, msg, source, name, options):
@@ -57,6 +57,19 @@ cdef class MemoryPool:
     cpdef size_t used_bytes(self)
     cpdef size_t free_bytes(self)
     cpdef size_t total_bytes(self)
+    cpdef set_limit(self, size=?, fraction=?)
+    cpdef size_t get_limit(self)
+    cpdef dict get_stats(self)
+    cpdef dict dump_arenas(self)
+    cpdef set_cross_stream_reuse(self, bint enabled)
+    cpdef bint get_cross_stream_reuse(self)
+    cpdef set_idle_release(self, double timeout=?, size_t high_water_mark=?,
+                           bint background=?)
+    cpdef size_t trim(self)
+    cpdef set_thread_cache_size(self, size_t size)
+    cpdef size_t get_thread_cache_size(self)
+    cpdef set_small_block_threshold(self, size_t size)
+    cpdef size_t get_small_block_threshold(self)
 
 
 @cython.no_gc
@@ -5,6 +5,10 @@ import atexit
 import collections
 import ctypes
 import gc
+import operator
+import os
+import threading
+import time
 import warnings
 import weakref
 
@@ -13,6 +17,7 @@ from cython.operator cimport dereference
 from fastrlock cimport rlock
 from libc.stdint cimport int8_t
 from libc.stdint cimport intptr_t
+from libc.stdint cimport uint64_t
 from libcpp cimport algorithm
 
 from cupy.cuda import runtime
@@ -34,9 +39,13 @@ def _exit():
 
 class OutOfMemoryError(MemoryError):
 
-    def __init__(self, size, total):
-        msg = 'out of memory to allocate %d bytes ' \
-              '(total %d bytes)' % (size, total)
+    def __init__(self, size, total, limit=0):
+        if limit == 0:
+            msg = 'out of memory to allocate %d bytes ' \
+                  '(total %d bytes)' % (size, total)
+        else:
+            msg = 'out of memory to allocate %d bytes ' \
+                  '(total %d bytes, limit %d bytes)' % (size, total, limit)
         super(OutOfMemoryError, self).__init__(msg)
 
 
@@ -170,6 +179,24 @@ cpdef _set_peer_access(int device, int peer):
 
 
 @cython.final
+@cython.final
+cdef class _FreeEvent:
+
+    """Event recorded on the stream of a chunk when the chunk is freed.
+
+    A stream that reuses the chunk of another stream waits for the event.
+    """
+
+    cdef:
+        size_t ptr
+
+    def __dealloc__(self):
+        if _exit_mode:
+            return  # To avoid error at exit
+        if self.ptr != 0:
+            runtime.eventDestroy(self.ptr)
+
+
 cdef class _Chunk:
 
     """A chunk points to a device memory.
@@ -202,6 +229,13 @@ cdef class _Chunk:
         public _Chunk prev
         public _Chunk next
 
+        # Time when the chunk was returned to the pool (see `trim`).
+        readonly double free_time
+
+        # Event recorded when the chunk was returned to the pool, if
+        # cross-stream reuse is enabled.
+        _FreeEvent free_event
+
     def __init__(self, *args):
         # For debug
         mem, offset, size, stream_ptr = args
@@ -227,6 +261,7 @@ cdef class _Chunk:
         remaining = _Chunk.__new__(_Chunk)
         remaining._init(self.mem, self.offset + size, self.size - size,
                         self.stream_ptr)
+        remaining.free_time = self.free_time
         self.size = size
 
         if self.next is not None:
@@ -602,6 +637,210 @@ cdef class PooledMemory(BaseMemory):
         self.free()
 
 
+# Size of a pooled chunk packed with small blocks
+DEF SLAB_SIZE = 65536
+# Size of the smallest size class of small blocks
+DEF SLAB_MIN_BLOCK_SIZE = 32
+# for test
+_slab_size = SLAB_SIZE
+
+
+@cython.final
+cdef class _Slab:
+
+    """A pooled chunk divided into small blocks of the same size class.
+
+    Bits of ``bitmap`` are set for the blocks that are free.
+
+    Args:
+        memptr (~cupy.cuda.MemoryPointer): The pooled chunk.
+        block_size (int): Size of the blocks in bytes.
+        stream_ptr (size_t): Raw stream handle of cupy.cuda.Stream
+    """
+
+    cdef:
+        readonly MemoryPointer memptr
+        readonly size_t block_size
+        readonly size_t n_blocks
+        readonly size_t n_free
+        readonly size_t stream_ptr
+        vector.vector[uint64_t] bitmap
+
+    def __init__(self, MemoryPointer memptr, size_t block_size,
+                 size_t stream_ptr):
+        cdef size_t i
+        self.memptr = memptr
+        self.block_size = block_size
+        self.n_blocks = SLAB_SIZE // block_size
+        self.n_free = self.n_blocks
+        self.stream_ptr = stream_ptr
+        self.bitmap.assign((self.n_blocks + 63) // 64, <uint64_t>0)
+        for i in range(self.n_blocks):
+            self.bitmap[i // 64] |= (<uint64_t>1) << (i % 64)
+
+    cdef Py_ssize_t take(self):
+        """Marks a free block as used and returns its index (or -1)."""
+        cdef size_t i, j
+        cdef uint64_t word
+        for i in range(self.bitmap.size()):
+            word = self.bitmap[i]
+            if word == 0:
+                continue
+            j = 0
+            while not (word >> j) & 1:
+                j += 1
+            self.bitmap[i] = word & ~((<uint64_t>1) << j)
+            self.n_free -= 1
+            return i * 64 + j
+        return -1
+
+    cdef give(self, size_t index):
+        """Marks a used block as free."""
+        cdef uint64_t bit = (<uint64_t>1) << (index % 64)
+        assert not (self.bitmap[index // 64] & bit)
+        self.bitmap[index // 64] |= bit
+        self.n_free += 1
+
+
+@cython.final
+@cython.no_gc
+cdef class _SlabBlockMemory(BaseMemory):
+
+    """Memory allocation of a small block packed in a slab.
+
+    The instance of this class is created by memory pool allocator, so user
+    should not instantiate it by hand.
+
+    """
+
+    cdef:
+        readonly object pool
+        _Slab _slab
+        size_t _index
+
+    cpdef free(self):
+        """Returns the block to the slab it belongs to."""
+        cdef intptr_t ptr
+        ptr = self.ptr
+        if ptr == 0:
+            return
+        self.ptr = 0
+        pool = self.pool()
+        if pool is None:
+            return
+
+        size = self.size
+        if memory_hook._has_memory_hooks():
+            hooks = memory_hook.get_memory_hooks()
+            if hooks:
+                device_id = self.device_id
+                pmem_id = id(self)
+                hooks_values = hooks.values()
+                for hook in hooks_values:
+                    hook.free_preprocess(device_id=device_id,
+                                         mem_size=size,
+                                         mem_ptr=ptr,
+                                         pmem_id=pmem_id)
+                try:
+                    _free_small(<SingleDeviceMemoryPool>pool, self._slab,
+                                self._index)
+                finally:
+                    for hook in hooks_values:
+                        hook.free_postprocess(device_id=device_id,
+                                              mem_size=size,
+                                              mem_ptr=ptr,
+                                              pmem_id=pmem_id)
+                return
+        _free_small(<SingleDeviceMemoryPool>pool, self._slab, self._index)
+
+    def __dealloc__(self):
+        if _exit_mode:
+            return  # To avoid error at exit
+        self.free()
+
+
+cpdef size_t _round_small_size(size_t size):
+    """Rounds up the memory size to the size class of a small block."""
+    cdef size_t ret = SLAB_MIN_BLOCK_SIZE
+    while ret < size:
+        ret <<= 1
+    return ret
+
+
+cdef MemoryPointer _malloc_small(SingleDeviceMemoryPool pool, size_t size,
+                                 size_t stream_ptr):
+    cdef _Slab slab, s
+    cdef Py_ssize_t index = -1
+    cdef _SlabBlockMemory mem
+    cdef size_t block_size = _round_small_size(size)
+    key = (stream_ptr, block_size)
+
+    rlock.lock_fastrlock(pool._slab_lock, -1, True)
+    try:
+        slabs = pool._slabs.get(key)
+        if slabs is not None:
+            for s in slabs:
+                if s.n_free != 0:
+                    slab = s
+                    index = slab.take()
+                    break
+        if index < 0:
+            slab = _Slab(pool._malloc(SLAB_SIZE), block_size, stream_ptr)
+            # The list is looked up again since `_malloc` may release the
+            # empty slabs on the out-of-memory path.
+            pool._slabs.setdefault(key, []).append(slab)
+            index = slab.take()
+    finally:
+        rlock.unlock_fastrlock(pool._slab_lock)
+
+    mem = _SlabBlockMemory.__new__(_SlabBlockMemory)
+    mem.ptr = slab.memptr.ptr + index * block_size
+    mem.size = block_size
+    mem.device_id = pool._device_id
+    mem.pool = pool._weakref
+    mem._slab = slab
+    mem._index = index
+    return MemoryPointer(mem, 0)
+
+
+cdef _free_small(SingleDeviceMemoryPool pool, _Slab slab, size_t index):
+    cdef list slabs
+    rlock.lock_fastrlock(pool._slab_lock, -1, True)
+    try:
+        slab.give(index)
+        if slab.n_free != slab.n_blocks:
+            return
+        # Keep one empty slab per size class to avoid thrashing; the others
+        # are returned to the pool.
+        slabs = pool._slabs[(slab.stream_ptr, slab.block_size)]
+        for s in slabs:
+            if s is not slab and (<_Slab>s).n_free == (<_Slab>s).n_blocks:
+                slabs.remove(slab)
+                break
+    finally:
+        rlock.unlock_fastrlock(pool._slab_lock)
+
+
+cdef _release_empty_slabs(SingleDeviceMemoryPool pool, stream_ptr=None):
+    # Chunks of the empty slabs are returned to the pool when `empty` is
+    # discarded, i.e., after `_slab_lock` is released.
+    cdef list empty = []
+    cdef _Slab slab
+    rlock.lock_fastrlock(pool._slab_lock, -1, True)
+    try:
+        for key, slabs in list(pool._slabs.items()):
+            if stream_ptr is not None and key[0] != stream_ptr:
+                continue
+            for slab in list(slabs):
+                if slab.n_free == slab.n_blocks:
+                    slabs.remove(slab)
+                    empty.append(slab)
+            if not slabs:
+                del pool._slabs[key]
+    finally:
+        rlock.unlock_fastrlock(pool._slab_lock)
+
+
 cdef int _index_compaction_threshold = 512
 
 
@@ -626,6 +865,8 @@ cdef _compact_index(SingleDeviceMemoryPool pool, size_t stream_ptr, bint free):
             for chunk in free_list:
                 if chunk.prev is not None or chunk.next is not None:
                     keep_list.add(chunk)
+                else:
+                    _release_bytes(pool, chunk.size)
             if len(keep_list) == 0:
                 continue
             free_list = keep_list
@@ -642,6 +883,110 @@ cdef _compact_index(SingleDeviceMemoryPool pool, size_t stream_ptr, bint free):
         pool._arena_flag(stream_ptr).assign(new_index.size(), <int8_t>1)
 
 
+cdef object _get_chunk_from_other_streams(SingleDeviceMemoryPool pool,
+                                         size_t size, size_t stream_ptr):
+    # need self._free_lock
+    cdef set free_list
+    cdef size_t i, index, other_ptr
+    cdef _Chunk chunk, c, best = None
+    cdef size_t bin_index = _bin_index_from_size(size)
+    cdef vector.vector[size_t]* a_index
+    cdef vector.vector[int8_t]* a_flag
+
+    # Only non-split chunks are taken from other arenas, as chunks split
+    # from the same allocation must belong to the same stream to be merged.
+    for other_ptr, arena in pool._free.items():
+        if other_ptr == stream_ptr:
+            continue
+        a_index = pool._arena_index(other_ptr)
+        a_flag = pool._arena_flag(other_ptr)
+        index = <size_t>(
+            algorithm.lower_bound(a_index.begin(), a_index.end(), bin_index)
+            - a_index.begin())
+        for i in range(index, a_index.size()):
+            if a_flag.at(i) == 0:
+                continue
+            if best is not None and a_index.at(i) >= _bin_index_from_size(
+                    best.size):
+                break
+            chunk = None
+            for c in arena[i]:
+                if c.prev is None and c.next is None:
+                    chunk = c
+                    break
+            if chunk is not None:
+                best = chunk
+                break
+    if best is None:
+        return None
+
+    other_ptr = best.stream_ptr
+    _remove_from_free_list(pool._free[other_ptr],
+                           pool._arena_index(other_ptr),
+                           pool._arena_flag(other_ptr), best)
+    _wait_free_event(stream_ptr, best.free_event)
+    best.free_event = None
+    best.stream_ptr = stream_ptr
+    remaining = best.split(size)
+    if remaining is not None:
+        _append_to_free_list(pool._arena(stream_ptr),
+                             pool._arena_index(stream_ptr),
+                             pool._arena_flag(stream_ptr), remaining)
+    pool._n_cross_stream_reuses += 1
+    return best
+
+
+cdef _FreeEvent _record_free_event(SingleDeviceMemoryPool pool,
+                                   size_t stream_ptr):
+    # Records an event on the stream of a chunk being freed. Returns None if
+    # the stream has already been destroyed.
+    cdef _FreeEvent event = _FreeEvent.__new__(_FreeEvent)
+    with device.Device(pool._device_id):
+        event.ptr = runtime.eventCreateWithFlags(runtime.eventDisableTiming)
+        try:
+            runtime.eventRecord(event.ptr, stream_ptr)
+        except runtime.CUDARuntimeError:
+            return None
+    return event
+
+
+cdef _wait_free_event(size_t stream_ptr, _FreeEvent event):
+    # Makes `stream_ptr` wait for the work queued on the stream of a chunk
+    # before the chunk was freed.
+    if event is None:
+        # The chunk was freed before cross-stream reuse was enabled, or
+        # after its stream was destroyed.
+        runtime.deviceSynchronize()
+    else:
+        runtime.streamWaitEvent(stream_ptr, event.ptr)
+
+
+cdef bint _reserve_bytes(SingleDeviceMemoryPool pool, size_t size):
+    """Accounts ``size`` bytes about to be allocated from the allocator.
+
+    Returns:
+        bool: ``False`` if the allocation would exceed the limit of the pool.
+    """
+    cdef size_t total
+    rlock.lock_fastrlock(pool._total_bytes_lock, -1, True)
+    try:
+        total = pool._total_bytes + size
+        if pool._total_bytes_limit != 0 and total > pool._total_bytes_limit:
+            return False
+        pool._total_bytes = total
+        return True
+    finally:
+        rlock.unlock_fastrlock(pool._total_bytes_lock)
+
+
+cdef _release_bytes(SingleDeviceMemoryPool pool, size_t size):
+    rlock.lock_fastrlock(pool._total_bytes_lock, -1, True)
+    try:
+        pool._total_bytes -= size
+    finally:
+        rlock.unlock_fastrlock(pool._total_bytes_lock)
+
+
 cdef object _get_chunk(SingleDeviceMemoryPool pool, size_t size,
                        size_t stream_ptr):
     # need self._free_lock
@@ -666,6 +1011,7 @@ cdef object _get_chunk(SingleDeviceMemoryPool pool, size_t size,
             arena[i] = None
         if i - index >= _index_compaction_threshold:
             _compact_index(pool, stream_ptr, False)
+        chunk.free_event = None
         remaining = chunk.split(size)
         if remaining is not None:
             _append_to_free_list(arena, a_index, a_flag, remaining)
@@ -675,25 +1021,162 @@ cdef object _get_chunk(SingleDeviceMemoryPool pool, size_t size,
 
 
 cdef BaseMemory _try_malloc(SingleDeviceMemoryPool pool, size_t size):
+    cdef BaseMemory mem = None
+    cdef _ReclaimCallback callback
+    if not _reserve_bytes(pool, size):
+        # Release cached chunks in all arenas before giving up.
+        pool._n_malloc_retries += 1
+        pool.free_all_blocks()
+        if not _reserve_bytes(pool, size):
+            for callback in _get_reclaim_callbacks():
+                pool._n_malloc_retries += 1
+                callback._reclaim(pool, size)
+                if _reserve_bytes(pool, size):
+                    break
+            else:
+                raise OutOfMemoryError(size, pool._total_bytes,
+                                       pool._total_bytes_limit)
+    try:
+        mem = _malloc_with_retry(pool, size)
+    finally:
+        if mem is None:
+            _release_bytes(pool, size)
+    if mem is not None:
+        return mem
+    total = size + pool.total_bytes()
+    raise OutOfMemoryError(size, total)
+
+
+cdef BaseMemory _malloc_with_retry(SingleDeviceMemoryPool pool, size_t size):
+    cdef BaseMemory mem
+    cdef _ReclaimCallback callback
+    mem = _alloc_or_none(pool, size)
+    if mem is not None:
+        return mem
+    pool._n_malloc_retries += 1
+    pool.free_all_blocks()
+    mem = _alloc_or_none(pool, size)
+    if mem is not None:
+        return mem
+    for callback in _get_reclaim_callbacks():
+        pool._n_malloc_retries += 1
+        callback._reclaim(pool, size)
+        mem = _alloc_or_none(pool, size)
+        if mem is not None:
+            return mem
+    pool._n_malloc_retries += 1
+    gc.collect()
+    return _alloc_or_none(pool, size)
+
+
+cdef BaseMemory _alloc_or_none(SingleDeviceMemoryPool pool, size_t size):
     try:
         return pool._alloc(size).mem
     except runtime.CUDARuntimeError as e:
         if e.status != runtime.errorMemoryAllocation:
             raise
+    return None
+
+
+@cython.final
+cdef class _ReclaimCallback:
+
+    """Callback called to reclaim memory when an allocation fails."""
+
+    cdef:
+        readonly object callback
+        readonly int priority
+        readonly str name
+        readonly size_t n_calls
+        readonly size_t reclaimed_bytes
+
+    def __init__(self, callback, int priority, str name):
+        self.callback = callback
+        self.priority = priority
+        self.name = name
+        self.n_calls = 0
+        self.reclaimed_bytes = 0
+
+    cdef _reclaim(self, SingleDeviceMemoryPool pool, size_t size):
+        cdef size_t before = pool._total_bytes, after
+        self.callback(size)
+        # Memory released by the callback is cached in the pool.
         pool.free_all_blocks()
-        try:
-            return pool._alloc(size).mem
-        except runtime.CUDARuntimeError as e:
-            if e.status != runtime.errorMemoryAllocation:
-                raise
-            gc.collect()
-            try:
-                return pool._alloc(size).mem
-            except runtime.CUDARuntimeError as e:
-                if e.status != runtime.errorMemoryAllocation:
-                    raise
-    total = size + pool.total_bytes()
-    raise OutOfMemoryError(size, total)
+        after = pool._total_bytes
+        self.n_calls += 1
+        if before > after:
+            self.reclaimed_bytes += before - after
+
+
+# List of _ReclaimCallback sorted by the descending order of the priority.
+cdef list _reclaim_callbacks = []
+cdef object _reclaim_callbacks_lock = threading.Lock()
+
+
+cdef list _get_reclaim_callbacks():
+    return _reclaim_callbacks
+
+
+cpdef add_reclaim_callback(callback, int priority=0, name=None):
+    """Registers a callback to reclaim device memory.
+
+    When a memory pool fails to allocate memory even after releasing its free
+    blocks, it calls the registered callbacks in the descending order of the
+    priority, retrying the allocation after each one. The callbacks are
+    called before falling back to the costly ``gc.collect()``. A callback is
+    expected to release cached device memory owned by the application (e.g.,
+    cuFFT plans or user-level array caches).
+
+    Args:
+        callback (callable): A function taking the requested size in bytes.
+        priority (int): Callbacks with higher priority are called first.
+            Callbacks with the same priority are called in the order of
+            registration.
+        name (str): Name of the callback reported by
+            :func:`get_reclaim_stats`. The qualified name of ``callback`` is
+            used by default.
+    """
+    global _reclaim_callbacks
+    if name is None:
+        name = getattr(callback, '__qualname__',
+                       getattr(callback, '__name__', repr(callback)))
+    entry = _ReclaimCallback(callback, priority, str(name))
+    with _reclaim_callbacks_lock:
+        callbacks = list(_reclaim_callbacks)
+        callbacks.append(entry)
+        callbacks.sort(key=operator.attrgetter('priority'), reverse=True)
+        # Replace the list, as pools iterate over it without the lock.
+        _reclaim_callbacks = callbacks
+
+
+cpdef remove_reclaim_callback(callback):
+    """Unregisters a callback registered by :func:`add_reclaim_callback`.
+
+    Args:
+        callback (callable): The callback to unregister.
+    """
+    global _reclaim_callbacks
+    with _reclaim_callbacks_lock:
+        callbacks = [c for c in _reclaim_callbacks
+                     if c.callback != callback]
+        if len(callbacks) == len(_reclaim_callbacks):
+            raise ValueError('callback is not registered: %r' % callback)
+        _reclaim_callbacks = callbacks
+
+
+cpdef list get_reclaim_stats():
+    """Returns the statistics of the reclaim callbacks.
+
+    Returns:
+        list: A list of dictionaries with ``name``, ``priority``, ``n_calls``
+        and ``reclaimed_bytes`` (the bytes released by the pools after calls
+        to the callback) of each callback, in the order they are called.
+    """
+    return [{'name': c.name,
+             'priority': c.priority,
+             'n_calls': c.n_calls,
+             'reclaimed_bytes': c.reclaimed_bytes}
+            for c in _reclaim_callbacks]
 
 
 cdef _append_to_free_list(list arena, vector.vector[size_t]* a_index,
@@ -808,6 +1291,55 @@ cdef class SingleDeviceMemoryPool:
         map.map[size_t, vector.vector[size_t]] _index
         map.map[size_t, vector.vector[int8_t]] _flag
 
+        # Number of bytes currently allocated from the allocator.
+        # `_total_bytes_lock` must be acquired to access.
+        size_t _total_bytes
+
+        # Upper limit of `_total_bytes` (0 means unlimited).
+        size_t _total_bytes_limit
+        object _total_bytes_lock
+
+        # Cumulative counters reported by `get_stats`.
+        size_t _n_cache_hits
+        size_t _n_allocator_calls
+        size_t _n_malloc_retries
+        size_t _n_free_all_blocks
+        size_t _n_cross_stream_reuses
+
+        # If True, free chunks of other streams are reused when the arena of
+        # the current stream has no chunk to fit.
+        bint _cross_stream_reuse
+
+        # Idle release policy (see `set_idle_release`).
+        double _idle_timeout
+        size_t _high_water_mark
+        double _next_trim_time
+        object _trim_thread_stop
+        size_t _n_trimmed_blocks
+        size_t _trimmed_bytes
+
+        # Maximum number of chunks in the cache of each thread (0 disables
+        # the per-thread cache).
+        size_t _thread_cache_size
+        object _thread_local
+        size_t _n_thread_cache_hits
+        # Caches of all the threads, which are flushed when the cached chunks
+        # need to be released. `_thread_cache_lock` must be acquired to
+        # access.
+        object _thread_caches
+        object _thread_cache_lock
+
+        # Allocations up to this size are packed in slabs (0 disables it).
+        size_t _small_block_threshold
+        # The threshold rounded up to the size class of a small block. The
+        # rounded sizes up to this size are allocated from slabs.
+        size_t _small_block_limit
+
+        # Map from (stream pointer, block size) to the list of slabs.
+        # `_slab_lock` must be acquired to access.
+        dict _slabs
+        object _slab_lock
+
     def __init__(self, allocator=_malloc):
         self._in_use = {}
         self._free = {}
@@ -816,6 +1348,31 @@ cdef class SingleDeviceMemoryPool:
         self._device_id = device.get_device_id()
         self._free_lock = rlock.create_fastrlock()
         self._in_use_lock = rlock.create_fastrlock()
+        self._total_bytes = 0
+        self._total_bytes_limit = 0
+        self._total_bytes_lock = rlock.create_fastrlock()
+        self._n_cache_hits = 0
+        self._n_allocator_calls = 0
+        self._n_malloc_retries = 0
+        self._n_free_all_blocks = 0
+        self._n_cross_stream_reuses = 0
+        self._cross_stream_reuse = False
+        self._small_block_threshold = 0
+        self._small_block_limit = 0
+        self._slabs = {}
+        self._slab_lock = rlock.create_fastrlock()
+        self._idle_timeout = 0
+        self._high_water_mark = 0
+        self._next_trim_time = 0
+        self._trim_thread_stop = None
+        self._n_trimmed_blocks = 0
+        self._trimmed_bytes = 0
+        self._thread_cache_size = 0
+        self._thread_local = threading.local()
+        self._n_thread_cache_hits = 0
+        self._thread_caches = weakref.WeakSet()
+        self._thread_cache_lock = rlock.create_fastrlock()
+        self.set_limit(**_parse_limit_string())
 
     cpdef list _arena(self, size_t stream_ptr):
         """Returns appropriate arena (list of bins) of a given stream.
@@ -850,6 +1407,7 @@ cdef class SingleDeviceMemoryPool:
         return &self._flag[stream_ptr]
 
     cpdef MemoryPointer _alloc(self, Py_ssize_t rounded_size):
+        self._n_allocator_calls += 1
         if memory_hook._has_memory_hooks():
             hooks = memory_hook.get_memory_hooks()
             if hooks:
@@ -872,7 +1430,10 @@ cdef class SingleDeviceMemoryPool:
         return self._allocator(rounded_size)
 
     cpdef MemoryPointer malloc(self, size_t size):
-        rounded_size = _round_size(size)
+        if 0 < size <= self._small_block_threshold:
+            rounded_size = _round_small_size(size)
+        else:
+            rounded_size = _round_size(size)
         if memory_hook._has_memory_hooks():
             hooks = memory_hook.get_memory_hooks()
             if hooks:
@@ -913,10 +1474,28 @@ cdef class SingleDeviceMemoryPool:
         current_thread = pythread.PyThread_get_thread_ident()
         stream_ptr = stream_module.get_current_stream_ptr()
 
+        if size <= self._small_block_limit:
+            return _malloc_small(self, size, stream_ptr)
+
+        if self._thread_cache_size != 0:
+            chunk = _get_thread_cached_chunk(self, size, stream_ptr)
+            if chunk is not None:
+                self._n_thread_cache_hits += 1
+                pmem = PooledMemory(chunk, self._weakref)
+                return MemoryPointer(pmem, 0)
+
+        if (self._next_trim_time != 0 and self._trim_thread_stop is None and
+                time.time() >= self._next_trim_time):
+            self.trim()
+
         # find best-fit, or a smallest larger allocation
         rlock.lock_fastrlock(self._free_lock, current_thread, True)
         try:
             chunk = _get_chunk(self, size, stream_ptr)
+            if chunk is None and self._cross_stream_reuse:
+                chunk = _get_chunk_from_other_streams(self, size, stream_ptr)
+            if chunk is not None:
+                self._n_cache_hits += 1
         finally:
             rlock.unlock_fastrlock(self._free_lock)
 
@@ -935,43 +1514,18 @@ cdef class SingleDeviceMemoryPool:
         return MemoryPointer(pmem, 0)
 
     cpdef free(self, intptr_t ptr, size_t size):
-        cdef _Chunk chunk, c
-        cdef long current_thread = pythread.PyThread_get_thread_ident()
-
-        rlock.lock_fastrlock(self._in_use_lock, current_thread, True)
-        try:
-            chunk = self._in_use.pop(ptr)
-        except KeyError:
-            raise RuntimeError('Cannot free out-of-pool memory')
-        finally:
-            rlock.unlock_fastrlock(self._in_use_lock)
-        stream_ptr = chunk.stream_ptr
-
-        rlock.lock_fastrlock(self._free_lock, current_thread, True)
-        try:
-            arena = self._arena(stream_ptr)
-            a_index = self._arena_index(stream_ptr)
-            a_flag = self._arena_flag(stream_ptr)
-
-            c = chunk.next
-            if c is not None and _remove_from_free_list(arena, a_index,
-                                                        a_flag, c):
-                chunk.merge(c)
-
-            c = chunk.prev
-            if c is not None and _remove_from_free_list(arena, a_index,
-                                                        a_flag, c):
-                c.merge(chunk)
-                chunk = c
-
-            _append_to_free_list(arena, a_index, a_flag, chunk)
-        finally:
-            rlock.unlock_fastrlock(self._free_lock)
+        if self._thread_cache_size != 0 and _put_thread_cache(self, ptr):
+            return
+        _free_chunk(self, ptr)
 
     cpdef free_all_blocks(self, stream=None):
         """Free all **non-split** chunks"""
         cdef size_t stream_ptr
 
+        self._n_free_all_blocks += 1
+        if self._thread_cache_size != 0:
+            _flush_thread_caches(self)
+        _release_empty_slabs(self, None if stream is None else stream.ptr)
         rlock.lock_fastrlock(self._free_lock, -1, True)
         try:
             # free blocks in all arenas
@@ -1032,6 +1586,433 @@ cdef class SingleDeviceMemoryPool:
     cpdef size_t total_bytes(self):
         return self.used_bytes() + self.free_bytes()
 
+    cpdef set_limit(self, size=None, fraction=None):
+        cdef size_t mem_total
+        if size is None:
+            if fraction is None:
+                size = 0
+            else:
+                if not 0 <= fraction <= 1:
+                    raise ValueError(
+                        'memory limit fraction out of range: %s' % fraction)
+                _, mem_total = runtime.memGetInfo()
+                size = int(fraction * mem_total)
+        elif fraction is not None:
+            raise ValueError('size and fraction cannot be specified at '
+                             'one time')
+        if size < 0:
+            raise ValueError(
+                'memory limit size out of range: %s' % size)
+        self._total_bytes_limit = <size_t>size
+
+    cpdef size_t get_limit(self):
+        return self._total_bytes_limit
+
+    cpdef dict dump_arenas(self):
+        cdef dict ret = {}
+        cdef dict bins
+        cdef set free_list
+        cdef _Chunk chunk
+        cdef size_t i, stream_ptr, bin_size, largest, free_size, n_split
+        cdef vector.vector[size_t]* a_index
+        cdef vector.vector[int8_t]* a_flag
+        rlock.lock_fastrlock(self._free_lock, -1, True)
+        try:
+            for stream_ptr, arena in self._free.items():
+                a_index = self._arena_index(stream_ptr)
+                a_flag = self._arena_flag(stream_ptr)
+                bins = {}
+                largest = 0
+                free_size = 0
+                n_split = 0
+                for i in range(a_index.size()):
+                    if a_flag.at(i) == 0:
+                        continue
+                    free_list = arena[i]
+                    bin_size = (a_index.at(i) + 1) * ALLOCATION_UNIT_SIZE
+                    bins[bin_size] = len(free_list)
+                    for chunk in free_list:
+                        free_size += chunk.size
+                        if chunk.size > largest:
+                            largest = chunk.size
+                        if chunk.prev is not None or chunk.next is not None:
+                            n_split += 1
+                ret[stream_ptr] = {
+                    'bins': bins,
+                    'n_free_blocks': sum(bins.values()),
+                    'free_bytes': free_size,
+                    'largest_free_block': largest,
+                    'n_split_blocks': n_split,
+                    'fragmentation': _fragmentation(largest, free_size),
+                }
+        finally:
+            rlock.unlock_fastrlock(self._free_lock)
+        return ret
+
+    cpdef dict get_stats(self):
+        cdef size_t largest = 0, free_size
+        arenas = self.dump_arenas()
+        for arena in arenas.values():
+            largest = max(largest, arena['largest_free_block'])
+        free_size = self.free_bytes()
+        n_slabs, n_small_blocks = _count_slabs(self)
+        return {
+            'used_bytes': self.used_bytes(),
+            'free_bytes': free_size,
+            'total_bytes': self._total_bytes,
+            'limit': self._total_bytes_limit,
+            'n_free_blocks': self.n_free_blocks(),
+            'largest_free_block': largest,
+            'fragmentation': _fragmentation(largest, free_size),
+            'n_cache_hits': self._n_cache_hits,
+            'n_allocator_calls': self._n_allocator_calls,
+            'n_malloc_retries': self._n_malloc_retries,
+            'n_free_all_blocks': self._n_free_all_blocks,
+            'n_cross_stream_reuses': self._n_cross_stream_reuses,
+            'n_slabs': n_slabs,
+            'n_small_blocks': n_small_blocks,
+            'n_trimmed_blocks': self._n_trimmed_blocks,
+            'trimmed_bytes': self._trimmed_bytes,
+            'n_thread_cache_hits': self._n_thread_cache_hits,
+            'arenas': arenas,
+        }
+
+    cpdef set_cross_stream_reuse(self, bint enabled):
+        self._cross_stream_reuse = enabled
+
+    cpdef bint get_cross_stream_reuse(self):
+        return self._cross_stream_reuse
+
+    cpdef set_idle_release(self, double timeout=0, size_t high_water_mark=0,
+                           bint background=False):
+        if timeout < 0:
+            raise ValueError('timeout must be non-negative: %s' % timeout)
+        if self._trim_thread_stop is not None:
+            self._trim_thread_stop.set()
+            self._trim_thread_stop = None
+        self._idle_timeout = timeout
+        self._high_water_mark = high_water_mark
+        if timeout == 0 and high_water_mark == 0:
+            self._next_trim_time = 0
+            return
+        interval = _trim_interval(timeout)
+        self._next_trim_time = time.time() + interval
+        if background:
+            self._trim_thread_stop = _start_trim_thread(
+                self._weakref, interval)
+
+    cpdef size_t trim(self):
+        cdef list chunks = [], released = []
+        cdef _Chunk chunk
+        cdef size_t total, size = 0
+        cdef double now = time.time()
+
+        rlock.lock_fastrlock(self._free_lock, -1, True)
+        try:
+            for arena in self._free.values():
+                for free_list in arena:
+                    if free_list is None:
+                        continue
+                    for chunk in free_list:
+                        if chunk.prev is None and chunk.next is None:
+                            chunks.append(chunk)
+            # Oldest chunks are released first.
+            chunks.sort(key=operator.attrgetter('free_time'))
+            total = self._total_bytes
+            for chunk in chunks:
+                if not ((self._idle_timeout != 0 and
+                         now - chunk.free_time >= self._idle_timeout) or
+                        (self._high_water_mark != 0 and
+                         total > self._high_water_mark)):
+                    break
+                _remove_from_free_list(
+                    self._free[chunk.stream_ptr],
+                    self._arena_index(chunk.stream_ptr),
+                    self._arena_flag(chunk.stream_ptr), chunk)
+                _release_bytes(self, chunk.size)
+                total -= chunk.size
+                size += chunk.size
+                released.append(chunk)
+        finally:
+            rlock.unlock_fastrlock(self._free_lock)
+
+        self._n_trimmed_blocks += len(released)
+        self._trimmed_bytes += size
+        if self._next_trim_time != 0:
+            self._next_trim_time = now + _trim_interval(self._idle_timeout)
+        # Buffers are freed on the device they were allocated on, as this
+        # method may be called from the background thread.
+        with device.Device(self._device_id):
+            del released[:]
+        return size
+
+    cpdef set_thread_cache_size(self, size_t size):
+        if self._thread_cache_size != 0:
+            _flush_thread_caches(self)
+        self._thread_cache_size = size
+
+    cpdef size_t get_thread_cache_size(self):
+        return self._thread_cache_size
+
+    cpdef set_small_block_threshold(self, size_t size):
+        if size > SLAB_SIZE // 8:
+            raise ValueError(
+                'small block threshold must be at most %d bytes: %d' %
+                (SLAB_SIZE // 8, size))
+        self._small_block_threshold = size
+        self._small_block_limit = _round_small_size(size) if size else 0
+
+    cpdef size_t get_small_block_threshold(self):
+        return self._small_block_threshold
+
+
+cpdef double _trim_interval(double timeout):
+    # Interval between trims; the high-water mark is checked every second
+    # when no timeout is given.
+    if timeout == 0:
+        return 1.0
+    return timeout / 2
+
+
+def _trim_periodically(pool_ref, double interval, stop):
+    while not stop.wait(interval):
+        pool = pool_ref()
+        if pool is None:
+            return
+        pool.trim()
+        del pool
+
+
+cpdef _start_trim_thread(pool_ref, double interval):
+    """Starts a daemon thread calling ``trim`` of the pool periodically.
+
+    Returns:
+        threading.Event: The event to stop the thread.
+    """
+    stop = threading.Event()
+    thread = threading.Thread(target=_trim_periodically,
+                              args=(pool_ref, interval, stop))
+    thread.daemon = True
+    thread.start()
+    return stop
+
+
+cdef tuple _count_slabs(SingleDeviceMemoryPool pool):
+    cdef size_t n_slabs = 0, n_blocks = 0
+    cdef _Slab slab
+    rlock.lock_fastrlock(pool._slab_lock, -1, True)
+    try:
+        for slabs in pool._slabs.values():
+            for slab in slabs:
+                n_slabs += 1
+                n_blocks += slab.n_blocks - slab.n_free
+    finally:
+        rlock.unlock_fastrlock(pool._slab_lock)
+    return n_slabs, n_blocks
+
+
+cdef double _fragmentation(size_t largest, size_t free_size):
+    # Ratio of free bytes that cannot be served as one contiguous block.
+    if free_size == 0:
+        return 0.0
+    return 1.0 - <double>largest / free_size
+
+
+cpdef dict _parse_limit_string(limit=None):
+    """Parses the memory limit given by ``CUPY_GPU_MEMORY_LIMIT``.
+
+    The limit is either a number of bytes (e.g., ``1073741824``) or a
+    percentage of the device memory (e.g., ``50%``).
+    """
+    if limit is None:
+        limit = os.environ.get('CUPY_GPU_MEMORY_LIMIT')
+    size = None
+    fraction = None
+    if limit is not None:
+        limit = limit.strip()
+        if limit.endswith('%'):
+            fraction = float(limit[:-1]) / 100.0
+        else:
+            size = int(limit)
+    return {'size': size, 'fraction': fraction}
+
+
+cdef _free_chunk(SingleDeviceMemoryPool pool, intptr_t ptr):
+    cdef _Chunk chunk, c
+    cdef _FreeEvent event = None
+    cdef long current_thread = pythread.PyThread_get_thread_ident()
+
+    rlock.lock_fastrlock(pool._in_use_lock, current_thread, True)
+    try:
+        chunk = pool._in_use.pop(ptr)
+    except KeyError:
+        raise RuntimeError('Cannot free out-of-pool memory')
+    finally:
+        rlock.unlock_fastrlock(pool._in_use_lock)
+    stream_ptr = chunk.stream_ptr
+    # The event covers the work queued on the stream for the chunk and for
+    # the free chunks it is merged with, which were freed earlier.
+    if pool._cross_stream_reuse:
+        event = _record_free_event(pool, stream_ptr)
+
+    rlock.lock_fastrlock(pool._free_lock, current_thread, True)
+    try:
+        arena = pool._arena(stream_ptr)
+        a_index = pool._arena_index(stream_ptr)
+        a_flag = pool._arena_flag(stream_ptr)
+
+        c = chunk.next
+        if c is not None and _remove_from_free_list(arena, a_index,
+                                                    a_flag, c):
+            chunk.merge(c)
+
+        c = chunk.prev
+        if c is not None and _remove_from_free_list(arena, a_index,
+                                                    a_flag, c):
+            c.merge(chunk)
+            chunk = c
+
+        chunk.free_time = time.time()
+        chunk.free_event = event
+        _append_to_free_list(arena, a_index, a_flag, chunk)
+    finally:
+        rlock.unlock_fastrlock(pool._free_lock)
+
+
+@cython.final
+cdef class _ThreadCache:
+
+    """Per-thread cache of recently freed chunks of a memory pool.
+
+    Chunks in the cache are still registered as in use in the pool, so they
+    can be reused by the owner thread without acquiring the locks of the
+    pool. The lock of the cache is only contended when other threads flush
+    it.
+    """
+
+    cdef:
+        object pool
+        # Map from (stream pointer, chunk size) to the list of chunks.
+        dict chunks
+        # Map from memory pointer to the chunk in the order of the cached
+        # time, from the oldest.
+        object order
+        object lock
+        object __weakref__
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.chunks = {}
+        self.order = collections.OrderedDict()
+        self.lock = rlock.create_fastrlock()
+
+    cdef flush(self):
+        pool = self.pool()
+        rlock.lock_fastrlock(self.lock, -1, True)
+        try:
+            order = self.order
+            self.chunks = {}
+            self.order = collections.OrderedDict()
+        finally:
+            rlock.unlock_fastrlock(self.lock)
+        if pool is None:
+            return
+        for ptr in order:
+            _free_chunk(<SingleDeviceMemoryPool>pool, ptr)
+
+    cdef evict(self, size_t size):
+        # Returns the oldest chunks to the pool until at most `size` chunks
+        # are left.
+        cdef _Chunk chunk
+        cdef list evicted = []
+        rlock.lock_fastrlock(self.lock, -1, True)
+        try:
+            while len(self.order) > size:
+                ptr, chunk = self.order.popitem(False)
+                # The oldest chunk of the cache is the first one of its list.
+                chunk_list = self.chunks[(chunk.stream_ptr, chunk.size)]
+                del chunk_list[0]
+                evicted.append(ptr)
+        finally:
+            rlock.unlock_fastrlock(self.lock)
+        pool = self.pool()
+        if pool is None:
+            return
+        for ptr in evicted:
+            _free_chunk(<SingleDeviceMemoryPool>pool, ptr)
+
+    def __dealloc__(self):
+        if _exit_mode:
+            return  # To avoid error at exit
+        self.flush()
+
+
+cdef _ThreadCache _get_thread_cache(SingleDeviceMemoryPool pool):
+    cache = getattr(pool._thread_local, 'cache', None)
+    if cache is None:
+        cache = _ThreadCache(pool._weakref)
+        pool._thread_local.cache = cache
+        rlock.lock_fastrlock(pool._thread_cache_lock, -1, True)
+        try:
+            pool._thread_caches.add(cache)
+        finally:
+            rlock.unlock_fastrlock(pool._thread_cache_lock)
+    return cache
+
+
+cdef _flush_thread_caches(SingleDeviceMemoryPool pool):
+    # Returns the chunks cached by all the threads to the shared arenas.
+    cdef _ThreadCache cache
+    rlock.lock_fastrlock(pool._thread_cache_lock, -1, True)
+    try:
+        for cache in list(pool._thread_caches):
+            cache.flush()
+    finally:
+        rlock.unlock_fastrlock(pool._thread_cache_lock)
+
+
+cdef _Chunk _get_thread_cached_chunk(SingleDeviceMemoryPool pool,
+                                     size_t size, size_t stream_ptr):
+    cdef _ThreadCache cache = _get_thread_cache(pool)
+    cdef list chunk_list
+    cdef _Chunk chunk
+    rlock.lock_fastrlock(cache.lock, -1, True)
+    try:
+        chunk_list = cache.chunks.get((stream_ptr, size))
+        if not chunk_list:
+            return None
+        chunk = chunk_list.pop()
+        del cache.order[chunk.ptr()]
+        return chunk
+    finally:
+        rlock.unlock_fastrlock(cache.lock)
+
+
+cdef bint _put_thread_cache(SingleDeviceMemoryPool pool, intptr_t ptr):
+    cdef _ThreadCache cache
+    cdef _Chunk chunk
+    # The lock is not needed as `dict.get` is atomic under the GIL and the
+    # chunk is kept in `_in_use`.
+    chunk = pool._in_use.get(ptr)
+    if chunk is None:
+        raise RuntimeError('Cannot free out-of-pool memory')
+    cache = _get_thread_cache(pool)
+    key = (chunk.stream_ptr, chunk.size)
+    rlock.lock_fastrlock(cache.lock, -1, True)
+    try:
+        chunk_list = cache.chunks.get(key)
+        if chunk_list is None:
+            cache.chunks[key] = chunk_list = []
+        chunk_list.append(chunk)
+        cache.order[ptr] = chunk
+        n_chunks = len(cache.order)
+    finally:
+        rlock.unlock_fastrlock(cache.lock)
+    if n_chunks > pool._thread_cache_size:
+        # Return the oldest chunks to the shared arenas.
+        cache.evict(pool._thread_cache_size)
+    return True
+
 
 cdef class MemoryPool(object):
 
@@ -1142,6 +2123,216 @@ cdef class MemoryPool(object):
         mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
         return mp.total_bytes()
 
+    cpdef set_limit(self, size=None, fraction=None):
+        """Sets the upper limit of memory allocation of the current device.
+
+        When ``fraction`` is specified, the limit is computed as a fraction of
+        the total memory of the current device. For example, on a GPU with
+        2 GiB memory, both ``set_limit(fraction=0.5)`` and
+        ``set_limit(size=1024**3)`` limit the pool to 1 GiB.
+
+        When an allocation would exceed the limit, the pool first releases
+        the free blocks that are not split in all arenas, then raises
+        :class:`~cupy.cuda.memory.OutOfMemoryError` if the limit would still
+        be exceeded.
+
+        ``size`` and ``fraction`` cannot be specified at one time.
+        If neither of them is specified or ``0`` is specified, the limit is
+        disabled.
+
+        .. note::
+            The default limit of each device can be set by the
+            ``CUPY_GPU_MEMORY_LIMIT`` environment variable.
+            This method only changes the limit of the current device.
+
+        Args:
+            size (int): Limit size in bytes.
+            fraction (float): Fraction in the range of ``[0, 1]``.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        mp.set_limit(size, fraction)
+
+    cpdef size_t get_limit(self):
+        """Gets the upper limit of memory allocation of the current device.
+
+        Returns:
+            int: The number of bytes. ``0`` means the limit is disabled.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        return mp.get_limit()
+
+    cpdef dict get_stats(self):
+        """Gets the statistics of the pool of the current device.
+
+        The returned dictionary has the following keys:
+
+        - ``used_bytes``, ``free_bytes``, ``n_free_blocks``: Same as the
+          values returned by the corresponding methods.
+        - ``total_bytes``: Bytes currently obtained from the allocator.
+        - ``limit``: Upper limit set by :meth:`set_limit`.
+        - ``largest_free_block``: Size of the largest free block in bytes.
+        - ``fragmentation``: Ratio of free bytes that cannot be served by
+          the largest free block, i.e.,
+          ``1 - largest_free_block / free_bytes``.
+        - ``n_cache_hits``: Number of allocations served from the free
+          blocks.
+        - ``n_allocator_calls``: Number of calls to the underlying allocator
+          (e.g., ``cudaMalloc``).
+        - ``n_malloc_retries``: Number of times an allocation was retried
+          after releasing memory.
+        - ``n_free_all_blocks``: Number of :meth:`free_all_blocks` calls.
+        - ``n_cross_stream_reuses``: Number of free blocks reused from the
+          arena of another stream (see :meth:`set_cross_stream_reuse`).
+        - ``n_slabs``, ``n_small_blocks``: Number of slabs and number of
+          small blocks in use (see :meth:`set_small_block_threshold`).
+        - ``n_trimmed_blocks``, ``trimmed_bytes``: Number of free blocks and
+          bytes released by :meth:`trim` (see :meth:`set_idle_release`).
+        - ``n_thread_cache_hits``: Number of allocations served from the
+          per-thread caches (see :meth:`set_thread_cache_size`).
+        - ``arenas``: Per-stream arena statistics as returned by
+          :meth:`dump_arenas`.
+
+        Counters are cumulative since the pool was created.
+
+        Returns:
+            dict: The statistics.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        return mp.get_stats()
+
+    cpdef dict dump_arenas(self):
+        """Dumps the free blocks of each arena of the current device.
+
+        Returns:
+            dict: A dictionary mapping the raw stream pointer of each arena
+            to a dictionary with the following keys: ``bins`` (a mapping
+            from a bin size in bytes to the number of free blocks in the
+            bin), ``n_free_blocks``, ``free_bytes``, ``largest_free_block``,
+            ``n_split_blocks`` (number of free blocks split from a larger
+            allocation) and ``fragmentation``.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        return mp.dump_arenas()
+
+    cpdef set_cross_stream_reuse(self, bint enabled):
+        """Enables reusing free blocks across streams on the current device.
+
+        Free blocks are held in an arena of the stream they were allocated
+        on. When this option is enabled and the arena of the current stream
+        has no block to fit, a free block that is not split is taken from
+        the arena of another stream. While this option is enabled, an event
+        is recorded on the stream of each block when it is freed, and the
+        current stream is made to wait for the event before the block is
+        reused, so the stream ordering is preserved. Blocks freed before the
+        option is enabled are reused after synchronizing the device. It is
+        disabled by default.
+
+        Args:
+            enabled (bool): Whether to enable the cross-stream reuse.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        mp.set_cross_stream_reuse(enabled)
+
+    cpdef bint get_cross_stream_reuse(self):
+        """Returns whether the cross-stream reuse is enabled.
+
+        Returns:
+            bool: ``True`` if :meth:`set_cross_stream_reuse` is enabled on
+            the current device.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        return mp.get_cross_stream_reuse()
+
+    cpdef set_idle_release(self, double timeout=0, size_t high_water_mark=0,
+                           bint background=False):
+        """Sets the policy to release idle free blocks on the current device.
+
+        Free blocks that are not split are released to the allocator by
+        :meth:`trim` when they have not been reused for ``timeout`` seconds,
+        or, oldest first, while the pool holds more than
+        ``high_water_mark`` bytes.
+
+        :meth:`trim` is called lazily by :meth:`malloc` once in a while
+        (every ``timeout / 2`` seconds, or every second when only the
+        high-water mark is given). When ``background`` is ``True``, it is
+        called from a daemon thread instead.
+
+        Args:
+            timeout (float): Idle time in seconds. ``0`` disables the
+                time-based release.
+            high_water_mark (int): Size in bytes. ``0`` disables the release
+                based on the pool size.
+            background (bool): If ``True``, a background thread releases the
+                blocks.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        mp.set_idle_release(timeout, high_water_mark, background)
+
+    cpdef size_t trim(self):
+        """Releases idle free blocks on the current device.
+
+        Returns:
+            int: The number of bytes released.
+
+        .. seealso:: :meth:`set_idle_release`
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        return mp.trim()
+
+    cpdef set_thread_cache_size(self, size_t size):
+        """Sets the size of the per-thread caches on the current device.
+
+        When enabled, a freed block is kept in a cache local to the thread
+        that freed it, and reused by an allocation of the same size on the
+        same stream in the thread without acquiring the locks of the pool.
+        When the cache holds more than ``size`` blocks, they are returned to
+        the pool. The cache of a thread is also returned when the thread
+        exits, or when the thread calls :meth:`free_all_blocks`.
+
+        Blocks in the per-thread caches are counted in :meth:`used_bytes`.
+
+        Args:
+            size (int): Maximum number of blocks in the cache of each thread.
+                ``0`` disables the per-thread cache, which is the default.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        mp.set_thread_cache_size(size)
+
+    cpdef size_t get_thread_cache_size(self):
+        """Gets the size of the per-thread caches on the current device.
+
+        Returns:
+            int: The maximum number of blocks. ``0`` means disabled.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        return mp.get_thread_cache_size()
+
+    cpdef set_small_block_threshold(self, size_t size):
+        """Sets the threshold of small allocations on the current device.
+
+        Allocations of at most ``size`` bytes are rounded up to a power of
+        two (at least 32 bytes) instead of 512 bytes, and many of them are
+        packed into one 64 KiB pooled chunk called a *slab*. A slab holds
+        blocks of one size class allocated on one stream, so the stream
+        ordering of the memory pool is preserved. It reduces the memory
+        consumed by scalar-sized temporaries.
+
+        Args:
+            size (int): Threshold in bytes, up to 8192. ``0`` disables the
+                small block allocation, which is the default.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        mp.set_small_block_threshold(size)
+
+    cpdef size_t get_small_block_threshold(self):
+        """Gets the threshold of small allocations on the current device.
+
+        Returns:
+            int: The threshold in bytes. ``0`` means disabled.
+        """
+        mp = <SingleDeviceMemoryPool>self._pools[device.get_device_id()]
+        return mp.get_small_block_threshold()
+
 
 ctypedef void*(*malloc_func_type)(void*, size_t, int)
 ctypedef void(*free_func_type)(void*, void*, int)
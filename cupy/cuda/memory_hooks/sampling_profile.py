@@ -0,0 +1,154 @@
+from os import path
+import math
+import random
+import sys
+
+from cupy.cuda import memory_hook
+
+
+class SamplingProfileHook(memory_hook.MemoryHook):
+    """Sampling CuPy memory profiler with low overhead.
+
+    Unlike :class:`~cupy.cuda.memory_hooks.LineProfileHook`, which captures
+    the stack trace of every allocation, this profiler captures the stack
+    trace of one allocation per ``sample_bytes`` bytes on average.
+    Sampling points are drawn from a Poisson process over the allocated
+    bytes, as in the heap profiler of tcmalloc: an allocation of ``size``
+    bytes is sampled with probability ``1 - exp(-size / sample_bytes)``, and
+    each sample is scaled by the inverse of the probability so that the
+    report estimates the number and the bytes of all allocations.
+
+    Stack traces are taken from Python frames only, without reading source
+    files. Cython frames are not traced.
+
+    Example:
+        Code example::
+
+            from cupy.cuda import memory_hooks
+            hook = memory_hooks.SamplingProfileHook()
+            with hook:
+                # some CuPy codes
+            hook.print_report()
+            with open('memory.folded', 'w') as f:
+                hook.write_flamegraph(f)
+
+        Output example of :meth:`print_report`::
+
+            4.00MB (4.00MB) 2 tests/cupy_tests/test.py:37:test
+            1.00MB (1.00MB) 1 tests/cupy_tests/test.py:38:test
+
+        Each line shows::
+
+            {bytes} ({inclusive_bytes}) {count} {filename}:{lineno}:{func_name}
+
+        where *bytes* and *count* are the estimated bytes and number of
+        allocations made directly at the line, and *inclusive_bytes* also
+        includes those made in callees.
+
+    Args:
+        sample_bytes (int): Mean number of bytes between samples.
+        max_depth (int): Maximum depth to follow stack traces.
+            Default is 0 (no limit).
+        seed (int): Seed of the random number generator.
+    """
+
+    name = 'SamplingProfileHook'
+
+    def __init__(self, sample_bytes=512 * 1024, max_depth=0, seed=None):
+        if sample_bytes <= 0:
+            raise ValueError('sample_bytes must be positive')
+        self._sample_bytes = sample_bytes
+        self._max_depth = max_depth
+        self._random = random.Random(seed)
+        self._bytes_until_sample = self._draw()
+        self._filename = path.splitext(path.abspath(__file__))[0]
+        # Map from stack trace (tuple of frames from the root) to the
+        # estimated [count, bytes].
+        self._samples = {}
+
+    def _draw(self):
+        return self._random.expovariate(1.0 / self._sample_bytes)
+
+    # callback
+    def malloc_preprocess(self, device_id, size, mem_size):
+        self._bytes_until_sample -= mem_size
+        if self._bytes_until_sample > 0:
+            return
+        self._bytes_until_sample = self._draw()
+        scale = 1.0 / -math.expm1(-float(mem_size) / self._sample_bytes)
+        stack = self._extract_stack()
+        entry = self._samples.get(stack)
+        if entry is None:
+            self._samples[stack] = entry = [0.0, 0.0]
+        entry[0] += scale
+        entry[1] += mem_size * scale
+
+    def _extract_stack(self):
+        frames = []
+        frame = sys._getframe(1)
+        while frame is not None:
+            code = frame.f_code
+            if path.splitext(code.co_filename)[0] != self._filename:
+                frames.append((code.co_filename, frame.f_lineno,
+                               code.co_name))
+            frame = frame.f_back
+        frames.reverse()
+        if self._max_depth > 0:
+            frames = frames[:self._max_depth]
+        return tuple(frames)
+
+    def get_samples(self):
+        """Returns the estimated allocations for each stack trace.
+
+        Returns:
+            list: A list of ``(stack, count, bytes)`` tuples, where ``stack``
+            is a tuple of ``(filename, lineno, func_name)`` from the root
+            frame, and ``count`` and ``bytes`` are the estimated number and
+            bytes of allocations.
+        """
+        return [(stack, count, nbytes)
+                for stack, (count, nbytes) in self._samples.items()]
+
+    def print_report(self, file=sys.stdout):
+        """Prints the estimated allocations of each line.
+
+        Lines are sorted by the descending order of the bytes allocated at
+        the line, including those in callees.
+        """
+        direct = {}
+        inclusive = {}
+        for stack, count, nbytes in self.get_samples():
+            if not stack:
+                continue
+            for frame in set(stack):
+                inclusive[frame] = inclusive.get(frame, 0) + nbytes
+            entry = direct.setdefault(stack[-1], [0, 0])
+            entry[0] += count
+            entry[1] += nbytes
+        for frame in sorted(inclusive, key=lambda f: -inclusive[f]):
+            count, nbytes = direct.get(frame, (0, 0))
+            file.write('%s (%s) %d %s:%s:%s\n' % (
+                _humanized_size(nbytes), _humanized_size(inclusive[frame]),
+                int(round(count)), frame[0], frame[1], frame[2]))
+        file.flush()
+
+    def write_flamegraph(self, file):
+        """Writes the estimated bytes in the folded stack format.
+
+        Each line consists of the frames from the root separated by ``;``
+        and the estimated bytes allocated by the stack trace. The output can
+        be rendered by flame graph tools, e.g., ``flamegraph.pl`` or
+        speedscope.
+        """
+        for stack, _, nbytes in sorted(self.get_samples()):
+            frames = ';'.join('%s:%s:%s' % frame for frame in stack)
+            file.write('%s %d\n' % (frames or '_root', int(round(nbytes))))
+        file.flush()
+
+
+def _humanized_size(size):
+    for unit in ['', 'K', 'M', 'G', 'T', 'P', 'E']:
+        if size < 1024.0:
+            return '%3.2f%sB' % (size, unit)
+        size /= 1024.0
+    return '%.2f%sB' % (size, 'Z')
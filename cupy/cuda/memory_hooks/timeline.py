@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+
+from cupy.cuda import memory_hook
+from cupy.cuda import runtime
+from cupy.cuda import stream as stream_module
+
+
+class TimelineHook(memory_hook.MemoryHook):
+    """Memory hook that records a timeline of memory pool operations.
+
+    This hook records ``alloc`` (allocation from GPU device), ``malloc``
+    and ``free`` events with the device, the stream and the occupancy of
+    the memory pool, and exports them in the Chrome trace event format,
+    which can be viewed with ``chrome://tracing`` or Perfetto UI.
+
+    In the exported trace, the process is the device and each pooled
+    allocation is shown as an asynchronous slice that lasts from ``malloc``
+    to ``free``. The counter ``memory`` shows the bytes in use and, if
+    ``pool`` is given, the bytes held by the pool.
+    Ranges of :func:`cupy.prof.time_range` and
+    :class:`cupy.prof.TimeRangeDecorator` entered while the hook is active
+    are also recorded in the same timeline, so that allocations line up
+    with the NVTX ranges.
+
+    Example:
+        Code example::
+
+            from cupy.cuda import memory_hooks
+            hook = memory_hooks.TimelineHook(cupy.get_default_memory_pool())
+            with hook:
+                with cupy.prof.time_range('step'):
+                    # some CuPy codes
+            with open('memory.json', 'w') as f:
+                hook.write_chrome_trace(f)
+
+    Args:
+        pool (cupy.cuda.MemoryPool): Memory pool to sample the total bytes
+            from. If ``None``, only the bytes in use are recorded.
+    """
+
+    name = 'TimelineHook'
+
+    def __init__(self, pool=None):
+        self.pool = pool
+        self._events = []
+        self._used_bytes = {}
+        self._lock = threading.Lock()
+
+    def _now(self):
+        return time.time() * 1e6
+
+    def _append(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    def _counter(self, device_id, ts):
+        args = {'used_bytes': self._used_bytes.get(device_id, 0)}
+        if self.pool is not None:
+            args['total_bytes'] = self.pool.total_bytes()
+        self._append({'name': 'memory', 'ph': 'C', 'ts': ts,
+                      'pid': device_id, 'args': args})
+
+    def alloc_postprocess(self, **kwargs):
+        if kwargs['mem_ptr'] == 0:
+            return
+        self._append({
+            'name': 'alloc', 'cat': 'memory', 'ph': 'i', 's': 'p',
+            'ts': self._now(), 'pid': kwargs['device_id'],
+            'tid': stream_module.get_current_stream().ptr,
+            'args': {'mem_size': kwargs['mem_size'],
+                     'mem_ptr': kwargs['mem_ptr']}})
+
+    def malloc_postprocess(self, **kwargs):
+        if kwargs['mem_ptr'] == 0:
+            return
+        ts = self._now()
+        device_id = kwargs['device_id']
+        mem_size = kwargs['mem_size']
+        self._append({
+            'name': 'malloc', 'cat': 'memory', 'ph': 'b', 'ts': ts,
+            'pid': device_id, 'tid': stream_module.get_current_stream().ptr,
+            'id': hex(kwargs['mem_ptr']),
+            'args': {'size': kwargs['size'], 'mem_size': mem_size,
+                     'mem_ptr': kwargs['mem_ptr'],
+                     'stream': stream_module.get_current_stream().ptr}})
+        with self._lock:
+            self._used_bytes[device_id] = (
+                self._used_bytes.get(device_id, 0) + mem_size)
+        self._counter(device_id, ts)
+
+    def free_postprocess(self, **kwargs):
+        ts = self._now()
+        device_id = kwargs['device_id']
+        self._append({
+            'name': 'malloc', 'cat': 'memory', 'ph': 'e', 'ts': ts,
+            'pid': device_id, 'tid': stream_module.get_current_stream().ptr,
+            'id': hex(kwargs['mem_ptr'])})
+        with self._lock:
+            self._used_bytes[device_id] = (
+                self._used_bytes.get(device_id, 0) - kwargs['mem_size'])
+        self._counter(device_id, ts)
+
+    def _range(self, message, phase):
+        self._append({
+            'name': message, 'cat': 'nvtx', 'ph': phase, 'ts': self._now(),
+            'pid': runtime.getDevice(),
+            'tid': 'thread-%d' % threading.current_thread().ident})
+
+    def range_push(self, message):
+        """Records the beginning of a range.
+
+        This method is called by :func:`cupy.prof.time_range` and
+        :class:`cupy.prof.TimeRangeDecorator`.
+        """
+        self._range(message, 'B')
+
+    def range_pop(self):
+        """Records the end of the innermost range."""
+        self._range('', 'E')
+
+    def get_events(self):
+        """Returns the recorded events.
+
+        Returns:
+            list of dict: Events in the Chrome trace event format. The
+            timestamps are in microseconds since the epoch.
+        """
+        with self._lock:
+            return list(self._events)
+
+    def write_chrome_trace(self, file):
+        """Writes the recorded events in the Chrome trace format.
+
+        Args:
+            file: Text file-like object to write the JSON trace to.
+        """
+        json.dump({'traceEvents': self.get_events(),
+                   'displayTimeUnit': 'ms'}, file)
+        file.flush()
+
+
+def _range_push(message):
+    if not memory_hook._has_memory_hooks():
+        return
+    for hook in memory_hook.get_memory_hooks().values():
+        if isinstance(hook, TimelineHook):
+            hook.range_push(message)
+
+
+def _range_pop():
+    if not memory_hook._has_memory_hooks():
+        return
+    for hook in memory_hook.get_memory_hooks().values():
+        if isinstance(hook, TimelineHook):
+            hook.range_pop()
@@ -0,0 +1,257 @@
+import argparse
+import collections
+import json
+import struct
+import sys
+import time
+
+from cupy.cuda import memory
+from cupy.cuda import memory_hook
+from cupy.cuda import stream as stream_module
+
+
+_MAGIC = b'CUPYMTR1'
+# op, device_id, timestamp, size, stream_ptr, mem_ptr
+_RECORD = struct.Struct('<Bidqqq')
+_MALLOC = 0
+_FREE = 1
+_OP_NAMES = ('malloc', 'free')
+
+
+TraceEvent = collections.namedtuple(
+    'TraceEvent',
+    ('op', 'device_id', 'timestamp', 'size', 'stream_ptr', 'mem_ptr'))
+
+
+class AllocationTraceHook(memory_hook.MemoryHook):
+    """Memory hook that records a binary trace of memory pool operations.
+
+    This hook writes a fixed-size record to a binary file for each
+    ``malloc`` and ``free`` of the memory pool. The trace can be loaded by
+    :func:`load_trace` and replayed offline by :func:`replay` to compare
+    the behavior of memory pool configurations without allocating device
+    memory.
+
+    Example:
+        Code example::
+
+            from cupy.cuda import memory_hooks
+            with open('trace.bin', 'wb') as f:
+                with memory_hooks.AllocationTraceHook(f):
+                    # some CuPy codes
+
+        The trace can be replayed from the command line::
+
+            $ python -m cupy.cuda.memory_hooks.trace trace.bin \\
+                  --option small_block_threshold=4096
+
+    Each record consists of the operation, the device ID, the time in
+    seconds since the hook was created, the size, the raw stream pointer,
+    and the memory pointer. ``size`` is the requested size for ``malloc``
+    and the allocated size for ``free``, and the stream pointer is the
+    current stream on ``malloc`` (``0`` for ``free``).
+
+    Args:
+        file: Binary file-like object to write the trace to.
+    """
+
+    name = 'AllocationTraceHook'
+
+    def __init__(self, file):
+        self.file = file
+        self._start = time.time()
+        self.file.write(_MAGIC)
+
+    def _write(self, op, device_id, size, stream_ptr, mem_ptr):
+        self.file.write(_RECORD.pack(op, device_id, time.time() - self._start,
+                                     size, stream_ptr, mem_ptr))
+
+    def malloc_postprocess(self, **kwargs):
+        if kwargs['mem_ptr'] == 0:
+            return
+        self._write(_MALLOC, kwargs['device_id'], kwargs['size'],
+                    stream_module.get_current_stream().ptr, kwargs['mem_ptr'])
+
+    def free_postprocess(self, **kwargs):
+        self._write(_FREE, kwargs['device_id'], kwargs['mem_size'], 0,
+                    kwargs['mem_ptr'])
+
+
+def load_trace(file):
+    """Loads a trace recorded by :class:`AllocationTraceHook`.
+
+    Args:
+        file: Binary file-like object to read the trace from.
+
+    Returns:
+        list of TraceEvent: Events in the order of the record. ``op`` of
+        each event is either ``'malloc'`` or ``'free'``.
+    """
+    if file.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError('not a memory allocation trace')
+    data = file.read()
+    n = len(data) // _RECORD.size
+    events = []
+    for i in range(n):
+        op, device_id, timestamp, size, stream_ptr, mem_ptr = \
+            _RECORD.unpack_from(data, i * _RECORD.size)
+        events.append(TraceEvent(_OP_NAMES[op], device_id, timestamp, size,
+                                 stream_ptr, mem_ptr))
+    return events
+
+
+class _FakeMemory(memory.BaseMemory):
+
+    def __init__(self, size, allocator):
+        self.ptr = allocator.next_ptr
+        self.size = size
+        self.device_id = 0
+        self._allocator = allocator
+        allocator.next_ptr += size
+        allocator.reserved += size
+
+    def __del__(self):
+        self._allocator.reserved -= self.size
+
+
+class _FakeAllocator(object):
+
+    """Allocator returning fake pointers without allocating memory."""
+
+    def __init__(self):
+        self.next_ptr = 512
+        self.reserved = 0
+
+    def __call__(self, size):
+        return memory.MemoryPointer(_FakeMemory(size, self), 0)
+
+
+class _FakeStream(object):
+
+    def __init__(self, ptr):
+        self.ptr = ptr
+
+
+def replay(events, device_id=None, **options):
+    """Replays a trace on a memory pool backed by a fake allocator.
+
+    No device memory is allocated, but the pool is created for the current
+    device, so the CUDA runtime and a device are required. The recorded
+    streams do not exist in the process, so options that make the pool
+    synchronize streams, i.e., ``cross_stream_reuse``, are not supported.
+
+    Args:
+        events (list of TraceEvent): Events loaded by :func:`load_trace`.
+        device_id (int): If specified, only the events of the device are
+            replayed.
+        options: Options of the memory pool. Each option ``name=value``
+            calls ``set_name(value)`` of
+            :class:`~cupy.cuda.memory.SingleDeviceMemoryPool` before the
+            replay, e.g., ``small_block_threshold=4096``.
+
+    Returns:
+        dict: The result with the following keys: ``n_mallocs``,
+        ``n_frees``, ``peak_used_bytes`` and ``peak_reserved_bytes`` (the
+        peak bytes used by the application and obtained by the pool),
+        ``fragmentation`` (the fragmentation ratio of the free blocks at the
+        peak of reserved bytes), ``hit_rate`` (the ratio of allocations
+        served from the cached blocks) and ``n_allocator_calls``.
+    """
+    if options.get('cross_stream_reuse'):
+        raise ValueError('cross_stream_reuse cannot be replayed')
+    allocator = _FakeAllocator()
+    pool = memory.SingleDeviceMemoryPool(allocator=allocator)
+    for name, value in options.items():
+        getattr(pool, 'set_' + name)(value)
+
+    live = {}
+    streams = {}
+    used = 0
+    peak_used = 0
+    peak_reserved = 0
+    fragmentation = 0.0
+    n_mallocs = 0
+    n_frees = 0
+    current_stream = stream_module.get_current_stream()
+    try:
+        for event in events:
+            if device_id is not None and event.device_id != device_id:
+                continue
+            key = (event.device_id, event.mem_ptr)
+            if event.op == 'malloc':
+                stream = streams.get(event.stream_ptr)
+                if stream is None:
+                    stream = streams[event.stream_ptr] = _FakeStream(
+                        event.stream_ptr)
+                stream_module._set_current_stream(stream)
+                memptr = pool.malloc(event.size)
+                live[key] = memptr
+                n_mallocs += 1
+                used += memptr.mem.size
+                peak_used = max(peak_used, used)
+                if allocator.reserved > peak_reserved:
+                    peak_reserved = allocator.reserved
+                    fragmentation = pool.get_stats()['fragmentation']
+            else:
+                memptr = live.pop(key, None)
+                if memptr is None:
+                    # Allocated before the trace started.
+                    continue
+                n_frees += 1
+                used -= memptr.mem.size
+                del memptr
+        stats = pool.get_stats()
+    finally:
+        stream_module._set_current_stream(current_stream)
+        live.clear()
+
+    n_mallocs_from_pool = stats['n_cache_hits'] + stats['n_allocator_calls']
+    return {
+        'n_mallocs': n_mallocs,
+        'n_frees': n_frees,
+        'peak_used_bytes': peak_used,
+        'peak_reserved_bytes': peak_reserved,
+        'fragmentation': fragmentation,
+        'hit_rate': (stats['n_cache_hits'] / float(n_mallocs_from_pool)
+                     if n_mallocs_from_pool else 0.0),
+        'n_allocator_calls': stats['n_allocator_calls'],
+    }
+
+
+def _parse_option(option):
+    name, _, value = option.partition('=')
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return name, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m cupy.cuda.memory_hooks.trace',
+        description='Replays a memory allocation trace on a memory pool '
+                    'backed by a fake allocator. No device memory is '
+                    'allocated, but the CUDA runtime and a device are '
+                    'required.')
+    parser.add_argument('trace', help='trace file recorded by '
+                                      'AllocationTraceHook')
+    parser.add_argument('--device-id', type=int, default=None,
+                        help='replay only the events of the device')
+    parser.add_argument('--option', action='append', default=[],
+                        metavar='NAME=VALUE',
+                        help='option of the memory pool, e.g., '
+                             'small_block_threshold=4096 '
+                             '(cross_stream_reuse is not supported)')
+    args = parser.parse_args(argv)
+
+    with open(args.trace, 'rb') as f:
+        events = load_trace(f)
+    options = dict(_parse_option(o) for o in args.option)
+    result = replay(events, device_id=args.device_id, **options)
+    json.dump(result, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 from libc.stdint cimport intptr_t
+from libcpp cimport vector
 
 
 cdef class PinnedMemoryPointer:
@@ -21,18 +22,55 @@ cpdef PinnedMemoryPointer alloc_pinned_memory(size_t size)
 cpdef set_pinned_memory_allocator(allocator=*)
 
 
+cdef class _Chunk:
+
+    cdef:
+        readonly object mem
+        readonly ptrdiff_t offset
+        readonly size_t size
+        public _Chunk prev
+        public _Chunk next
+        readonly double free_time
+
+    cpdef intptr_t ptr(self)
+    cpdef _Chunk split(self, size_t size)
+    cpdef merge(self, _Chunk remaining)
+
+
 cdef class PinnedMemoryPool:
 
     cdef:
         object _alloc
         dict _in_use
-        object _free
+        list _free
+        vector.vector[size_t] _index
         object __weakref__
         object _weakref
         object _lock
         size_t _allocation_unit_size
+        size_t _total_bytes
+        size_t _total_bytes_limit
+        double _idle_timeout
+        size_t _high_water_mark
+        double _next_trim_time
+        object _trim_thread_stop
+        size_t _n_trimmed_blocks
+        size_t _trimmed_bytes
 
     cpdef PinnedMemoryPointer malloc(self, size_t size)
+    cdef _Chunk _get_chunk(self, size_t size)
+    cdef object _try_alloc(self, size_t size)
+    cdef _append_to_free_list(self, _Chunk chunk)
+    cdef bint _remove_from_free_list(self, _Chunk chunk) except *
     cpdef free(self, intptr_t ptr, size_t size)
     cpdef free_all_blocks(self)
     cpdef n_free_blocks(self)
+    cpdef size_t used_bytes(self)
+    cpdef size_t free_bytes(self)
+    cpdef size_t total_bytes(self)
+    cpdef set_limit(self, size_t size)
+    cpdef size_t get_limit(self)
+    cpdef set_idle_release(self, double timeout=?, size_t high_water_mark=?,
+                           bint background=?)
+    cpdef size_t trim(self)
+    cpdef dict get_stats(self)
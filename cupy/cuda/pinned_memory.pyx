@@ -1,13 +1,16 @@
 # distutils: language = c++
+cimport cython  # NOQA
 
-import collections
+import operator
+import time
 import weakref
 
 from fastrlock cimport rlock
+from libcpp cimport algorithm
 
+from cupy.cuda import memory
 from cupy.cuda import runtime
 
-from cupy.core cimport internal
 from cupy.cuda cimport runtime
 
 
@@ -238,9 +241,9 @@ class PooledPinnedMemory(PinnedMemory):
 
     """
 
-    def __init__(self, mem, pool):
-        self.ptr = mem.ptr
-        self.size = mem.size
+    def __init__(self, _Chunk chunk, pool):
+        self.ptr = chunk.ptr()
+        self.size = chunk.size
         self.pool = pool
 
     def free(self):
@@ -259,14 +262,77 @@ class PooledPinnedMemory(PinnedMemory):
     __del__ = free
 
 
+@cython.final
+cdef class _Chunk:
+
+    """A chunk points to a pinned memory.
+
+    A chunk might be a split memory block from a larger allocation.
+    The prev/next pointers construct a doubly-linked list of memory addresses
+    sorted by base address that must be contiguous.
+
+    Args:
+        mem (~cupy.cuda.PinnedMemory): The pinned memory buffer.
+        offset (int): An offset bytes from the head of the buffer.
+        size (int): Chunk size in bytes.
+
+    Attributes:
+        mem (PinnedMemory): The pinned memory buffer.
+        offset (int): An offset bytes from the head of the buffer.
+        size (int): Chunk size in bytes.
+        prev (Chunk): prev memory pointer if split from a larger allocation
+        next (Chunk): next memory pointer if split from a larger allocation
+    """
+
+    def __init__(self, mem, ptrdiff_t offset, size_t size):
+        assert mem.ptr != 0 or offset == 0
+        self.mem = mem
+        self.offset = offset
+        self.size = size
+
+    cpdef intptr_t ptr(self):
+        return self.mem.ptr + self.offset
+
+    cpdef _Chunk split(self, size_t size):
+        """Split contiguous block of a larger allocation"""
+        cdef _Chunk remaining
+        assert self.size >= size
+        if self.size == size:
+            return None
+        remaining = _Chunk(self.mem, self.offset + size, self.size - size)
+        remaining.free_time = self.free_time
+        self.size = size
+
+        if self.next is not None:
+            remaining.next = self.next
+            remaining.next.prev = remaining
+        self.next = remaining
+        remaining.prev = self
+        return remaining
+
+    cpdef merge(self, _Chunk remaining):
+        """Merge previously splitted block (chunk)"""
+        self.size += remaining.size
+        self.next = remaining.next
+        if remaining.next is not None:
+            self.next.prev = self
+
+
 cdef class PinnedMemoryPool:
 
     """Memory pool for pinned memory on the host.
 
     Note that it preserves all allocated memory buffers even if the user
     explicitly release the one. Those released memory buffers are held by the
-    memory pool as *free blocks*, and reused for further memory allocations of
-    the same size.
+    memory pool as *free blocks*, and reused for further memory allocations.
+
+    - The allocator attempts to find the smallest cached block that will fit
+      the requested size. If the block is larger than the requested size,
+      it is split, and the split blocks are merged again when freed.
+      If no block is found, the allocator will delegate to cudaHostAlloc.
+    - If the allocation would exceed the limit set by :meth:`set_limit`, or
+      cudaHostAlloc fails, the allocator will free all cached blocks that are
+      not split and retry the allocation.
 
     Args:
         allocator (function): The base CuPy pinned memory allocator. It is
@@ -277,14 +343,22 @@ cdef class PinnedMemoryPool:
 
     def __init__(self, allocator=_malloc):
         self._in_use = {}
-        self._free = collections.defaultdict(list)
+        self._free = []
         self._alloc = allocator
         self._weakref = weakref.ref(self)
         self._lock = rlock.create_fastrlock()
         self._allocation_unit_size = 512
+        self._total_bytes = 0
+        self._total_bytes_limit = 0
+        self._idle_timeout = 0
+        self._high_water_mark = 0
+        self._next_trim_time = 0
+        self._trim_thread_stop = None
+        self._n_trimmed_blocks = 0
+        self._trimmed_bytes = 0
 
     cpdef PinnedMemoryPointer malloc(self, size_t size):
-        cdef list free
+        cdef _Chunk chunk
         cdef size_t unit
 
         if size == 0:
@@ -292,44 +366,155 @@ cdef class PinnedMemoryPool:
 
         # Round up the memory size to fit memory alignment of cudaHostAlloc
         unit = self._allocation_unit_size
-        size = internal.clp2(((size + unit - 1) // unit) * unit)
+        size = ((size + unit - 1) // unit) * unit
+        if (self._next_trim_time != 0 and self._trim_thread_stop is None and
+                time.time() >= self._next_trim_time):
+            self.trim()
         rlock.lock_fastrlock(self._lock, -1, True)
         try:
-            free = self._free[size]
-            if free:
-                mem = free.pop()
-            else:
-                try:
-                    mem = self._alloc(size).mem
-                except runtime.CUDARuntimeError as e:
-                    if e.status != runtime.errorMemoryAllocation:
-                        raise
-                    self.free_all_blocks()
-                    mem = self._alloc(size).mem
-
-            self._in_use[mem.ptr] = mem
+            # find best-fit, or a smallest larger allocation
+            chunk = self._get_chunk(size)
+            if chunk is None:
+                chunk = _Chunk(self._try_alloc(size), 0, size)
+            self._in_use[chunk.ptr()] = chunk
         finally:
             rlock.unlock_fastrlock(self._lock)
-        pmem = PooledPinnedMemory(mem, self._weakref)
+        pmem = PooledPinnedMemory(chunk, self._weakref)
         return PinnedMemoryPointer(pmem, 0)
 
+    cdef _Chunk _get_chunk(self, size_t size):
+        # need self._lock
+        cdef set free_list
+        cdef _Chunk chunk
+        cdef size_t index
+        cdef size_t bin_index = (size - 1) // self._allocation_unit_size
+        index = <size_t>(
+            algorithm.lower_bound(self._index.begin(), self._index.end(),
+                                  bin_index)
+            - self._index.begin())
+        if index == self._index.size():
+            return None
+        free_list = self._free[index]
+        chunk = free_list.pop()
+        if len(free_list) == 0:
+            self._index.erase(self._index.begin() + index)
+            del self._free[index]
+        remaining = chunk.split(size)
+        if remaining is not None:
+            self._append_to_free_list(remaining)
+        return chunk
+
+    cdef object _try_alloc(self, size_t size):
+        # need self._lock
+        mem = None
+        if (self._total_bytes_limit != 0 and
+                self._total_bytes + size > self._total_bytes_limit):
+            self.free_all_blocks()
+            if self._total_bytes + size > self._total_bytes_limit:
+                raise memory.OutOfMemoryError(
+                    size, self._total_bytes, self._total_bytes_limit)
+        self._total_bytes += size
+        try:
+            try:
+                mem = self._alloc(size).mem
+            except runtime.CUDARuntimeError as e:
+                if e.status != runtime.errorMemoryAllocation:
+                    raise
+                self.free_all_blocks()
+                mem = self._alloc(size).mem
+        finally:
+            if mem is None:
+                self._total_bytes -= size
+        return mem
+
+    cdef _append_to_free_list(self, _Chunk chunk):
+        # need self._lock
+        cdef size_t index
+        cdef size_t bin_index = (
+            (chunk.size - 1) // self._allocation_unit_size)
+        index = <size_t>(
+            algorithm.lower_bound(self._index.begin(), self._index.end(),
+                                  bin_index)
+            - self._index.begin())
+        if index < self._index.size() and self._index[index] == bin_index:
+            free_list = self._free[index]
+        else:
+            free_list = set()
+            self._index.insert(self._index.begin() + index, bin_index)
+            self._free.insert(index, free_list)
+        free_list.add(chunk)
+
+    cdef bint _remove_from_free_list(self, _Chunk chunk) except *:
+        """Removes the chunk from the free list (need self._lock).
+
+        Returns:
+            bool: ``True`` if the chunk can successfully be removed from
+                the free list. ``False`` otherwise (e.g., the chunk could not
+                be found in the free list as the chunk is allocated.)
+        """
+        cdef set free_list
+        cdef size_t index
+        cdef size_t bin_index = (
+            (chunk.size - 1) // self._allocation_unit_size)
+        index = <size_t>(
+            algorithm.lower_bound(self._index.begin(), self._index.end(),
+                                  bin_index)
+            - self._index.begin())
+        if index == self._index.size() or self._index[index] != bin_index:
+            return False
+        free_list = self._free[index]
+        if chunk not in free_list:
+            return False
+        free_list.remove(chunk)
+        if len(free_list) == 0:
+            self._index.erase(self._index.begin() + index)
+            del self._free[index]
+        return True
+
     cpdef free(self, intptr_t ptr, size_t size):
-        cdef list free
+        cdef _Chunk chunk, c
         rlock.lock_fastrlock(self._lock, -1, True)
         try:
-            mem = self._in_use.pop(ptr, None)
-            if mem is None:
+            chunk = self._in_use.pop(ptr, None)
+            if chunk is None:
                 raise RuntimeError('Cannot free out-of-pool memory')
-            free = self._free[size]
-            free.append(mem)
+
+            c = chunk.next
+            if c is not None and self._remove_from_free_list(c):
+                chunk.merge(c)
+
+            c = chunk.prev
+            if c is not None and self._remove_from_free_list(c):
+                c.merge(chunk)
+                chunk = c
+
+            chunk.free_time = time.time()
+            self._append_to_free_list(chunk)
         finally:
             rlock.unlock_fastrlock(self._lock)
 
     cpdef free_all_blocks(self):
-        """Release free all blocks."""
+        """Release free all blocks that are not split."""
+        cdef _Chunk chunk
+        cdef set free_list, keep_list
+        cdef list new_free = []
+        cdef vector.vector[size_t] new_index
+        cdef size_t i
         rlock.lock_fastrlock(self._lock, -1, True)
         try:
-            self._free.clear()
+            for i in range(self._index.size()):
+                keep_list = set()
+                free_list = self._free[i]
+                for chunk in free_list:
+                    if chunk.prev is not None or chunk.next is not None:
+                        keep_list.add(chunk)
+                    else:
+                        self._total_bytes -= chunk.size
+                if keep_list:
+                    new_index.push_back(self._index[i])
+                    new_free.append(keep_list)
+            self._index.swap(new_index)
+            self._free = new_free
         finally:
             rlock.unlock_fastrlock(self._lock)
 
@@ -342,8 +527,165 @@ cdef class PinnedMemoryPool:
         cdef Py_ssize_t n = 0
         rlock.lock_fastrlock(self._lock, -1, True)
         try:
-            for v in self._free.values():
+            for v in self._free:
                 n += len(v)
         finally:
             rlock.unlock_fastrlock(self._lock)
         return n
+
+    cpdef size_t used_bytes(self):
+        """Get the total number of bytes used.
+
+        Returns:
+            int: The total number of bytes used.
+        """
+        cdef size_t size = 0
+        cdef _Chunk chunk
+        rlock.lock_fastrlock(self._lock, -1, True)
+        try:
+            for chunk in self._in_use.values():
+                size += chunk.size
+        finally:
+            rlock.unlock_fastrlock(self._lock)
+        return size
+
+    cpdef size_t free_bytes(self):
+        """Get the total number of bytes acquired but not used in the pool.
+
+        Returns:
+            int: The total number of bytes acquired but not used in the pool.
+        """
+        cdef size_t size = 0
+        cdef _Chunk chunk
+        rlock.lock_fastrlock(self._lock, -1, True)
+        try:
+            for free_list in self._free:
+                for chunk in free_list:
+                    size += chunk.size
+        finally:
+            rlock.unlock_fastrlock(self._lock)
+        return size
+
+    cpdef size_t total_bytes(self):
+        """Get the total number of bytes acquired in the pool.
+
+        Returns:
+            int: The total number of bytes acquired in the pool.
+        """
+        return self._total_bytes
+
+    cpdef set_limit(self, size_t size):
+        """Sets the upper limit of pinned memory allocation.
+
+        When an allocation would exceed the limit, the pool first releases
+        the free blocks that are not split, and then raises
+        :class:`~cupy.cuda.memory.OutOfMemoryError` if the limit would still
+        be exceeded.
+
+        Args:
+            size (int): Limit size in bytes. ``0`` disables the limit.
+        """
+        self._total_bytes_limit = size
+
+    cpdef size_t get_limit(self):
+        """Gets the upper limit of pinned memory allocation.
+
+        Returns:
+            int: The number of bytes. ``0`` means the limit is disabled.
+        """
+        return self._total_bytes_limit
+
+    cpdef set_idle_release(self, double timeout=0, size_t high_water_mark=0,
+                           bint background=False):
+        """Sets the policy to release idle free blocks.
+
+        Free blocks that are not split are released by :meth:`trim` when
+        they have not been reused for ``timeout`` seconds, or, oldest first,
+        while the pool holds more than ``high_water_mark`` bytes.
+        :meth:`trim` is called lazily by :meth:`malloc` once in a while, or
+        from a daemon thread when ``background`` is ``True``.
+
+        Args:
+            timeout (float): Idle time in seconds. ``0`` disables the
+                time-based release.
+            high_water_mark (int): Size in bytes. ``0`` disables the release
+                based on the pool size.
+            background (bool): If ``True``, a background thread releases the
+                blocks.
+
+        .. seealso:: :meth:`cupy.cuda.MemoryPool.set_idle_release`
+        """
+        if timeout < 0:
+            raise ValueError('timeout must be non-negative: %s' % timeout)
+        if self._trim_thread_stop is not None:
+            self._trim_thread_stop.set()
+            self._trim_thread_stop = None
+        self._idle_timeout = timeout
+        self._high_water_mark = high_water_mark
+        if timeout == 0 and high_water_mark == 0:
+            self._next_trim_time = 0
+            return
+        interval = memory._trim_interval(timeout)
+        self._next_trim_time = time.time() + interval
+        if background:
+            self._trim_thread_stop = memory._start_trim_thread(
+                self._weakref, interval)
+
+    cpdef size_t trim(self):
+        """Releases idle free blocks.
+
+        Returns:
+            int: The number of bytes released.
+
+        .. seealso:: :meth:`set_idle_release`
+        """
+        cdef list chunks = [], released = []
+        cdef _Chunk chunk
+        cdef size_t size = 0
+        cdef double now = time.time()
+
+        rlock.lock_fastrlock(self._lock, -1, True)
+        try:
+            for free_list in self._free:
+                for chunk in free_list:
+                    if chunk.prev is None and chunk.next is None:
+                        chunks.append(chunk)
+            # Oldest chunks are released first.
+            chunks.sort(key=operator.attrgetter('free_time'))
+            for chunk in chunks:
+                if not ((self._idle_timeout != 0 and
+                         now - chunk.free_time >= self._idle_timeout) or
+                        (self._high_water_mark != 0 and
+                         self._total_bytes > self._high_water_mark)):
+                    break
+                self._remove_from_free_list(chunk)
+                self._total_bytes -= chunk.size
+                size += chunk.size
+                released.append(chunk)
+            self._n_trimmed_blocks += len(released)
+            self._trimmed_bytes += size
+            if self._next_trim_time != 0:
+                self._next_trim_time = (
+                    now + memory._trim_interval(self._idle_timeout))
+        finally:
+            rlock.unlock_fastrlock(self._lock)
+        return size
+
+    cpdef dict get_stats(self):
+        """Gets the statistics of the pool.
+
+        Returns:
+            dict: A dictionary with ``used_bytes``, ``free_bytes``,
+            ``total_bytes``, ``limit``, ``n_free_blocks``,
+            ``n_trimmed_blocks`` and ``trimmed_bytes`` (the number of free
+            blocks and bytes released by :meth:`trim`).
+        """
+        return {
+            'used_bytes': self.used_bytes(),
+            'free_bytes': self.free_bytes(),
+            'total_bytes': self._total_bytes,
+            'limit': self._total_bytes_limit,
+            'n_free_blocks': self.n_free_blocks(),
+            'n_trimmed_blocks': self._n_trimmed_blocks,
+            'trimmed_bytes': self._trimmed_bytes,
+        }
@@ -1,5 +1,4 @@
 import numpy
-import six
 
 import cupy
 from cupy import core
@@ -66,34 +65,16 @@ def prod(a, axis=None, dtype=None, out=None, keepdims=False):
 # TODO(okuta): Implement nansum
 
 
-def _axis_to_first(x, axis):
-    if axis < 0:
-        axis = x.ndim + axis
-    trans = [axis] + [a for a in six.moves.range(x.ndim) if a != axis]
-    pre = list(six.moves.range(1, axis + 1))
-    succ = list(six.moves.range(axis + 1, x.ndim))
-    revert = pre + [0] + succ
-    return trans, revert
-
-
-def _proc_as_batch(proc, x, axis):
-    if x.shape[axis] == 0:
-        return cupy.empty_like(x)
-    trans, revert = _axis_to_first(x, axis)
-    t = x.transpose(trans)
-    s = t.shape
-    r = t.reshape(x.shape[axis], -1)
-    pos = 1
-    size = r.size
-    batch = r.shape[1]
-    while pos < size:
-        proc(pos, batch, r, size=size)
-        pos <<= 1
-    return r.reshape(s).transpose(revert)
-
-
-def _cum_core(a, axis, dtype, out, kern, batch_kern):
+def _cum_core(a, axis, dtype, out, op):
     a = cupy.asarray(a)
+    if axis is None:
+        a = a.ravel()
+        axis = 0
+    elif not (-a.ndim <= axis < a.ndim):
+        raise core._AxisError('axis(={}) out of bounds'.format(axis))
+    elif axis < 0:
+        axis += a.ndim
+
     if out is None:
         if dtype is None:
             kind = a.dtype.kind
@@ -105,47 +86,13 @@ def _cum_core(a, axis, dtype, out, kern, batch_kern):
                 dtype = numpy.dtype('L')
             else:
                 dtype = a.dtype
+        out = cupy.empty(a.shape, dtype)
+    elif out.shape != a.shape:
+        ret = _cum_core(a, axis, out.dtype, None, op)
+        out[...] = ret.reshape(out.shape)
+        return out
 
-        out = a.astype(dtype)
-    else:
-        out[...] = a
-
-    if axis is None:
-        out = out.ravel()
-    elif not (-a.ndim <= axis < a.ndim):
-        raise core._AxisError('axis(={}) out of bounds'.format(axis))
-    else:
-        return _proc_as_batch(batch_kern, out, axis=axis)
-
-    pos = 1
-    while pos < out.size:
-        kern(pos, out, size=out.size)
-        pos <<= 1
-    return out
-
-
-_cumsum_batch_kern = core.ElementwiseKernel(
-    'int64 pos, int64 batch', 'raw T x',
-    '''
-    ptrdiff_t b = i % batch;
-    ptrdiff_t j = i / batch;
-    if (j & pos) {
-      const ptrdiff_t dst_index[] = {j, b};
-      const ptrdiff_t src_index[] = {j ^ pos | (pos - 1), b};
-      x[dst_index] += x[src_index];
-    }
-    ''',
-    'cumsum_batch_kernel'
-)
-_cumsum_kern = core.ElementwiseKernel(
-    'int64 pos', 'raw T x',
-    '''
-    if (i & pos) {
-      x[i] += x[i ^ pos | (pos - 1)];
-    }
-    ''',
-    'cumsum_kernel'
-)
+    return _math._scan(a, axis, op, False, out)
 
 
 def cumsum(a, axis=None, dtype=None, out=None):
@@ -164,31 +111,7 @@ def cumsum(a, axis=None, dtype=None, out=None):
     .. seealso:: :func:`numpy.cumsum`
 
     """
-    return _cum_core(a, axis, dtype, out, _cumsum_kern, _cumsum_batch_kern)
-
-
-_cumprod_batch_kern = core.ElementwiseKernel(
-    'int64 pos, int64 batch', 'raw T x',
-    '''
-    ptrdiff_t b = i % batch;
-    ptrdiff_t j = i / batch;
-    if (j & pos) {
-      const ptrdiff_t dst_index[] = {j, b};
-      const ptrdiff_t src_index[] = {j ^ pos | (pos - 1), b};
-      x[dst_index] *= x[src_index];
-    }
-    ''',
-    'cumprod_batch_kernel'
-)
-_cumprod_kern = core.ElementwiseKernel(
-    'int64 pos', 'raw T x',
-    '''
-    if (i & pos) {
-      x[i] *= x[i ^ pos | (pos - 1)];
-    }
-    ''',
-    'cumprod_kernel'
-)
+    return _cum_core(a, axis, dtype, out, 'sum')
 
 
 def cumprod(a, axis=None, dtype=None, out=None):
@@ -207,7 +130,7 @@ def cumprod(a, axis=None, dtype=None, out=None):
     .. seealso:: :func:`numpy.cumprod`
 
     """
-    return _cum_core(a, axis, dtype, out, _cumprod_kern, _cumprod_batch_kern)
+    return _cum_core(a, axis, dtype, out, 'prod')
 
 
 # TODO(okuta): Implement diff
@@ -3,6 +3,7 @@ import functools
 
 from cupy import cuda
 from cupy.cuda import runtime
+from cupy.cuda.memory_hooks import timeline
 
 
 @contextlib.contextmanager
@@ -39,11 +40,13 @@ def time_range(message, color_id=None, argb_color=None, sync=False):
         if color_id is None:
             color_id = -1
         cuda.nvtx.RangePush(message, color_id)
+    timeline._range_push(message)
     try:
         yield
     finally:
         if sync:
             runtime.deviceSynchronize()
+        timeline._range_pop()
         cuda.nvtx.RangePop()
 
 
@@ -90,11 +93,13 @@ class TimeRangeDecorator(object):
             cuda.nvtx.RangePushC(self.message, self.argb_color)
         else:
             cuda.nvtx.RangePush(self.message, self.color_id)
+        timeline._range_push(self.message)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         if self.sync:
             runtime.deviceSynchronize()
+        timeline._range_pop()
         cuda.nvtx.RangePop()
 
     def _recreate_cm(self, message):
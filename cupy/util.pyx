@@ -3,6 +3,8 @@
 import atexit
 import collections
 import functools
+import os
+import threading
 import warnings
 
 import cupy
@@ -19,41 +21,146 @@ except AttributeError:  # python <3.3
 
 cdef list _memos = []
 
+cdef object _missing = object()
+
+
+cdef class _Memo:
+
+    """Memoized results of a function with statistics."""
+
+    cdef:
+        readonly object name
+        readonly Py_ssize_t maxsize
+        readonly Py_ssize_t hits
+        readonly Py_ssize_t misses
+        dict _dict
+        object _lru
+        object _lock
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = -1 if maxsize is None else maxsize
+        self.hits = 0
+        self.misses = 0
+        self._dict = {}
+        self._lru = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    cdef object call(self, f, key, args, kwargs):
+        if self.maxsize < 0:
+            result = self._dict.get(key, _missing)
+            if result is not _missing:
+                self.hits += 1
+                return result
+            self.misses += 1
+            result = f(*args, **kwargs)
+            self._dict[key] = result
+            return result
 
-def memoize(bint for_each_device=False):
+        with self._lock:
+            result = self._lru.pop(key, _missing)
+            if result is not _missing:
+                self._lru[key] = result
+                self.hits += 1
+                return result
+        self.misses += 1
+        # f is called without the lock as it may call memoized functions.
+        result = f(*args, **kwargs)
+        with self._lock:
+            self._lru[key] = result
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+        return result
+
+    def __len__(self):
+        return len(self._dict) + len(self._lru)
+
+    def clear(self):
+        """Clears the memoized results."""
+        self._dict.clear()
+        with self._lock:
+            self._lru.clear()
+
+    def info(self):
+        """Returns the statistics of the memo.
+
+        Returns:
+            dict: ``name``, ``entries``, ``hits``, ``misses`` and
+            ``maxsize`` (``None`` if unbounded) of the memo.
+        """
+        return {
+            'name': self.name,
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'maxsize': None if self.maxsize < 0 else self.maxsize,
+        }
+
+
+def memoize(bint for_each_device=False, maxsize=None):
     """Makes a function memoizing the result for each argument and device.
 
     This decorator provides automatic memoization of the function result.
+    The decorated function has ``cache_info()`` and ``cache_clear()``
+    methods to get the statistics of the memo (see :func:`get_memo_stats`)
+    and to clear it.
 
     Args:
         for_each_device (bool): If ``True``, it memoizes the results for each
             device. Otherwise, it memoizes the results only based on the
             arguments.
+        maxsize (int): Maximum number of results to memoize. If exceeded,
+            the least recently used result is discarded. If ``None``, the
+            value of ``CUPY_MEMOIZE_MAXSIZE`` is used, and the number is
+            unlimited if it is not set.
 
     """
+    if maxsize is None:
+        maxsize = _get_default_memo_maxsize()
+
     def decorator(f):
-        memo = {}
+        name = '%s.%s' % (f.__module__, f.__name__)
+        memo = _Memo(name, maxsize)
         _memos.append(memo)
 
         @functools.wraps(f)
         def ret(*args, **kwargs):
             cdef int id = -1
-            cdef dict m = memo
+            cdef _Memo m = memo
             if for_each_device:
                 id = device.get_device_id()
             arg_key = (id, args, frozenset(kwargs.items()))
-            if arg_key in m:
-                result = m[arg_key]
-            else:
-                result = f(*args, **kwargs)
-                m[arg_key] = result
-            return result
+            return m.call(f, arg_key, args, kwargs)
 
+        ret.cache_info = memo.info
+        ret.cache_clear = memo.clear
         return ret
 
     return decorator
 
 
+def _get_default_memo_maxsize():
+    maxsize = os.environ.get('CUPY_MEMOIZE_MAXSIZE')
+    if not maxsize:
+        return None
+    return int(maxsize)
+
+
+def get_memo_stats():
+    """Returns the statistics of the functions decorated by memoize.
+
+    The statistics can be used to size ``maxsize`` of :func:`memoize` and to
+    find functions that miss the memo, e.g., kernels compiled repeatedly.
+
+    Returns:
+        list of dict: Statistics of each function with the following keys:
+        ``name`` (the module and the name of the function), ``entries``
+        (the number of memoized results), ``hits``, ``misses`` and
+        ``maxsize`` (``None`` if unbounded).
+    """
+    return [memo.info() for memo in _memos]
+
+
 @atexit.register
 def clear_memo():
     """Clears the memoized results for all functions decorated by memoize."""
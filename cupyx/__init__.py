@@ -1,6 +1,12 @@
 # "NOQA" to suppress flake8 warning
+from cupyx.moments import moments  # NOQA
+from cupyx.reductions import max_argmax  # NOQA
+from cupyx.reductions import min_argmin  # NOQA
+from cupyx.reductions import min_max  # NOQA
+from cupyx.reductions import sum_sumsq  # NOQA
 from cupyx.rsqrt import rsqrt  # NOQA
 from cupyx.runtime import get_runtime_info  # NOQA
+from cupyx.scan import scan  # NOQA
 from cupyx.scatter import scatter_add  # NOQA
 
 from cupyx import linalg  # NOQA
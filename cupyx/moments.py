@@ -0,0 +1,38 @@
+from cupy.core import _routines_statistics
+
+
+def moments(a, axis=None, order=2, dtype=None, ddof=0, keepdims=False):
+    """Returns the mean and the variance along an axis in a single pass.
+
+    The moments are computed by a single reduction which merges the partial
+    results with the parallel algorithm of Welford and Chan et al., so that
+    the input array is read only once. float16 inputs are accumulated in
+    float32.
+
+    Args:
+        a (cupy.ndarray): Array to compute the moments.
+        axis (int or tuple of ints): Along which axis to compute the moments.
+            The flattened array is used by default.
+        order (int): The highest order of the moments. ``1`` returns the
+            mean and ``2`` returns the mean and the variance.
+        dtype: Data type specifier.
+        ddof (int): Delta degrees of freedom of the variance.
+        keepdims (bool): If ``True``, the axis is remained as an axis of
+            size one.
+
+    Returns:
+        tuple of cupy.ndarray: The moments of the input array up to
+        ``order``, i.e., ``(mean,)`` or ``(mean, var)``.
+
+    .. seealso:: :func:`cupy.mean`, :func:`cupy.var`
+
+    """
+    if order < 1:
+        raise ValueError('order must be positive: %d' % order)
+    if order > 2:
+        raise NotImplementedError(
+            'moments of order higher than 2 are not supported')
+    if order == 1:
+        return a.mean(axis=axis, dtype=dtype, keepdims=keepdims),
+    return _routines_statistics._mean_var(
+        a, axis=axis, dtype=dtype, ddof=ddof, keepdims=keepdims)
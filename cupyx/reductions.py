@@ -0,0 +1,85 @@
+from cupy.core import _routines_math
+from cupy.core import _routines_statistics
+
+
+def max_argmax(a, axis=None, keepdims=False):
+    """Returns the maximum and its index along an axis in a single pass.
+
+    Args:
+        a (cupy.ndarray): Array to take the maximum.
+        axis (int or tuple of ints): Along which axis to take the maximum.
+            The flattened array is used by default.
+        keepdims (bool): If ``True``, the axis is remained as an axis of
+            size one.
+
+    Returns:
+        tuple of cupy.ndarray: The maximum and the index of its first
+        occurrence. If ``axis`` is a tuple, the index is the one in the
+        flattened subarray of the axes.
+
+    .. seealso:: :func:`cupy.amax`, :func:`cupy.argmax`
+
+    """
+    return _routines_statistics.max_argmax(a, axis=axis, keepdims=keepdims)
+
+
+def min_argmin(a, axis=None, keepdims=False):
+    """Returns the minimum and its index along an axis in a single pass.
+
+    Args:
+        a (cupy.ndarray): Array to take the minimum.
+        axis (int or tuple of ints): Along which axis to take the minimum.
+            The flattened array is used by default.
+        keepdims (bool): If ``True``, the axis is remained as an axis of
+            size one.
+
+    Returns:
+        tuple of cupy.ndarray: The minimum and the index of its first
+        occurrence. If ``axis`` is a tuple, the index is the one in the
+        flattened subarray of the axes.
+
+    .. seealso:: :func:`cupy.amin`, :func:`cupy.argmin`
+
+    """
+    return _routines_statistics.min_argmin(a, axis=axis, keepdims=keepdims)
+
+
+def min_max(a, axis=None, keepdims=False):
+    """Returns the minimum and the maximum along an axis in a single pass.
+
+    Args:
+        a (cupy.ndarray): Array to take the minimum and the maximum.
+        axis (int or tuple of ints): Along which axis to take them. The
+            flattened array is used by default.
+        keepdims (bool): If ``True``, the axis is remained as an axis of
+            size one.
+
+    Returns:
+        tuple of cupy.ndarray: The minimum and the maximum.
+
+    .. seealso:: :func:`cupy.amin`, :func:`cupy.amax`
+
+    """
+    return _routines_statistics.min_max(a, axis=axis, keepdims=keepdims)
+
+
+def sum_sumsq(a, axis=None, dtype=None, keepdims=False):
+    """Returns the sum and the sum of squares along an axis in a single pass.
+
+    Args:
+        a (cupy.ndarray): Array to take the sums.
+        axis (int or tuple of ints): Along which axis to take the sums. The
+            flattened array is used by default.
+        dtype: Data type specifier of the sums.
+        keepdims (bool): If ``True``, the axis is remained as an axis of
+            size one.
+
+    Returns:
+        tuple of cupy.ndarray: The sum of the elements and the sum of their
+        squares, i.e., ``(a.sum(), (a * a).sum())``.
+
+    .. seealso:: :func:`cupy.sum`
+
+    """
+    return _routines_math.sum_sumsq(
+        a, axis=axis, dtype=dtype, keepdims=keepdims)
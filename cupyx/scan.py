@@ -0,0 +1,43 @@
+import cupy
+from cupy import core
+from cupy.core import _routines_math
+
+
+def scan(a, axis=None, op='sum', exclusive=False, dtype=None, out=None):
+    """Returns the scan of an array along an axis.
+
+    Each segment along the axis is scanned independently by a single
+    kernel, and strided arrays are scanned without copies. Long
+    one-dimensional arrays are scanned in a single pass.
+
+    Args:
+        a (cupy.ndarray): Input array.
+        axis (int): Axis along which the scan is taken. If it is not
+            specified, the input is flattened.
+        op (str): Operator of the scan. One of ``'sum'``, ``'prod'``,
+            ``'max'`` and ``'min'``. NaN is propagated by ``'max'`` and
+            ``'min'``.
+        exclusive (bool): If ``True``, each element of the result does not
+            include the corresponding input element, and the first elements
+            are the identity of the operator.
+        dtype: Data type specifier. The dtype of the input is used by
+            default.
+        out (cupy.ndarray): Output array. It must have the shape of the
+            result.
+
+    Returns:
+        cupy.ndarray: The result array.
+
+    .. seealso:: :func:`cupy.cumsum`, :func:`cupy.cumprod`
+
+    """
+    if axis is None:
+        a = a.ravel()
+        axis = 0
+    elif not (-a.ndim <= axis < a.ndim):
+        raise core._AxisError('axis(={}) out of bounds'.format(axis))
+    elif axis < 0:
+        axis += a.ndim
+    if out is None:
+        out = cupy.empty(a.shape, a.dtype if dtype is None else dtype)
+    return _routines_math._scan(a, axis, op, exclusive, out)
@@ -0,0 +1,124 @@
+"""Command line tool to manage the kernel cache of CuPy.
+
+Usage::
+
+    $ python -m cupyx.tools.kernel_cache list
+    $ python -m cupyx.tools.kernel_cache verify --remove
+    $ python -m cupyx.tools.kernel_cache prune --max-size 1000000000
+    $ python -m cupyx.tools.kernel_cache stats
+
+If ``CUPY_CACHE_BACKEND`` is ``pack``, ``prune`` and ``stats`` work on the
+packed file, and ``compact`` removes stale records from it.
+"""
+
+import argparse
+import datetime
+import os
+import sys
+
+from cupy.cuda import compiler
+
+
+def _list(args):
+    for path, size, last_access in compiler.list_cache(args.cache_dir):
+        print('%s %10d %s' % (
+            datetime.datetime.fromtimestamp(last_access).isoformat(' '),
+            size, os.path.basename(path)))
+
+
+def _verify(args):
+    corrupted = compiler.verify_cache(args.cache_dir, remove=args.remove)
+    for path in corrupted:
+        print('%s %s' % ('removed' if args.remove else 'corrupted',
+                         os.path.basename(path)))
+    return 1 if corrupted and not args.remove else 0
+
+
+def _get_packed_cache(args):
+    return compiler.PackedKernelCache(
+        args.cache_dir or compiler.get_cache_dir())
+
+
+def _prune(args):
+    if compiler.get_cache_backend() == 'pack':
+        n_removed = _get_packed_cache(args).prune(
+            max_size=args.max_size, max_entries=args.max_entries)
+        print('removed %d kernels' % n_removed)
+        return
+    removed = compiler.prune_cache(args.cache_dir, max_size=args.max_size,
+                                   max_entries=args.max_entries)
+    for path in removed:
+        print('removed %s' % os.path.basename(path))
+
+
+def _compact(args):
+    n_removed = _get_packed_cache(args).compact()
+    print('removed %d kernels' % n_removed)
+
+
+def _stats(args):
+    if args.reset:
+        compiler.reset_cache_stats(args.cache_dir)
+        return
+    if compiler.get_cache_backend() == 'pack':
+        cache = _get_packed_cache(args)
+        n_entries = len(cache)
+        size = os.path.getsize(cache.path) if n_entries else 0
+    else:
+        entries = compiler.list_cache(args.cache_dir)
+        n_entries = len(entries)
+        size = sum(entry[1] for entry in entries)
+    stats = compiler.get_cache_stats(args.cache_dir)
+    lookups = stats['hits'] + stats['misses']
+    print('entries:  %d' % n_entries)
+    print('size:     %d' % size)
+    print('hits:     %d' % stats['hits'])
+    print('misses:   %d' % stats['misses'])
+    print('hit rate: %.3f' % (
+        stats['hits'] / float(lookups) if lookups else 0.0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m cupyx.tools.kernel_cache',
+        description='Manages the kernel cache of CuPy.')
+    parser.add_argument('--cache-dir', default=None,
+                        help='cache directory (default: CUPY_CACHE_DIR or '
+                             '~/.cupy/kernel_cache)')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    p = subparsers.add_parser(
+        'list', help='list kernels from the least recently used')
+    p.set_defaults(func=_list)
+
+    p = subparsers.add_parser('verify', help='verify hashes of kernels')
+    p.add_argument('--remove', action='store_true',
+                   help='remove corrupted kernels')
+    p.set_defaults(func=_verify)
+
+    p = subparsers.add_parser(
+        'prune', help='remove the least recently used kernels')
+    p.add_argument('--max-size', type=int, default=None,
+                   help='maximum total size in bytes '
+                        '(default: CUPY_CACHE_MAX_SIZE)')
+    p.add_argument('--max-entries', type=int, default=None,
+                   help='maximum number of kernels '
+                        '(default: CUPY_CACHE_MAX_ENTRIES)')
+    p.set_defaults(func=_prune)
+
+    p = subparsers.add_parser(
+        'compact', help='remove stale records from the packed file')
+    p.set_defaults(func=_compact)
+
+    p = subparsers.add_parser('stats', help='show hit and miss statistics')
+    p.add_argument('--reset', action='store_true',
+                   help='clear the statistics')
+    p.set_defaults(func=_stats)
+
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
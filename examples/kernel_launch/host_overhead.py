@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import cupy
+from cupy.core import _kernel
+
+# This benchmark measures the host-side cost of elementwise kernel calls on
+# small arrays, for which the preprocessing of the arguments dominates.
+#
+# "prepare" measures only the preprocessing done by Python/Cython code,
+# i.e., the work that is skipped when the launch plan of the arguments is
+# cached. "call" measures the whole call including the kernel launch.
+
+
+def bench(func, n_iter):
+    func()
+    cupy.cuda.Device().synchronize()
+    start = time.time()
+    for _ in range(n_iter):
+        func()
+    elapsed = time.time() - start
+    cupy.cuda.Device().synchronize()
+    return elapsed / n_iter * 1e6
+
+
+def run(n_iter):
+    kernel = cupy.ElementwiseKernel(
+        'T x, T y', 'T z', 'z = x * y + 1', 'host_overhead_kernel')
+    x = cupy.arange(12, dtype='f').reshape(3, 4)
+    y = cupy.arange(4, dtype='f')
+    t = x.T
+    cases = [
+        ('ufunc', 'contiguous', cupy.add, (x, x)),
+        ('ufunc', 'broadcast', cupy.add, (x, y)),
+        ('ufunc', 'transposed', cupy.add, (t, t)),
+        ('ufunc', 'scalar', cupy.add, (x, 1)),
+        ('kernel', 'contiguous', kernel, (x, x)),
+        ('kernel', 'broadcast', kernel, (x, y)),
+        ('kernel', 'scalar', kernel, (x, 1.0)),
+    ]
+    print('{:8s} {:12s} {:>12s} {:>12s} {:>12s} {:>12s}'.format(
+        'func', 'args', 'prepare', 'prepare+plan', 'call', 'call+plan'))
+    for kind, name, func, args in cases:
+        results = []
+        for stage in ('prepare', 'call'):
+            if stage == 'prepare':
+                def f():
+                    func._prepare(args, {})
+            else:
+                def f():
+                    func(*args)
+            for cache_size in (0, 256):
+                prev = _kernel._set_launch_plan_cache_size(cache_size)
+                try:
+                    results.append(bench(f, n_iter))
+                finally:
+                    _kernel._set_launch_plan_cache_size(prev)
+        print('{:8s} {:12s} {:9.2f} us {:9.2f} us {:9.2f} us {:9.2f} us'
+              .format(kind, name, *results))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--gpu-id', '-g', default=0, type=int)
+    parser.add_argument('--n-iter', '-n', default=10000, type=int)
+    args = parser.parse_args()
+
+    with cupy.cuda.Device(args.gpu_id):
+        run(args.n_iter)
+
+
+if __name__ == '__main__':
+    main()
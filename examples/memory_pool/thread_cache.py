@@ -0,0 +1,72 @@
+import argparse
+import threading
+import time
+
+from cupy.cuda import memory
+
+# This benchmark measures the host-side cost of allocations and frees on a
+# memory pool shared by multiple threads, with and without the per-thread
+# caches (see `MemoryPool.set_thread_cache_size`).
+#
+# The pool is backed by a fake allocator which returns fake pointers, so no
+# device memory is allocated and no kernel is launched.
+
+
+class FakeMemory(memory.BaseMemory):
+
+    cur_ptr = 512
+    lock = threading.Lock()
+
+    def __init__(self, size):
+        with FakeMemory.lock:
+            self.ptr = FakeMemory.cur_ptr
+            FakeMemory.cur_ptr += size
+        self.size = size
+        self.device_id = 0
+
+
+def fake_alloc(size):
+    return memory.MemoryPointer(FakeMemory(size), 0)
+
+
+def worker(pool, sizes, n_iter, barrier, times):
+    barrier.wait()
+    start = time.time()
+    for _ in range(n_iter):
+        ptrs = [pool.malloc(size) for size in sizes]
+        del ptrs
+    times.append(time.time() - start)
+
+
+def run(n_threads, n_iter, thread_cache_size):
+    pool = memory.SingleDeviceMemoryPool(allocator=fake_alloc)
+    pool.set_thread_cache_size(thread_cache_size)
+    sizes = [512 * (i % 8 + 1) for i in range(16)]
+    barrier = threading.Barrier(n_threads)
+    times = []
+    threads = [threading.Thread(target=worker,
+                                args=(pool, sizes, n_iter, barrier, times))
+               for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    n_ops = n_threads * n_iter * len(sizes)
+    return max(times), n_ops
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-threads', '-t', default=8, type=int)
+    parser.add_argument('--n-iter', '-n', default=2000, type=int)
+    parser.add_argument('--thread-cache-size', '-c', default=64, type=int)
+    args = parser.parse_args()
+
+    for cache_size in (0, args.thread_cache_size):
+        elapsed, n_ops = run(args.n_threads, args.n_iter, cache_size)
+        print('thread cache size: {:4d}  {:8.3f} us per malloc/free'.format(
+            cache_size, elapsed / n_ops * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+
+import cupy
+from cupy.core import _kernel
+
+# This benchmark measures the time of sum and prod reductions with the
+# in-block reduction done by warp shuffles ("warp") and through shared
+# memory ("shared"). "single" disables the two-stage kernels used when the
+# outputs are too few to occupy the device, and uses warp shuffles.
+
+
+def bench(func, n_iter):
+    func()
+    start = cupy.cuda.Event()
+    end = cupy.cuda.Event()
+    start.record()
+    for _ in range(n_iter):
+        func()
+    end.record()
+    end.synchronize()
+    return cupy.cuda.get_elapsed_time(start, end) / n_iter * 1e3
+
+
+def run(n_iter):
+    cases = [
+        ('full', (1 << 24,), None),
+        ('rows', (16, 1 << 20), 1),
+        ('cols', (1 << 12, 1 << 12), 0),
+        ('short', (64, 1 << 18), 0),
+        ('narrow', (8, 1 << 21), 0),
+    ]
+    modes = [
+        ('shared', False, 4),
+        ('warp', True, 4),
+        ('single', True, 0),
+    ]
+    print('{:8s} {:8s} {:8s} {:>12s} {:>12s} {:>12s}'.format(
+        'func', 'case', 'dtype', *[m[0] for m in modes]))
+    for func in ('sum', 'prod'):
+        for dtype in ('f', 'd'):
+            for name, shape, axis in cases:
+                a = cupy.random.rand(*shape).astype(dtype)
+                f = getattr(a, func)
+                results = []
+                for _, warp_reduce, blocks_per_sm in modes:
+                    prev = (_kernel._warp_reduce,
+                            _kernel._two_stage_blocks_per_sm)
+                    _kernel._warp_reduce = warp_reduce
+                    _kernel._two_stage_blocks_per_sm = blocks_per_sm
+                    try:
+                        results.append(bench(lambda: f(axis=axis), n_iter))
+                    finally:
+                        (_kernel._warp_reduce,
+                         _kernel._two_stage_blocks_per_sm) = prev
+                print('{:8s} {:8s} {:8s} {:9.2f} us {:9.2f} us {:9.2f} us'
+                      .format(func, name, dtype, *results))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--gpu-id', '-g', default=0, type=int)
+    parser.add_argument('--n-iter', '-n', default=100, type=int)
+    args = parser.parse_args()
+
+    with cupy.cuda.Device(args.gpu_id):
+        run(args.n_iter)
+
+
+if __name__ == '__main__':
+    main()
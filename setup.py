@@ -167,7 +167,8 @@ setup(
         'cupyx.scipy.special',
         'cupyx.scipy.linalg',
         'cupyx.linalg',
-        'cupyx.linalg.sparse'
+        'cupyx.linalg.sparse',
+        'cupyx.tools',
     ],
     package_data=package_data,
     zip_safe=False,
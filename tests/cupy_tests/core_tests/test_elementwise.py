@@ -144,3 +144,86 @@ class TestElementwiseType(unittest.TestCase):
         a = xp.array([xp.iinfo(dtype).min + 1], dtype=dtype)
         b = xp.int8(-1)
         return a + b
+
+
+@testing.gpu
+class TestUfuncLaunchPlan(unittest.TestCase):
+
+    def test_reuse_plan(self):
+        a = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        b = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        cupy.add(a, b)
+        n_plans = len(cupy.add._launch_plans)
+        for _ in range(3):
+            testing.assert_array_equal(cupy.add(a, b), a.get() + b.get())
+        self.assertEqual(len(cupy.add._launch_plans), n_plans)
+
+    @testing.numpy_cupy_array_equal()
+    def test_broadcast_and_non_contiguous(self, xp):
+        a = testing.shaped_arange((3, 4, 5), xp, 'f')[:, ::2, ::-1]
+        b = testing.shaped_arange((5,), xp, 'f')
+        return [xp.multiply(a, b) for _ in range(3)]
+
+    @testing.numpy_cupy_array_equal()
+    def test_out(self, xp):
+        a = testing.shaped_arange((2, 3), xp, 'i')
+        out = xp.zeros((2, 6), 'i')[:, ::2]
+        for _ in range(3):
+            xp.add(a, a, out=out)
+        return out
+
+    @testing.numpy_cupy_array_equal()
+    def test_value_based_casting(self, xp):
+        a = xp.array([1, 2], xp.int8)
+        return [a + 1, a + 1000, a + 1, a + 1000]
+
+    @testing.numpy_cupy_array_equal()
+    def test_empty(self, xp):
+        a = xp.empty((0, 3), 'f')
+        return [a + a, a + a]
+
+    def test_disabled(self):
+        prev = core._kernel._set_launch_plan_cache_size(0)
+        try:
+            ufunc = core.create_ufunc(
+                'test_launch_plan_disabled', ('ff->f',), 'out0 = in0 - in1')
+            a = testing.shaped_arange((2, 3), cupy, 'f')
+            testing.assert_array_equal(ufunc(a, a), numpy.zeros((2, 3), 'f'))
+            self.assertEqual(len(ufunc._launch_plans), 0)
+        finally:
+            core._kernel._set_launch_plan_cache_size(prev)
+
+
+@testing.gpu
+class TestUfuncContiguousKernel(unittest.TestCase):
+
+    def _get_variant(self, ufunc, *args):
+        return ufunc._prepare(args, {})[2].variant
+
+    def test_contiguous(self):
+        a = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        self.assertEqual(self._get_variant(cupy.add, a, a),
+                         core._kernel._CONTIGUOUS_INT32)
+
+    def test_scalar(self):
+        a = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        self.assertEqual(self._get_variant(cupy.add, a, 1),
+                         core._kernel._CONTIGUOUS_INT32)
+
+    def test_non_contiguous(self):
+        a = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        self.assertEqual(self._get_variant(cupy.add, a.T, a.T),
+                         core._kernel._GENERIC)
+
+    def test_broadcast(self):
+        a = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        b = testing.shaped_arange((4,), cupy, 'f')
+        self.assertEqual(self._get_variant(cupy.add, a, b),
+                         core._kernel._GENERIC)
+
+    @testing.for_all_dtypes()
+    @testing.numpy_cupy_array_equal()
+    def test_contiguous_and_generic(self, xp, dtype):
+        a = testing.shaped_arange((3, 4), xp, dtype)
+        b = testing.shaped_reverse_arange((3, 4), xp, dtype)
+        return xp.maximum(a, b), xp.maximum(a.T, b.T), xp.maximum(a, b[0])
@@ -1,5 +1,7 @@
 import unittest
 
+import mock
+import numpy
 import six
 
 import cupy
@@ -95,6 +97,205 @@ class TestReductionKernel(unittest.TestCase):
         self.check_int8_sum((512 + 1, 256 * 256 + 1), axis=1)
 
 
+@testing.parameterize(*testing.product({
+    'shape_axis': [((10,), None), ((3, 4, 5), 1), ((1000000,), None),
+                   ((3, 100000), 1), ((100000, 3), 0)],
+}))
+@testing.gpu
+class TestMultiOutputReduction(unittest.TestCase):
+
+    def setUp(self):
+        self.shape, self.axis = self.shape_axis
+
+    def test_simple_reduction_function(self):
+        sum_max = core.create_reduction_func(
+            'my_sum_max', ('l->ll',),
+            (('in0', 'in0'), ('a._0 + b._0', 'max(a._1, b._1)'),
+             ('out0 = a._0', 'out1 = a._1'), ('long long', 'long long')),
+            ('0', '0'))
+        a = testing.shaped_random(self.shape, cupy, 'l')
+        s, m = sum_max(a, axis=self.axis)
+        testing.assert_array_equal(s, a.get().sum(axis=self.axis))
+        testing.assert_array_equal(m, a.get().max(axis=self.axis))
+
+    def test_reduction_kernel(self):
+        sum_sumsq = core.ReductionKernel(
+            'T x', 'T s, T s2', ('x', 'x * x'),
+            ('a._0 + b._0', 'a._1 + b._1'), 's = a._0, s2 = a._1',
+            ('0', '0'), 'my_sum_sumsq', reduce_type=('T', 'T'))
+        a = testing.shaped_random(self.shape, cupy, 'd')
+        s, s2 = sum_sumsq(a, axis=self.axis)
+        a_cpu = a.get()
+        testing.assert_allclose(s, a_cpu.sum(axis=self.axis))
+        testing.assert_allclose(s2, (a_cpu * a_cpu).sum(axis=self.axis))
+
+    def test_reduction_kernel_out(self):
+        sum_sumsq = core.ReductionKernel(
+            'T x', 'T s, T s2', ('x', 'x * x'),
+            ('a._0 + b._0', 'a._1 + b._1'), ('s = a._0', 's2 = a._1'),
+            ('0', '0'), 'my_sum_sumsq', reduce_type=('T', 'T'))
+        a = testing.shaped_random(self.shape, cupy, 'd')
+        s, s2 = sum_sumsq(a, axis=self.axis)
+        out = (cupy.empty_like(s), cupy.empty_like(s2))
+        ret = sum_sumsq(a, axis=self.axis, out=out)
+        self.assertIs(ret[0], out[0])
+        self.assertIs(ret[1], out[1])
+        testing.assert_allclose(out[0], s)
+        testing.assert_allclose(out[1], s2)
+
+
+@testing.parameterize(*testing.product({
+    'shape_axis': [((1000000,), None), ((3, 100000), 1), ((100000, 3), 0),
+                   ((40, 5, 6000), (0, 2)), ((7, 1000), 1)],
+}))
+@testing.gpu
+class TestTwoStageReduction(unittest.TestCase):
+
+    def setUp(self):
+        self.shape, self.axis = self.shape_axis
+        self.my_sum = core.ReductionKernel(
+            'T x', 'T out', 'x', 'a + b', 'out = a', '0', 'my_sum_two_stage')
+
+    def _count_partial_buffers(self, f):
+        alloc = cupy.cuda.memory.alloc
+        with mock.patch('cupy.cuda.memory.alloc', side_effect=alloc) as m:
+            ret = f()
+        return ret, m.call_count
+
+    @testing.for_dtypes('iqfd')
+    @testing.numpy_cupy_allclose(rtol=1e-5)
+    def test_sum(self, xp, dtype):
+        a = testing.shaped_random(self.shape, xp, dtype)
+        if xp is numpy:
+            return a.sum(axis=self.axis)
+        ret, count = self._count_partial_buffers(
+            lambda: a.sum(axis=self.axis))
+        # Reductions with small outputs use the two-stage kernels.
+        self.assertEqual(count, int(self.shape != (7, 1000)))
+        return ret
+
+    @testing.for_dtypes('iqfd')
+    @testing.numpy_cupy_allclose(rtol=1e-5)
+    def test_reduction_kernel(self, xp, dtype):
+        a = testing.shaped_random(self.shape, xp, dtype)
+        if xp is numpy:
+            return a.sum(axis=self.axis)
+        ret, count = self._count_partial_buffers(
+            lambda: self.my_sum(a, axis=self.axis))
+        self.assertEqual(count, int(self.shape != (7, 1000)))
+        return ret
+
+    def test_reduction_kernel_stream(self):
+        a = testing.shaped_random(self.shape, cupy, 'q')
+        stream = cupy.cuda.Stream()
+        streams = []
+        alloc = cupy.cuda.memory.alloc
+
+        def alloc_on_stream(size):
+            streams.append(cupy.cuda.get_current_stream())
+            return alloc(size)
+
+        with mock.patch('cupy.cuda.memory.alloc',
+                        side_effect=alloc_on_stream):
+            ret = self.my_sum(a, axis=self.axis, stream=stream)
+        stream.synchronize()
+        self.assertEqual(streams, [stream] * int(self.shape != (7, 1000)))
+        testing.assert_array_equal(ret, a.sum(axis=self.axis))
+
+    def test_single_stage(self):
+        a = testing.shaped_random(self.shape, cupy, 'q')
+        with mock.patch('cupy.core._kernel._two_stage_blocks_per_sm', 0):
+            ret, count = self._count_partial_buffers(
+                lambda: a.sum(axis=self.axis))
+        self.assertEqual(count, 0)
+        testing.assert_array_equal(ret, a.sum(axis=self.axis))
+
+
+@testing.parameterize(*testing.product({
+    # The block strides are 1, 8 and 64 respectively.
+    'shape_axis': [((1000, 3), 0), ((64, 100), 0), ((8, 1000), 0),
+                   ((100000,), None)],
+    'warp_reduce': [True, False],
+}))
+@testing.gpu
+class TestWarpReduction(unittest.TestCase):
+
+    def setUp(self):
+        self.shape, self.axis = self.shape_axis
+        self.patch = mock.patch(
+            'cupy.core._kernel._warp_reduce', self.warp_reduce)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    @testing.for_all_dtypes(no_float16=True)
+    @testing.numpy_cupy_allclose(rtol=1e-5)
+    def test_sum(self, xp, dtype):
+        a = testing.shaped_random(self.shape, xp, dtype)
+        return a.sum(axis=self.axis)
+
+    @testing.numpy_cupy_array_equal()
+    def test_any(self, xp):
+        a = xp.zeros(self.shape, '?')
+        a[(-1,) * len(self.shape)] = True
+        return a.any(axis=self.axis)
+
+    @testing.for_float_dtypes(no_float16=True)
+    @testing.numpy_cupy_allclose()
+    def test_reduction_kernel(self, xp, dtype):
+        a = testing.shaped_random(self.shape, xp, dtype)
+        if xp is numpy:
+            return numpy.sqrt((a * a).sum(axis=self.axis))
+        kernel = core.ReductionKernel(
+            'T x', 'T y', 'x * x', 'a + b', 'y = sqrt(a)', '0',
+            'my_norm_warp')
+        return kernel(a, axis=self.axis)
+
+
+@testing.gpu
+class TestReductionKernelPrecompile(unittest.TestCase):
+
+    def test_precompile(self):
+        my_sum = core.ReductionKernel(
+            'T x', 'T out', 'x', 'a + b', 'out = a', '0', 'my_sum_precompile')
+        a = testing.shaped_arange((3, 4), cupy, 'f')
+        kern = my_sum.precompile(a, axis=1).result()
+        self.assertIsInstance(kern, cupy.cuda.function.Function)
+        testing.assert_allclose(my_sum(a, axis=1), a.sum(axis=1))
+
+    def test_precompile_two_stage(self):
+        my_sum = core.ReductionKernel(
+            'T x', 'T out', 'x', 'a + b', 'out = a', '0',
+            'my_sum_precompile_two_stage')
+        a = testing.shaped_arange((1000000,), cupy, 'f')
+        kerns = my_sum.precompile(a).result()
+        self.assertEqual(len(kerns), 2)
+        for kern in kerns:
+            self.assertIsInstance(kern, cupy.cuda.function.Function)
+        with mock.patch('cupy.cuda.compile_with_cache') as m:
+            testing.assert_allclose(my_sum(a), a.sum())
+        self.assertEqual(m.call_count, 0)
+
+    def test_precompile_simple_reduction_function(self):
+        my_sum = core.create_reduction_func(
+            'my_sum_precompile', ('f->f',), ('in0', 'a + b', 'out0 = a', None))
+        a = testing.shaped_arange((3, 4), cupy, 'f')
+        kern = my_sum.precompile(a, axis=1).result()
+        self.assertIsInstance(kern, cupy.cuda.function.Function)
+        a = testing.shaped_arange((1000000,), cupy, 'f')
+        self.assertEqual(len(my_sum.precompile(a).result()), 2)
+        testing.assert_allclose(my_sum(a), a.sum())
+        self.assertIsNone(my_sum.precompile(cupy.empty((0, 4), 'f'),
+                                            axis=0).result())
+
+    def test_precompile_empty(self):
+        my_sum = core.ReductionKernel(
+            'T x', 'T out', 'x', 'a + b', 'out = a', '0', 'my_sum')
+        a = cupy.empty((0, 4), 'f')
+        self.assertIsNone(my_sum.precompile(a, axis=0).result())
+
+
 @testing.gpu
 class TestReductionKernelInvalidArgument(unittest.TestCase):
 
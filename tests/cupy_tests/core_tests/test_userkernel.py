@@ -1,5 +1,6 @@
 import unittest
 
+import mock
 import numpy
 
 import cupy
@@ -67,6 +68,26 @@ class TestUserkernel(unittest.TestCase):
         testing.assert_array_equal(out1, expected)
 
 
+@testing.gpu
+class TestUserkernelPrecompile(unittest.TestCase):
+
+    def test_precompile(self):
+        kernel = cupy.ElementwiseKernel(
+            'T x, T y', 'T z', 'z = x + y', 'user_kernel_precompile')
+        x = testing.shaped_arange((2, 3), cupy, 'f')
+        future = kernel.precompile(x, x)
+        kern = future.result()
+        self.assertIsInstance(kern, cupy.cuda.function.Function)
+        # The compiled kernel is memoized.
+        self.assertIs(kern, kernel.precompile(x, x).result())
+        testing.assert_array_equal(kernel(x, x), x * 2)
+
+    def test_precompile_empty(self):
+        kernel = cupy.ElementwiseKernel('T x', 'T y', 'y = x')
+        x = cupy.empty((0,), 'f')
+        self.assertIsNone(kernel.precompile(x).result())
+
+
 @testing.parameterize(*testing.product({
     'value': [-1, 2 ** 32, 2 ** 63 - 1, -(2 ** 63)],
 }))
@@ -82,3 +103,116 @@ class TestUserkernelScalar(unittest.TestCase):
         else:
             kernel = cupy.ElementwiseKernel('T x, T y', 'T z', 'z = x + y')
             return kernel(x, self.value)
+
+
+@testing.gpu
+class TestUserkernelLaunchPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.kernel = cupy.ElementwiseKernel(
+            'T x, T y', 'T z', 'z = x * y', 'user_kernel_launch_plan')
+
+    def test_reuse_plan(self):
+        x = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        y = testing.shaped_arange((3, 1), cupy, 'f')[::-1]
+        expected = x.get() * y.get()
+        for _ in range(3):
+            testing.assert_array_equal(self.kernel(x, y), expected)
+        x = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        testing.assert_array_equal(self.kernel(x, y), expected)
+
+    def test_scalar(self):
+        x = testing.shaped_arange((2, 3), cupy, 'f')
+        for value in (2, 3.5):
+            testing.assert_array_equal(self.kernel(x, value), x.get() * value)
+
+    def test_out(self):
+        x = testing.shaped_arange((2, 3), cupy, 'i')
+        z = cupy.zeros((3, 2), 'i').T
+        for _ in range(2):
+            self.kernel(x, x, z)
+        testing.assert_array_equal(z, x.get() * x.get())
+
+    def test_size(self):
+        kernel = cupy.ElementwiseKernel(
+            'raw T x', 'raw T y', 'y[i] = x[i]', 'user_kernel_launch_plan_raw')
+        x = testing.shaped_arange((4,), cupy, 'f')
+        y1 = kernel(x, size=4)
+        y2 = kernel(x, size=2)
+        testing.assert_array_equal(y1, x)
+        self.assertEqual(y2.shape, (2,))
+        testing.assert_array_equal(y2, x[:2])
+
+
+@testing.gpu
+class TestUserkernelContiguousKernel(unittest.TestCase):
+
+    def test_not_reduce_dims(self):
+        kernel = cupy.ElementwiseKernel(
+            'T x', 'T y', 'y = x * 2', 'user_kernel_contiguous',
+            reduce_dims=False)
+        x = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        self.assertEqual(kernel._prepare((x,), {})[2].variant,
+                         cupy.core._kernel._CONTIGUOUS_INT32)
+        testing.assert_array_equal(kernel(x), x.get() * 2)
+        testing.assert_array_equal(kernel(x[:, ::2]), x.get()[:, ::2] * 2)
+
+    def _get_sources(self, f):
+        compile_with_cache = cupy.cuda.compile_with_cache
+        sources = []
+
+        def compile(source, *args, **kwargs):
+            sources.append(source)
+            return compile_with_cache(source, *args, **kwargs)
+
+        with mock.patch('cupy.cuda.compile_with_cache', side_effect=compile):
+            f()
+        return sources
+
+    def test_no_index_set(self):
+        # The contiguous variants do not compute the indices of the arrays.
+        kernel = cupy.ElementwiseKernel(
+            'T x', 'T y', 'y = x * 2', 'user_kernel_contiguous_no_index',
+            reduce_dims=False)
+        x = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        sources = self._get_sources(lambda: kernel(x))
+        self.assertEqual(len(sources), 1)
+        self.assertNotIn('_ind.set', sources[0])
+        sources = self._get_sources(lambda: kernel(x[:, ::2]))
+        self.assertEqual(len(sources), 1)
+        self.assertIn('_ind.set', sources[0])
+
+    def test_index_set_for_indexer(self):
+        kernel = cupy.ElementwiseKernel(
+            'T x', 'T y', 'y = x + _ind.get()[0]',
+            'user_kernel_contiguous_indexer', reduce_dims=False)
+        x = testing.shaped_arange((2, 3), cupy, 'l')
+        sources = self._get_sources(lambda: kernel(x))
+        self.assertIn('_ind.set', sources[0])
+        testing.assert_array_equal(
+            kernel(x), x.get() + numpy.arange(2)[:, None])
+
+    def test_ufunc_no_index_set(self):
+        ufunc = cupy.core.create_ufunc(
+            'user_ufunc_contiguous_no_index', ('f->f',), 'out0 = in0 * 2')
+        x = testing.shaped_arange((2, 3, 4), cupy, 'f')
+        sources = self._get_sources(lambda: ufunc(x))
+        self.assertEqual(len(sources), 1)
+        self.assertNotIn('_ind.set', sources[0])
+
+    def test_index_type(self):
+        # The index is ptrdiff_t as in the generic kernel.
+        kernel = cupy.ElementwiseKernel(
+            'T x', 'T y', 'ptrdiff_t n = 3; y = x + min(i, n)',
+            'user_kernel_contiguous_index_type')
+        x = testing.shaped_arange((6,), cupy, 'l')
+        testing.assert_array_equal(
+            kernel(x), x.get() + numpy.minimum(numpy.arange(6), 3))
+
+    def test_index(self):
+        kernel = cupy.ElementwiseKernel(
+            'raw T x', 'T y', 'y = x[x.size() - 1 - i]',
+            'user_kernel_contiguous_index')
+        x = testing.shaped_arange((6,), cupy, 'f')
+        testing.assert_array_equal(kernel(x, cupy.empty(6, 'f')),
+                                   x.get()[::-1])
@@ -0,0 +1,87 @@
+import six
+import unittest
+
+from cupy.cuda import memory
+from cupy.cuda import memory_hooks
+from cupy import testing
+
+
+@testing.gpu
+class TestSamplingProfileHook(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.MemoryPool()
+
+    def test_invalid_sample_bytes(self):
+        with self.assertRaises(ValueError):
+            memory_hooks.SamplingProfileHook(sample_bytes=0)
+
+    def test_sample_all(self):
+        # Every allocation is sampled with probability ~1 and scale ~1.
+        hook = memory_hooks.SamplingProfileHook(sample_bytes=1e-3, seed=0)
+        with hook:
+            p1 = self.pool.malloc(1000)
+            p2 = self.pool.malloc(2000)
+        del p1
+        del p2
+        samples = hook.get_samples()
+        self.assertEqual(2, len(samples))
+        for stack, count, nbytes in samples:
+            self.assertEqual('test_sample_all', stack[-1][2])
+            self.assertAlmostEqual(1.0, count)
+        self.assertAlmostEqual(
+            1024 + 2048, sum(nbytes for _, _, nbytes in samples))
+
+    def test_sample_none(self):
+        hook = memory_hooks.SamplingProfileHook(sample_bytes=1 << 60, seed=0)
+        with hook:
+            p = self.pool.malloc(1000)
+        del p
+        self.assertEqual([], hook.get_samples())
+
+    def test_estimate(self):
+        hook = memory_hooks.SamplingProfileHook(sample_bytes=4096, seed=0)
+        n = 2000
+        with hook:
+            for _ in six.moves.range(n):
+                p = self.pool.malloc(512)
+                del p
+        total = sum(nbytes for _, _, nbytes in hook.get_samples())
+        self.assertGreater(total, 512 * n * 0.8)
+        self.assertLess(total, 512 * n * 1.2)
+
+    def test_max_depth(self):
+        hook = memory_hooks.SamplingProfileHook(
+            sample_bytes=1e-3, max_depth=1)
+        with hook:
+            p = self.pool.malloc(1000)
+        del p
+        stack, _, _ = hook.get_samples()[0]
+        self.assertEqual(1, len(stack))
+
+    def test_print_report(self):
+        hook = memory_hooks.SamplingProfileHook(sample_bytes=1e-3)
+        with hook:
+            p1 = self.pool.malloc(1000)
+            p2 = self.pool.malloc(2000)
+        del p1
+        del p2
+        io = six.StringIO()
+        hook.print_report(file=io)
+        actual = io.getvalue()
+        expect = r'2\.00KB \(2\.00KB\) 1 .*\.py:[0-9]+:test_print_report'
+        six.assertRegex(self, actual, expect)
+        expect = r'1\.00KB \(1\.00KB\) 1 .*\.py:[0-9]+:test_print_report'
+        six.assertRegex(self, actual, expect)
+
+    def test_write_flamegraph(self):
+        hook = memory_hooks.SamplingProfileHook(sample_bytes=1e-3)
+        with hook:
+            p = self.pool.malloc(1000)
+        del p
+        io = six.StringIO()
+        hook.write_flamegraph(io)
+        lines = io.getvalue().splitlines()
+        self.assertEqual(1, len(lines))
+        six.assertRegex(
+            self, lines[0], r';.*\.py:[0-9]+:test_write_flamegraph 1024\Z')
@@ -0,0 +1,106 @@
+import json
+import unittest
+
+import mock
+import six
+
+import cupy
+from cupy import cuda
+from cupy.cuda import memory
+from cupy.cuda import memory_hooks
+from cupy.cuda import stream as stream_module
+from cupy import prof
+from cupy import testing
+
+
+@testing.gpu
+class TestTimelineHook(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.MemoryPool()
+        self.hook = memory_hooks.TimelineHook(self.pool)
+        self.stream = stream_module.Stream()
+
+    def test_events(self):
+        with self.hook:
+            p1 = self.pool.malloc(1000)
+            with self.stream:
+                p2 = self.pool.malloc(2000)
+            ptr1 = p1.ptr
+            del p1, p2
+        events = self.hook.get_events()
+        phases = [e['ph'] for e in events if e['ph'] != 'C']
+        self.assertEqual(['i', 'b', 'i', 'b', 'e', 'e'], phases)
+
+        mallocs = [e for e in events if e['ph'] == 'b']
+        self.assertEqual(hex(ptr1), mallocs[0]['id'])
+        self.assertEqual(1000, mallocs[0]['args']['size'])
+        self.assertEqual(1024, mallocs[0]['args']['mem_size'])
+        self.assertEqual(self.stream.ptr, mallocs[1]['args']['stream'])
+
+        counters = [e['args'] for e in events if e['ph'] == 'C']
+        self.assertEqual([1024, 3072, 2048, 0],
+                         [c['used_bytes'] for c in counters])
+        self.assertEqual(3072, counters[-1]['total_bytes'])
+
+        timestamps = [e['ts'] for e in events]
+        self.assertEqual(sorted(timestamps), timestamps)
+
+    def test_default_pool(self):
+        pool = cupy.get_default_memory_pool()
+        hook = memory_hooks.TimelineHook(pool)
+        with self.stream:
+            with hook:
+                a = cupy.empty((1000,), 'f')
+                del a
+        events = hook.get_events()
+        mallocs = [e for e in events if e['ph'] == 'b']
+        self.assertEqual(1, len(mallocs))
+        self.assertEqual(self.stream.ptr, mallocs[0]['tid'])
+        frees = [e for e in events if e['ph'] == 'e']
+        self.assertEqual([mallocs[0]['id']], [e['id'] for e in frees])
+        self.assertEqual(0, [e['args'] for e in events
+                             if e['ph'] == 'C'][-1]['used_bytes'])
+
+    def test_hook_methods(self):
+        stream = mock.Mock(ptr=1234)
+        with mock.patch('cupy.cuda.stream.get_current_stream',
+                        return_value=stream):
+            self.hook.alloc_postprocess(device_id=0, mem_size=512, mem_ptr=8)
+            self.hook.malloc_postprocess(
+                device_id=0, size=100, mem_size=512, mem_ptr=8, pmem_id=0)
+            self.hook.free_postprocess(
+                device_id=0, mem_size=512, mem_ptr=8, pmem_id=0)
+        events = self.hook.get_events()
+        self.assertEqual(['i', 'b', 'C', 'e', 'C'],
+                         [e['ph'] for e in events])
+        self.assertEqual([1234] * 3,
+                         [e['tid'] for e in events if e['ph'] != 'C'])
+        self.assertEqual(1234, events[1]['args']['stream'])
+
+    def test_write_chrome_trace(self):
+        with self.hook:
+            p = self.pool.malloc(1000)
+            del p
+        io = six.StringIO()
+        self.hook.write_chrome_trace(io)
+        actual = json.loads(io.getvalue())
+        self.assertEqual(self.hook.get_events(), actual['traceEvents'])
+
+    @unittest.skipUnless(cuda.nvtx_enabled, 'nvtx is required for time_range')
+    def test_time_range(self):
+        push_patch = mock.patch('cupy.cuda.nvtx.RangePush')
+        pop_patch = mock.patch('cupy.cuda.nvtx.RangePop')
+        with push_patch, pop_patch:
+            with self.hook:
+                with prof.time_range('test:range'):
+                    p = self.pool.malloc(1000)
+                del p
+        events = self.hook.get_events()
+        self.assertEqual('B', events[0]['ph'])
+        self.assertEqual('test:range', events[0]['name'])
+        self.assertEqual('nvtx', events[0]['cat'])
+        ranges = [e['ph'] for e in events if e.get('cat') == 'nvtx']
+        self.assertEqual(['B', 'E'], ranges)
+        end = [e for e in events if e['ph'] == 'E'][0]
+        self.assertLess(events.index(end), len(events) - 1)
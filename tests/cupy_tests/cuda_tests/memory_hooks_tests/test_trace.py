@@ -0,0 +1,70 @@
+import io
+import unittest
+
+from cupy.cuda import memory
+from cupy.cuda import memory_hooks
+from cupy.cuda import stream as stream_module
+from cupy.cuda.memory_hooks import trace
+from cupy import testing
+
+
+@testing.gpu
+class TestAllocationTraceHook(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.MemoryPool()
+        self.file = io.BytesIO()
+        self.hook = memory_hooks.AllocationTraceHook(self.file)
+        self.stream = stream_module.Stream()
+
+    def record(self):
+        with self.hook:
+            p1 = self.pool.malloc(1000)
+            with self.stream:
+                p2 = self.pool.malloc(2000)
+            del p1
+            p3 = self.pool.malloc(500)
+            del p2, p3
+        self.file.seek(0)
+        return trace.load_trace(self.file)
+
+    def test_load_trace(self):
+        events = self.record()
+        self.assertEqual(['malloc', 'malloc', 'free', 'malloc', 'free',
+                          'free'], [e.op for e in events])
+        self.assertEqual([1000, 2000, 1024, 500, 2048, 512],
+                         [e.size for e in events])
+        self.assertEqual(0, events[0].stream_ptr)
+        self.assertEqual(self.stream.ptr, events[1].stream_ptr)
+        self.assertEqual(events[0].mem_ptr, events[2].mem_ptr)
+        timestamps = [e.timestamp for e in events]
+        self.assertEqual(sorted(timestamps), timestamps)
+
+    def test_load_invalid_trace(self):
+        with self.assertRaises(ValueError):
+            trace.load_trace(io.BytesIO(b'invalid'))
+
+    def test_replay(self):
+        events = self.record()
+        result = trace.replay(events)
+        self.assertEqual(3, result['n_mallocs'])
+        self.assertEqual(3, result['n_frees'])
+        self.assertEqual(3072, result['peak_used_bytes'])
+        self.assertEqual(3072, result['peak_reserved_bytes'])
+        self.assertEqual(2, result['n_allocator_calls'])
+        self.assertAlmostEqual(1.0 / 3, result['hit_rate'])
+
+    def test_replay_options(self):
+        events = self.record()
+        result = trace.replay(events, small_block_threshold=1024)
+        self.assertEqual(3, result['n_mallocs'])
+        self.assertEqual(1024 + 2048, result['peak_used_bytes'])
+        self.assertEqual(memory._slab_size * 2 + 2048,
+                         result['peak_reserved_bytes'])
+
+    def test_replay_cross_stream_reuse(self):
+        events = self.record()
+        with self.assertRaises(ValueError):
+            trace.replay(events, cross_stream_reuse=True)
+        result = trace.replay(events, cross_stream_reuse=False)
+        self.assertEqual(3, result['n_mallocs'])
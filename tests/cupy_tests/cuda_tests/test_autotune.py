@@ -0,0 +1,201 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import cupy
+from cupy.cuda import autotune
+from cupy import testing
+
+
+class TestAutotune(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.patches = [
+            mock.patch.dict(os.environ, {'CUPY_CACHE_DIR': self.cache_dir}),
+            mock.patch('cupy.cuda.device.get_device_id', return_value=0),
+            mock.patch('cupy.cuda.autotune._get_device_desc',
+                       return_value='sm_70/80'),
+            mock.patch('cupy.cuda.stream.get_current_stream'),
+        ]
+        for p in self.patches:
+            p.start()
+        self.persist = autotune._persist
+        autotune.clear_configs()
+
+    def tearDown(self):
+        autotune.clear_configs()
+        autotune._persist = self.persist
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.cache_dir)
+
+    def _tune(self, times, shape_class=(10,)):
+        runs = []
+
+        def measure(run, config, stream):
+            run(config)
+            return times[config]
+
+        with mock.patch('cupy.cuda.autotune._measure', side_effect=measure):
+            config = autotune.tune(
+                'kernel', shape_class, sorted(times), runs.append)
+        return config, runs
+
+    def test_get_shape_class(self):
+        self.assertEqual(autotune.get_shape_class(0), (0,))
+        self.assertEqual(autotune.get_shape_class(4, 5, 7), (3, 3, 3))
+        self.assertEqual(autotune.get_shape_class(8), (4,))
+
+    def test_tune(self):
+        times = {(128,): 2.0, (256,): 1.0, (512,): 3.0}
+        config, runs = self._tune(times)
+        self.assertEqual(config, (256,))
+        self.assertEqual(sorted(runs), sorted(times))
+        self.assertEqual(autotune.get_config('kernel', (10,)), (256,))
+        self.assertIsNone(autotune.get_config('kernel', (11,)))
+        self.assertEqual(autotune.get_configs(), [
+            {'device': 0, 'kernel': 'kernel', 'shape_class': (10,),
+             'config': (256,), 'time': 1.0}])
+
+    def test_tune_skip_failure(self):
+        class DummyError(Exception):
+            pass
+
+        def measure(run, config, stream):
+            if config == (1024,):
+                raise DummyError()
+            return 1.0 / config[0]
+
+        with mock.patch('cupy.cuda.driver.CUDADriverError', DummyError), \
+                mock.patch('cupy.cuda.autotune._measure',
+                           side_effect=measure):
+            config = autotune.tune(
+                'kernel', (10,), [(128,), (1024,)], None)
+        self.assertEqual(config, (128,))
+
+    def test_tune_stream(self):
+        streams = []
+
+        def measure(run, config, stream):
+            streams.append(stream)
+            return 1.0
+
+        stream = mock.Mock()
+        with mock.patch('cupy.cuda.autotune._measure', side_effect=measure):
+            autotune.tune('kernel', (10,), [(128,), (256,)], None, stream)
+        self.assertEqual(streams, [stream, stream])
+
+    def test_clear_configs(self):
+        self._tune({(128,): 1.0})
+        autotune.clear_configs()
+        self.assertEqual(autotune.get_configs(), [])
+        self.assertIsNone(autotune.get_config('kernel', (10,)))
+
+    def test_persist(self):
+        autotune._persist = True
+        self._tune({(128, 0): 2.0, (256, 160): 1.0}, (3, 4))
+        with open(os.path.join(self.cache_dir, 'autotune.json')) as f:
+            data = json.load(f)
+        self.assertEqual(data['configs'], {
+            'sm_70/80|kernel|3,4': {'config': [256, 160], 'time': 1.0}})
+
+        # Another process loads the config from the file.
+        autotune.clear_configs()
+        self.assertEqual(autotune.get_config('kernel', (3, 4)), (256, 160))
+        self.assertEqual(len(autotune.get_configs()), 1)
+
+    def test_not_persist(self):
+        autotune._persist = False
+        self._tune({(128,): 1.0})
+        self.assertFalse(
+            os.path.exists(os.path.join(self.cache_dir, 'autotune.json')))
+
+    def test_set_enabled(self):
+        enabled = autotune.is_enabled()
+        try:
+            autotune.set_enabled(True, persist=False)
+            self.assertTrue(autotune.is_enabled())
+            self.assertFalse(autotune._persist)
+            autotune.set_enabled(False)
+            self.assertFalse(autotune.is_enabled())
+            self.assertFalse(autotune._persist)
+        finally:
+            autotune.set_enabled(enabled)
+
+
+@testing.gpu
+class TestAutotuneKernels(unittest.TestCase):
+
+    def setUp(self):
+        self.enabled = autotune.is_enabled()
+        autotune.set_enabled(True)
+        autotune.clear_configs()
+
+    def tearDown(self):
+        autotune.set_enabled(self.enabled)
+        autotune.clear_configs()
+
+    def _get_kernels(self):
+        return [c['kernel'].split(':')[:2] for c in autotune.get_configs()]
+
+    @testing.numpy_cupy_allclose()
+    def test_ufunc(self, xp):
+        a = testing.shaped_arange((3, 1000), xp, 'f')
+        ret = xp.add(a, a)
+        if xp is cupy:
+            self.assertIn(['ufunc', 'cupy_add'], self._get_kernels())
+        return ret
+
+    @testing.numpy_cupy_allclose()
+    def test_ufunc_out_aliasing(self, xp):
+        a = testing.shaped_arange((3, 1000), xp, 'f')
+        xp.add(a, 1, out=a)
+        return a
+
+    def test_elementwise_kernel(self):
+        kernel = cupy.ElementwiseKernel(
+            'T x', 'T y', 'y += x', 'autotune_elementwise')
+        x = testing.shaped_arange((1000,), cupy, 'f')
+        y = cupy.ones((1000,), 'f')
+        kernel(x, y)
+        testing.assert_allclose(y, x.get() + 1)
+        self.assertIn(['elementwise', 'autotune_elementwise'],
+                      self._get_kernels())
+
+    def test_elementwise_kernel_stream(self):
+        kernel = cupy.ElementwiseKernel(
+            'T x', 'T y', 'y += x', 'autotune_elementwise_stream')
+        x = testing.shaped_arange((1000,), cupy, 'f')
+        y = cupy.ones((1000,), 'f')
+        stream = cupy.cuda.Stream()
+        kernel(x, y, stream=stream)
+        stream.synchronize()
+        testing.assert_allclose(x, testing.shaped_arange((1000,), cupy, 'f'))
+        testing.assert_allclose(y, x.get() + 1)
+
+    @testing.numpy_cupy_allclose(rtol=1e-5)
+    def test_reduction(self, xp):
+        a = testing.shaped_random((1000, 300), xp, 'f')
+        ret = a.sum(axis=0), a.sum(axis=1), a.sum()
+        if xp is cupy:
+            configs = [c['config'] for c in autotune.get_configs()
+                       if c['kernel'].startswith('reduction:cupy_sum:')]
+            # The full reduction uses the two-stage kernels, whose launch
+            # configuration is not tuned.
+            self.assertEqual(len(configs), 2)
+            for block_size, grid_cap in configs:
+                self.assertIn(block_size, (128, 256, 512, 1024))
+        return ret
+
+    def test_reduction_kernel(self):
+        kernel = cupy.ReductionKernel(
+            'T x', 'T y', 'x', 'a + b', 'y = a', '0', 'autotune_reduction')
+        x = testing.shaped_arange((100, 1000), cupy, 'f')
+        testing.assert_allclose(kernel(x, axis=1), x.get().sum(axis=1))
+        self.assertIn(['reduction', 'autotune_reduction'],
+                      self._get_kernels())
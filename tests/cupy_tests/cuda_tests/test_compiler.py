@@ -1,4 +1,10 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
 import unittest
+import uuid
 
 import mock
 import six
@@ -73,6 +79,56 @@ class TestNvrtcStderr(unittest.TestCase):
             compiler.compile_using_nvrtc('a')
 
 
+@testing.gpu
+class TestCompileUsingNvrtc(unittest.TestCase):
+
+    def test_no_temporary_file(self):
+        with mock.patch('tempfile.mkdtemp') as mkdtemp:
+            ptx = compiler.compile_using_nvrtc(
+                'extern "C" __global__ void f() {}')
+        self.assertFalse(mkdtemp.called)
+        self.assertIn('.entry f', ptx)
+
+
+class TestPreprocessFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = os.path.join(tempfile.mkdtemp(), 'cache')
+        self.env = ('compute_30', ('-ftz=true',), (9, 0))
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.cache_dir))
+
+    def get(self):
+        return compiler._get_preprocess_fingerprint(
+            self.env, ('-ftz=true',), 'compute_30', self.cache_dir)
+
+    def test_persist(self):
+        with mock.patch('cupy.cuda.compiler._preprocess',
+                        return_value=u'fingerprint') as preprocess:
+            self.assertEqual(u'fingerprint', self.get())
+            self.assertEqual(u'fingerprint', self.get())
+        preprocess.assert_called_once_with('', ('-ftz=true',), 'compute_30')
+
+    def test_env(self):
+        with mock.patch('cupy.cuda.compiler._preprocess',
+                        return_value=u'fingerprint') as preprocess:
+            self.get()
+            self.env = ('compute_30', ('-ftz=true',), (10, 0))
+            self.get()
+        self.assertEqual(2, preprocess.call_count)
+
+    def test_corrupted(self):
+        with mock.patch('cupy.cuda.compiler._preprocess',
+                        return_value=u'fingerprint') as preprocess:
+            self.get()
+            for name in os.listdir(self.cache_dir):
+                with open(os.path.join(self.cache_dir, name), 'ab') as f:
+                    f.write(b'x')
+            self.assertEqual(u'fingerprint', self.get())
+        self.assertEqual(2, preprocess.call_count)
+
+
 class TestIsValidKernelName(unittest.TestCase):
 
     def test_valid(self):
@@ -92,3 +148,413 @@ class TestIsValidKernelName(unittest.TestCase):
 
     def test_space(self):
         self.assertFalse(compiler.is_valid_kernel_name('invalid name'))
+
+
+def _write_cache_file(cache_dir, name, cubin, mtime, corrupt=False):
+    path = os.path.join(cache_dir, name)
+    with open(path, 'wb') as f:
+        hash = six.b(hashlib.md5(cubin).hexdigest())
+        if corrupt:
+            hash = hash[::-1]
+        f.write(hash)
+        f.write(cubin)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class TestKernelCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        # 32 bytes of hash + 68 bytes of cubin
+        self.paths = [
+            _write_cache_file(self.cache_dir, '%d_2.cubin' % i, b'x' * 68,
+                              1000 + i)
+            for i in range(4)]
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_list_cache(self):
+        entries = compiler.list_cache(self.cache_dir)
+        self.assertEqual(self.paths, [e[0] for e in entries])
+        self.assertEqual([100] * 4, [e[1] for e in entries])
+
+    def test_list_cache_with_source(self):
+        with open(self.paths[0] + '.cu', 'w') as f:
+            f.write('x' * 10)
+        entries = compiler.list_cache(self.cache_dir)
+        self.assertEqual(4, len(entries))
+        self.assertEqual(110, entries[0][1])
+
+    def test_prune_cache_max_entries(self):
+        removed = compiler.prune_cache(self.cache_dir, max_entries=3)
+        self.assertEqual(self.paths[:1], removed)
+        self.assertFalse(os.path.exists(self.paths[0]))
+        self.assertTrue(os.path.exists(self.paths[1]))
+
+    def test_prune_cache_max_size(self):
+        removed = compiler.prune_cache(self.cache_dir, max_size=250)
+        self.assertEqual(self.paths[:2], removed)
+        self.assertEqual(2, len(compiler.list_cache(self.cache_dir)))
+
+    def test_prune_cache_lru(self):
+        os.utime(self.paths[0], None)
+        removed = compiler.prune_cache(self.cache_dir, max_entries=3)
+        self.assertEqual(self.paths[1:2], removed)
+
+    def test_prune_cache_unlimited(self):
+        removed = compiler.prune_cache(
+            self.cache_dir, max_size=0, max_entries=0)
+        self.assertEqual([], removed)
+        self.assertEqual(4, len(compiler.list_cache(self.cache_dir)))
+
+    def test_prune_cache_env(self):
+        with mock.patch.dict(os.environ, {'CUPY_CACHE_MAX_ENTRIES': '1'}):
+            removed = compiler.prune_cache(self.cache_dir)
+        self.assertEqual(self.paths[:3], removed)
+
+    def test_prune_cache_on_miss(self):
+        compiler._cache_usage.pop(self.cache_dir, None)
+        with mock.patch.dict(os.environ, {'CUPY_CACHE_MAX_ENTRIES': '5'}), \
+                mock.patch('cupy.cuda.compiler.list_cache',
+                           side_effect=compiler.list_cache) as m:
+            # The first miss scans the directory to estimate the usage.
+            compiler._prune_cache_on_miss(self.cache_dir, 100)
+            self.assertEqual(1, m.call_count)
+            # Within the limits by the estimate.
+            _write_cache_file(self.cache_dir, 'a_2.cubin', b'x' * 68, 2000)
+            compiler._prune_cache_on_miss(self.cache_dir, 100)
+            self.assertEqual(1, m.call_count)
+            # Over the limits by the estimate.
+            _write_cache_file(self.cache_dir, 'b_2.cubin', b'x' * 68, 2001)
+            compiler._prune_cache_on_miss(self.cache_dir, 100)
+            self.assertEqual(2, m.call_count)
+        self.assertEqual(5, len(compiler.list_cache(self.cache_dir)))
+        self.assertFalse(os.path.exists(self.paths[0]))
+
+    def test_prune_cache_on_miss_interval(self):
+        compiler._cache_usage.pop(self.cache_dir, None)
+        with mock.patch.dict(os.environ, {'CUPY_CACHE_MAX_ENTRIES': '1000'}), \
+                mock.patch('cupy.cuda.compiler._cache_scan_interval', 3), \
+                mock.patch('cupy.cuda.compiler.list_cache',
+                           side_effect=compiler.list_cache) as m:
+            for _ in range(4):
+                compiler._prune_cache_on_miss(self.cache_dir, 100)
+        self.assertEqual(2, m.call_count)
+
+    def test_verify_cache(self):
+        path = _write_cache_file(self.cache_dir, 'bad_2.cubin', b'x', 0,
+                                 corrupt=True)
+        self.assertEqual([path], compiler.verify_cache(self.cache_dir))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(
+            [path], compiler.verify_cache(self.cache_dir, remove=True))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual([], compiler.verify_cache(self.cache_dir))
+
+    def test_cache_stats(self):
+        compiler._record_cache_lookup(self.cache_dir, True)
+        compiler._record_cache_lookup(self.cache_dir, False)
+        compiler._record_cache_lookup(self.cache_dir, True)
+        self.assertEqual({'hits': 2, 'misses': 1},
+                         compiler.get_cache_stats(self.cache_dir))
+        compiler._save_cache_stats()
+        compiler._record_cache_lookup(self.cache_dir, False)
+        self.assertEqual({'hits': 2, 'misses': 2},
+                         compiler.get_cache_stats(self.cache_dir))
+        compiler._save_cache_stats()
+        # The counts are merged into a single line.
+        with open(os.path.join(self.cache_dir,
+                               compiler._cache_stats_name)) as f:
+            self.assertEqual(['2 2\n'], f.readlines())
+        self.assertEqual({'hits': 2, 'misses': 2},
+                         compiler.get_cache_stats(self.cache_dir))
+        compiler.reset_cache_stats(self.cache_dir)
+        self.assertEqual({'hits': 0, 'misses': 0},
+                         compiler.get_cache_stats(self.cache_dir))
+
+
+class TestPackedKernelCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = compiler.PackedKernelCache(self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_get_empty(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(0, len(self.cache))
+
+    def test_put_get(self):
+        self.cache.put('a', b'cubin_a')
+        self.cache.put('b', b'cubin_b')
+        self.assertEqual(b'cubin_a', self.cache.get('a'))
+        self.assertEqual(b'cubin_b', self.cache.get('b'))
+        self.assertIsNone(self.cache.get('c'))
+        self.assertEqual(2, len(self.cache))
+
+    def test_put_by_other_process(self):
+        self.cache.put('a', b'cubin_a')
+        self.assertEqual(b'cubin_a', self.cache.get('a'))
+        other = compiler.PackedKernelCache(self.cache_dir)
+        other.put('b', b'cubin_b')
+        self.assertEqual(b'cubin_b', self.cache.get('b'))
+
+    def test_overwrite(self):
+        self.cache.put('a', b'old')
+        self.cache.put('a', b'new')
+        cache = compiler.PackedKernelCache(self.cache_dir)
+        self.assertEqual(b'new', cache.get('a'))
+
+    def test_corrupted_cubin(self):
+        self.cache.put('a', b'cubin_a')
+        self.cache.put('b', b'cubin_b')
+        with open(self.cache.path, 'r+b') as f:
+            f.seek(compiler._pack_header.size)
+            f.write(b'X')
+        cache = compiler.PackedKernelCache(self.cache_dir)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(b'cubin_b', cache.get('b'))
+
+    def test_truncated_record(self):
+        self.cache.put('a', b'cubin_a')
+        with open(self.cache.path, 'ab') as f:
+            # Header of a record whose write was interrupted.
+            f.write(compiler._pack_header.pack(
+                compiler._pack_magic, b'k' * 16, 100, b'd' * 16))
+        self.cache.put('b', b'cubin_b')
+        cache = compiler.PackedKernelCache(self.cache_dir)
+        self.assertEqual(b'cubin_a', cache.get('a'))
+        self.assertEqual(b'cubin_b', cache.get('b'))
+
+    def test_compact(self):
+        self.cache.put('a', b'old')
+        self.cache.put('a', b'new')
+        self.cache.put('b', b'cubin_b')
+        size = os.path.getsize(self.cache.path)
+        self.assertEqual(0, self.cache.compact())
+        self.assertLess(os.path.getsize(self.cache.path), size)
+        self.assertEqual(b'new', self.cache.get('a'))
+        self.assertEqual(b'cubin_b', self.cache.get('b'))
+
+    def test_compact_max_entries(self):
+        self.cache.put('a', b'cubin_a')
+        self.cache.put('b', b'cubin_b')
+        self.assertEqual(1, self.cache.compact(max_entries=1))
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(b'cubin_b', self.cache.get('b'))
+
+    def test_compact_lru(self):
+        self.cache.put('a', b'cubin_a')
+        self.cache.put('b', b'cubin_b')
+        self.cache.put('c', b'cubin_c')
+        self.assertEqual(b'cubin_a', self.cache.get('a'))
+        self.assertEqual(1, self.cache.compact(max_entries=2))
+        self.assertEqual(b'cubin_a', self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(b'cubin_c', self.cache.get('c'))
+        # The recency is kept in the order of the records in the file.
+        other = compiler.PackedKernelCache(self.cache_dir)
+        self.assertEqual(1, other.compact(max_entries=1))
+        self.assertIsNone(other.get('c'))
+        self.assertEqual(b'cubin_a', other.get('a'))
+
+    def test_compact_by_other_process(self):
+        self.cache.put('a', b'cubin_a')
+        self.cache.put('b', b'cubin_b')
+        self.assertEqual(b'cubin_b', self.cache.get('b'))
+        other = compiler.PackedKernelCache(self.cache_dir)
+        self.assertEqual(1, other.compact(max_entries=1))
+        other.put('c', b'cubin_c')
+        self.assertEqual(b'cubin_b', self.cache.get('b'))
+        self.assertEqual(b'cubin_c', self.cache.get('c'))
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(2, len(self.cache))
+
+    def test_prune(self):
+        self.cache.put('a', b'cubin_a')
+        self.cache.put('b', b'cubin_b')
+        self.assertEqual(0, self.cache.prune(max_size=0, max_entries=2))
+        self.assertEqual(
+            1, self.cache.prune(max_size=compiler._pack_header.size + 7))
+        self.assertEqual(1, len(self.cache))
+
+    def test_backend_env(self):
+        with mock.patch.dict(os.environ, {'CUPY_CACHE_BACKEND': 'pack'}):
+            self.assertEqual('pack', compiler.get_cache_backend())
+        with mock.patch.dict(os.environ, {'CUPY_CACHE_BACKEND': 'foo'}):
+            with self.assertRaises(ValueError):
+                compiler.get_cache_backend()
+
+
+@testing.gpu
+class TestKernelManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(
+            os.environ, {'CUPY_CACHE_DIR': self.cache_dir})
+        self.env.start()
+        compiler._warm_modules.clear()
+
+    def tearDown(self):
+        compiler._warm_modules.clear()
+        self.env.stop()
+        shutil.rmtree(self.cache_dir)
+
+    def record(self):
+        # Use a unique name not to hit the memoized kernel.
+        self.name = 'test_kernel_manifest_%s' % uuid.uuid4().hex
+        f = cupy.core.create_ufunc(self.name, ('f->f',), 'out0 = in0 + 1')
+        with compiler.record_kernels() as manifest:
+            f(cupy.arange(3, dtype='f'))
+        return manifest
+
+    def test_record(self):
+        manifest = self.record()
+        self.assertEqual(1, len(manifest))
+        entry = manifest.kernels[0]
+        self.assertEqual(
+            ('ufunc', self.name, ['f'], ['f']),
+            tuple(entry['signature']))
+        self.assertEqual(compiler._get_arch(), entry['arch'])
+        self.assertIn(entry['extra_source'], manifest.extra_sources)
+
+    def test_save_load(self):
+        manifest = self.record()
+        io = six.StringIO()
+        manifest.save(io)
+        io.seek(0)
+        loaded = compiler.KernelManifest.load(io)
+        self.assertEqual(manifest.kernels, loaded.kernels)
+        self.assertEqual(manifest.extra_sources, loaded.extra_sources)
+
+    def check_warmup(self, n_threads):
+        manifest = self.record()
+        entry = manifest.kernels[0]
+        result = compiler.warmup(manifest, n_threads=n_threads)
+        self.assertEqual({'loaded': 1, 'skipped': 0}, result)
+        key = (cupy.cuda.Device().id, entry['name'])
+        mod = compiler._warm_modules[key]
+
+        # The warm module is used by the first compilation.
+        actual = compiler.compile_with_cache(
+            entry['source'], tuple(entry['options']),
+            extra_source=manifest.extra_sources[entry['extra_source']])
+        self.assertIs(mod, actual)
+        self.assertNotIn(key, compiler._warm_modules)
+
+    def test_warmup(self):
+        self.check_warmup(1)
+
+    def test_warmup_parallel(self):
+        self.check_warmup(4)
+
+    def test_warmup_skip_arch(self):
+        manifest = self.record()
+        manifest.kernels[0]['arch'] = 'compute_0'
+        result = compiler.warmup(manifest)
+        self.assertEqual({'loaded': 0, 'skipped': 1}, result)
+
+
+@testing.gpu
+class TestCompileExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = compiler.CompileExecutor(2)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_submit(self):
+        future = self.executor.submit(lambda x, y: x + y, 1, y=2)
+        self.assertEqual(3, future.result())
+        self.assertTrue(future.done())
+        self.assertIsNone(future.exception())
+
+    def test_submit_error(self):
+        def f():
+            raise ValueError('error')
+        future = self.executor.submit(f)
+        self.assertIsInstance(future.exception(), ValueError)
+        with self.assertRaises(ValueError):
+            future.result()
+
+    def test_submit_device(self):
+        future = self.executor.submit(lambda: cupy.cuda.Device().id)
+        self.assertEqual(cupy.cuda.Device().id, future.result())
+
+    def test_deduplicate(self):
+        event = threading.Event()
+        future1 = self.executor.submit(event.wait, key='a')
+        future2 = self.executor.submit(event.wait, key='a')
+        future3 = self.executor.submit(event.wait, key='b')
+        self.assertIs(future1, future2)
+        self.assertIsNot(future1, future3)
+        event.set()
+        future1.result()
+        future3.result()
+        # Finished tasks are not deduplicated.
+        self.assertIsNot(future1, self.executor.submit(event.wait, key='a'))
+
+    def test_done_callback(self):
+        results = []
+        future = self.executor.submit(lambda: 1)
+        future.result()
+        future.add_done_callback(lambda f: results.append(f.result()))
+        self.assertEqual([1], results)
+
+    def test_shutdown(self):
+        self.executor.submit(lambda: 1).result()
+        self.executor.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(lambda: 1)
+
+    def test_invalid_max_workers(self):
+        with self.assertRaises(ValueError):
+            compiler.CompileExecutor(0)
+
+
+@testing.gpu
+class TestCompileWithCacheInFlight(unittest.TestCase):
+
+    def test_deduplicate(self):
+        started = threading.Event()
+        finish = threading.Event()
+        calls = []
+
+        def load_or_compile(*args):
+            calls.append(args)
+            started.set()
+            finish.wait(10)
+            return 'module'
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with mock.patch('cupy.cuda.compiler._load_or_compile',
+                            side_effect=load_or_compile):
+                results = []
+
+                def compile():
+                    results.append(compiler.compile_with_cache(
+                        'extern "C" __global__ void f() {}',
+                        cache_dir=cache_dir))
+
+                t1 = threading.Thread(target=compile)
+                t1.start()
+                started.wait(10)
+                t2 = threading.Thread(target=compile)
+                t2.start()
+                # Give the second thread time to start compiling the kernel
+                # if it is not deduplicated.
+                t2.join(0.5)
+                finish.set()
+                t1.join()
+                t2.join()
+        finally:
+            shutil.rmtree(cache_dir)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(['module', 'module'], results)
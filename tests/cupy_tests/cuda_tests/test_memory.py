@@ -1,6 +1,7 @@
 import ctypes
 import sys
 import threading
+import time
 import unittest
 
 import cupy.cuda
@@ -448,6 +449,597 @@ class TestSingleDeviceMemoryPool(unittest.TestCase):
         del p2
 
 
+@testing.gpu
+class TestSingleDeviceMemoryPoolStats(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.unit = memory._allocation_unit_size
+        self.stream = stream_module.Stream()
+        self.stream_ptr = self.stream.ptr
+
+    def test_stats_without_malloc(self):
+        stats = self.pool.get_stats()
+        self.assertEqual(0, stats['used_bytes'])
+        self.assertEqual(0, stats['free_bytes'])
+        self.assertEqual(0, stats['total_bytes'])
+        self.assertEqual(0, stats['n_cache_hits'])
+        self.assertEqual(0, stats['n_allocator_calls'])
+        self.assertEqual(0.0, stats['fragmentation'])
+        self.assertEqual({}, stats['arenas'])
+
+    def test_counters(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        del p1
+        p2 = self.pool.malloc(self.unit * 2)
+        self.pool.free_all_blocks()
+        stats = self.pool.get_stats()
+        self.assertEqual(1, stats['n_cache_hits'])
+        self.assertEqual(1, stats['n_allocator_calls'])
+        self.assertEqual(0, stats['n_malloc_retries'])
+        self.assertEqual(1, stats['n_free_all_blocks'])
+        self.assertEqual(self.unit * 4, stats['total_bytes'])
+        del p2
+
+    def test_dump_arenas(self):
+        p = self.pool.malloc(self.unit * 8)
+        del p
+        head = self.pool.malloc(self.unit * 2)
+        mid = self.pool.malloc(self.unit * 3)
+        tail = self.pool.malloc(self.unit * 3)
+        del head, tail
+        with self.stream:
+            p2 = self.pool.malloc(self.unit)
+            del p2
+
+        arenas = self.pool.dump_arenas()
+        self.assertEqual({0, self.stream_ptr}, set(arenas.keys()))
+        arena = arenas[0]
+        self.assertEqual({self.unit * 2: 1, self.unit * 3: 1}, arena['bins'])
+        self.assertEqual(2, arena['n_free_blocks'])
+        self.assertEqual(self.unit * 5, arena['free_bytes'])
+        self.assertEqual(self.unit * 3, arena['largest_free_block'])
+        self.assertEqual(2, arena['n_split_blocks'])
+        self.assertAlmostEqual(0.4, arena['fragmentation'])
+
+        arena = arenas[self.stream_ptr]
+        self.assertEqual({self.unit: 1}, arena['bins'])
+        self.assertEqual(0, arena['n_split_blocks'])
+        self.assertEqual(0.0, arena['fragmentation'])
+
+        stats = self.pool.get_stats()
+        self.assertEqual(self.unit * 6, stats['free_bytes'])
+        self.assertEqual(self.unit * 3, stats['largest_free_block'])
+        self.assertAlmostEqual(0.5, stats['fragmentation'])
+        del mid
+
+
+@testing.gpu
+class TestSingleDeviceMemoryPoolCrossStreamReuse(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.pool.set_cross_stream_reuse(True)
+        self.unit = memory._allocation_unit_size
+        self.stream = stream_module.Stream()
+
+    def test_default(self):
+        pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.assertFalse(pool.get_cross_stream_reuse())
+
+    def test_reuse(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        ptr1 = p1.ptr
+        del p1
+        with self.stream:
+            p2 = self.pool.malloc(self.unit * 4)
+        self.assertEqual(ptr1, p2.ptr)
+        self.assertEqual(1, self.pool.get_stats()['n_cross_stream_reuses'])
+        del p2
+        # The chunk now belongs to the arena of the new stream.
+        arenas = self.pool.dump_arenas()
+        self.assertEqual(1, arenas[self.stream.ptr]['n_free_blocks'])
+        self.assertEqual(0, arenas[0]['n_free_blocks'])
+
+    def test_reuse_split(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        ptr1 = p1.ptr
+        del p1
+        with self.stream:
+            p2 = self.pool.malloc(self.unit)
+            p3 = self.pool.malloc(self.unit * 3)
+        self.assertEqual(ptr1, p2.ptr)
+        self.assertEqual(ptr1 + self.unit, p3.ptr)
+        del p2, p3
+
+    def test_reuse_best_fit(self):
+        with self.stream:
+            p1 = self.pool.malloc(self.unit * 8)
+        p2 = self.pool.malloc(self.unit * 4)
+        ptr2 = p2.ptr
+        del p1, p2
+        with stream_module.Stream():
+            p3 = self.pool.malloc(self.unit * 4)
+        self.assertEqual(ptr2, p3.ptr)
+        del p3
+
+    def test_no_reuse_of_split_chunk(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        ptr1 = p1.ptr
+        del p1
+        head = self.pool.malloc(self.unit)
+        with self.stream:
+            p2 = self.pool.malloc(self.unit * 2)
+        self.assertNotEqual(ptr1 + self.unit, p2.ptr)
+        del head, p2
+
+    def test_reuse_after_stream_destroyed(self):
+        # The event is recorded when the chunk is freed, so the stream may be
+        # destroyed before the chunk is reused.
+        stream = stream_module.Stream()
+        with stream:
+            p1 = self.pool.malloc(self.unit * 4)
+        ptr1 = p1.ptr
+        del p1
+        del stream
+        p2 = self.pool.malloc(self.unit * 4)
+        self.assertEqual(ptr1, p2.ptr)
+        del p2
+
+    def test_reuse_freed_before_enabled(self):
+        self.pool.set_cross_stream_reuse(False)
+        p1 = self.pool.malloc(self.unit * 4)
+        ptr1 = p1.ptr
+        del p1
+        self.pool.set_cross_stream_reuse(True)
+        with self.stream:
+            p2 = self.pool.malloc(self.unit * 4)
+        self.assertEqual(ptr1, p2.ptr)
+        del p2
+
+    def test_disabled(self):
+        self.pool.set_cross_stream_reuse(False)
+        p1 = self.pool.malloc(self.unit * 4)
+        ptr1 = p1.ptr
+        del p1
+        with self.stream:
+            p2 = self.pool.malloc(self.unit * 4)
+        self.assertNotEqual(ptr1, p2.ptr)
+        del p2
+
+
+@testing.gpu
+class TestSingleDeviceMemoryPoolSmallBlock(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.pool.set_small_block_threshold(4096)
+        self.slab_size = memory._slab_size
+        self.stream = stream_module.Stream()
+
+    def test_round_small_size(self):
+        self.assertEqual(32, memory._round_small_size(1))
+        self.assertEqual(32, memory._round_small_size(32))
+        self.assertEqual(64, memory._round_small_size(33))
+        self.assertEqual(4096, memory._round_small_size(4000))
+
+    def test_default(self):
+        pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.assertEqual(0, pool.get_small_block_threshold())
+        mem = pool.malloc(1).mem
+        self.assertIsInstance(mem, memory.PooledMemory)
+
+    def test_invalid_threshold(self):
+        with self.assertRaises(ValueError):
+            self.pool.set_small_block_threshold(self.slab_size)
+
+    def test_packed(self):
+        p1 = self.pool.malloc(8)
+        p2 = self.pool.malloc(8)
+        p3 = self.pool.malloc(100)
+        self.assertEqual(32, p1.mem.size)
+        self.assertEqual(p1.ptr + 32, p2.ptr)
+        self.assertEqual(128, p3.mem.size)
+        self.assertEqual(self.slab_size * 2, self.pool.used_bytes())
+        stats = self.pool.get_stats()
+        self.assertEqual(2, stats['n_slabs'])
+        self.assertEqual(3, stats['n_small_blocks'])
+        del p1, p2, p3
+
+    def test_reuse(self):
+        p1 = self.pool.malloc(8)
+        ptr1 = p1.ptr
+        del p1
+        p2 = self.pool.malloc(16)
+        self.assertEqual(ptr1, p2.ptr)
+        del p2
+
+    def test_large_alloc(self):
+        mem = self.pool.malloc(4097).mem
+        self.assertIsInstance(mem, memory.PooledMemory)
+
+    def test_stream(self):
+        p1 = self.pool.malloc(8)
+        with self.stream:
+            p2 = self.pool.malloc(8)
+        self.assertNotEqual(p1.ptr + 32, p2.ptr)
+        self.assertEqual(2, self.pool.get_stats()['n_slabs'])
+        del p1, p2
+
+    def test_new_slab(self):
+        n = self.slab_size // 4096
+        ps = [self.pool.malloc(4096) for _ in range(n + 1)]
+        self.assertEqual(2, self.pool.get_stats()['n_slabs'])
+        del ps[:]
+        # One empty slab per size class is kept.
+        self.assertEqual(1, self.pool.get_stats()['n_slabs'])
+
+    def test_free_all_blocks(self):
+        p1 = self.pool.malloc(8)
+        del p1
+        self.assertEqual(self.slab_size, self.pool.total_bytes())
+        self.pool.free_all_blocks()
+        self.assertEqual(0, self.pool.get_stats()['n_slabs'])
+        self.assertEqual(0, self.pool.total_bytes())
+
+    def test_double_free(self):
+        mem = self.pool.malloc(8).mem
+        mem.free()
+        mem.free()
+
+    def test_non_power_of_two_threshold(self):
+        self.pool.set_small_block_threshold(100)
+        mem = self.pool.malloc(100).mem
+        self.assertNotIsInstance(mem, memory.PooledMemory)
+        self.assertEqual(128, mem.size)
+        mem = self.pool.malloc(101).mem
+        self.assertIsInstance(mem, memory.PooledMemory)
+        self.assertEqual(memory._allocation_unit_size, mem.size)
+
+    def test_new_slab_on_limit(self):
+        # The slab is allocated after the empty slabs are released to
+        # satisfy the limit.
+        with self.stream:
+            p1 = self.pool.malloc(self.slab_size)
+        del p1
+        self.pool.set_limit(size=self.slab_size)
+        p2 = self.pool.malloc(8)
+        self.assertEqual(1, self.pool.get_stats()['n_slabs'])
+        del p2
+        self.assertEqual(1, self.pool.get_stats()['n_slabs'])
+        self.pool.free_all_blocks()
+        self.assertEqual(0, self.pool.get_stats()['n_slabs'])
+
+
+@testing.gpu
+class TestSingleDeviceMemoryPoolIdleRelease(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.unit = memory._allocation_unit_size
+
+    def tearDown(self):
+        self.pool.set_idle_release()
+
+    def test_timeout(self):
+        self.pool.set_idle_release(timeout=0.05)
+        p1 = self.pool.malloc(self.unit * 4)
+        del p1
+        self.assertEqual(0, self.pool.trim())
+        time.sleep(0.1)
+        self.assertEqual(self.unit * 4, self.pool.trim())
+        self.assertEqual(0, self.pool.total_bytes())
+        stats = self.pool.get_stats()
+        self.assertEqual(1, stats['n_trimmed_blocks'])
+        self.assertEqual(self.unit * 4, stats['trimmed_bytes'])
+
+    def test_timeout_freed_before_enabled(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        del p1
+        time.sleep(0.1)
+        self.pool.set_idle_release(timeout=1)
+        self.assertEqual(0, self.pool.trim())
+        self.assertEqual(self.unit * 4, self.pool.total_bytes())
+
+    def test_timeout_lazy(self):
+        self.pool.set_idle_release(timeout=0.05)
+        p1 = self.pool.malloc(self.unit * 4)
+        del p1
+        time.sleep(0.1)
+        p2 = self.pool.malloc(self.unit)
+        self.assertEqual(self.unit, self.pool.total_bytes())
+        del p2
+
+    def test_timeout_background(self):
+        self.pool.set_idle_release(timeout=0.05, background=True)
+        p1 = self.pool.malloc(self.unit * 4)
+        del p1
+        time.sleep(0.5)
+        self.assertEqual(0, self.pool.total_bytes())
+
+    def test_high_water_mark(self):
+        self.pool.set_idle_release(high_water_mark=self.unit * 4)
+        p1 = self.pool.malloc(self.unit * 2)
+        p2 = self.pool.malloc(self.unit * 2)
+        p3 = self.pool.malloc(self.unit * 2)
+        del p1
+        del p2
+        self.assertEqual(self.unit * 2, self.pool.trim())
+        self.assertEqual(self.unit * 4, self.pool.total_bytes())
+        del p3
+
+    def test_keep_split_blocks(self):
+        self.pool.set_idle_release(timeout=0.05)
+        p = self.pool.malloc(self.unit * 4)
+        del p
+        head = self.pool.malloc(self.unit)
+        time.sleep(0.1)
+        self.assertEqual(0, self.pool.trim())
+        del head
+
+    def test_disabled(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        del p1
+        p2 = self.pool.malloc(self.unit * 8)
+        self.assertEqual(self.unit * 12, self.pool.total_bytes())
+        del p2
+
+
+@testing.gpu
+class TestSingleDeviceMemoryPoolThreadCache(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.pool.set_thread_cache_size(2)
+        self.unit = memory._allocation_unit_size
+        self.stream = stream_module.Stream()
+
+    def test_default(self):
+        pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.assertEqual(0, pool.get_thread_cache_size())
+
+    def test_reuse(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        ptr1 = p1.ptr
+        del p1
+        self.assertEqual(0, self.pool.n_free_blocks())
+        p2 = self.pool.malloc(self.unit * 4)
+        self.assertEqual(ptr1, p2.ptr)
+        self.assertEqual(1, self.pool.get_stats()['n_thread_cache_hits'])
+        del p2
+
+    def test_stream(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        ptr1 = p1.ptr
+        del p1
+        with self.stream:
+            p2 = self.pool.malloc(self.unit * 4)
+        self.assertNotEqual(ptr1, p2.ptr)
+        del p2
+
+    def test_evict(self):
+        p1 = self.pool.malloc(self.unit * 1)
+        p2 = self.pool.malloc(self.unit * 2)
+        p3 = self.pool.malloc(self.unit * 3)
+        ptr2, ptr3 = p2.ptr, p3.ptr
+        del p1
+        del p2
+        del p3
+        # Only the oldest chunk is returned to the pool when the cache holds
+        # more than 2 chunks.
+        self.assertEqual(1, self.pool.n_free_blocks())
+        p2 = self.pool.malloc(self.unit * 2)
+        p3 = self.pool.malloc(self.unit * 3)
+        self.assertEqual(ptr2, p2.ptr)
+        self.assertEqual(ptr3, p3.ptr)
+        self.assertEqual(2, self.pool.get_stats()['n_thread_cache_hits'])
+        del p2, p3
+
+    def test_free_all_blocks(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        del p1
+        self.pool.free_all_blocks()
+        self.assertEqual(0, self.pool.total_bytes())
+
+    def test_other_thread(self):
+        p1 = self.pool.malloc(self.unit * 4)
+        ptr1 = p1.ptr
+        del p1
+        result = []
+
+        def job():
+            p = self.pool.malloc(self.unit * 4)
+            result.append(p.ptr)
+            del p
+
+        t = threading.Thread(target=job)
+        t.start()
+        t.join()
+        self.assertNotEqual(ptr1, result[0])
+        # The cache of the finished thread is returned to the pool.
+        self.assertEqual(1, self.pool.n_free_blocks())
+
+    def _cache_on_worker(self, release):
+        # Caches a chunk on a worker thread that stays alive until release
+        # is set.
+        cached = threading.Event()
+
+        def job():
+            p = self.pool.malloc(self.unit * 4)
+            del p
+            cached.set()
+            release.wait()
+
+        t = threading.Thread(target=job)
+        t.start()
+        cached.wait()
+        return t
+
+    def test_free_all_blocks_other_thread(self):
+        release = threading.Event()
+        t = self._cache_on_worker(release)
+        try:
+            self.pool.free_all_blocks()
+            self.assertEqual(0, self.pool.total_bytes())
+        finally:
+            release.set()
+            t.join()
+
+    def test_set_size_other_thread(self):
+        release = threading.Event()
+        t = self._cache_on_worker(release)
+        try:
+            self.pool.set_thread_cache_size(0)
+            self.assertEqual(1, self.pool.n_free_blocks())
+        finally:
+            release.set()
+            t.join()
+
+    def test_limit_other_thread(self):
+        release = threading.Event()
+        t = self._cache_on_worker(release)
+        try:
+            self.pool.set_limit(size=self.unit * 4)
+            p = self.pool.malloc(self.unit * 2)
+            self.assertEqual(self.unit * 2, self.pool.total_bytes())
+            del p
+        finally:
+            release.set()
+            t.join()
+
+
+@testing.gpu
+class TestSingleDeviceMemoryPoolLimit(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.unit = memory._allocation_unit_size
+
+    def test_default_limit(self):
+        self.assertEqual(0, self.pool.get_limit())
+
+    def test_set_limit_size(self):
+        self.pool.set_limit(size=self.unit * 4)
+        self.assertEqual(self.unit * 4, self.pool.get_limit())
+        self.pool.set_limit(size=0)
+        self.assertEqual(0, self.pool.get_limit())
+
+    def test_set_limit_fraction(self):
+        _, total = cupy.cuda.runtime.memGetInfo()
+        self.pool.set_limit(fraction=0.5)
+        self.assertEqual(int(total * 0.5), self.pool.get_limit())
+
+    def test_set_limit_invalid(self):
+        with self.assertRaises(ValueError):
+            self.pool.set_limit(fraction=1.5)
+        with self.assertRaises(ValueError):
+            self.pool.set_limit(size=-1)
+        with self.assertRaises(ValueError):
+            self.pool.set_limit(size=1, fraction=0.5)
+
+    def test_limit_exceeded(self):
+        self.pool.set_limit(size=self.unit * 4)
+        p1 = self.pool.malloc(self.unit * 3)
+        with self.assertRaises(memory.OutOfMemoryError):
+            self.pool.malloc(self.unit * 2)
+        p2 = self.pool.malloc(self.unit)
+        del p1, p2
+
+    def test_limit_releases_free_blocks(self):
+        self.pool.set_limit(size=self.unit * 4)
+        p1 = self.pool.malloc(self.unit * 4)
+        del p1
+        # The cached block belongs to another arena, so it is released to
+        # keep the pool within the limit.
+        with stream_module.Stream():
+            p2 = self.pool.malloc(self.unit * 4)
+        self.assertEqual(self.unit * 4, self.pool.total_bytes())
+        self.assertEqual(0, self.pool.n_free_blocks())
+        del p2
+
+    def test_limit_keeps_split_blocks(self):
+        self.pool.set_limit(size=self.unit * 4)
+        p = self.pool.malloc(self.unit * 4)
+        del p
+        head = self.pool.malloc(self.unit * 2)
+        with self.assertRaises(memory.OutOfMemoryError):
+            self.pool.malloc(self.unit * 4)
+        del head
+
+    def test_parse_limit_string(self):
+        self.assertEqual({'size': 1024, 'fraction': None},
+                         memory._parse_limit_string('1024'))
+        self.assertEqual({'size': None, 'fraction': 0.5},
+                         memory._parse_limit_string('50%'))
+
+
+@testing.gpu
+class TestReclaimCallback(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = memory.SingleDeviceMemoryPool(allocator=mock_alloc)
+        self.unit = memory._allocation_unit_size
+        self.pool.set_limit(size=self.unit * 4)
+        self.cache = []
+        self.calls = []
+
+    def tearDown(self):
+        for callback in (self.drop_cache, self.noop):
+            try:
+                memory.remove_reclaim_callback(callback)
+            except ValueError:
+                pass
+
+    def drop_cache(self, size):
+        self.calls.append(('drop_cache', size))
+        del self.cache[:]
+
+    def noop(self, size):
+        self.calls.append(('noop', size))
+
+    def test_reclaim(self):
+        memory.add_reclaim_callback(self.drop_cache, name='drop_cache')
+        self.cache.append(self.pool.malloc(self.unit * 4))
+        p = self.pool.malloc(self.unit * 2)
+        self.assertEqual([('drop_cache', self.unit * 2)], self.calls)
+        stats = [s for s in memory.get_reclaim_stats()
+                 if s['name'] == 'drop_cache']
+        self.assertEqual(1, len(stats))
+        self.assertEqual(1, stats[0]['n_calls'])
+        self.assertEqual(self.unit * 4, stats[0]['reclaimed_bytes'])
+        del p
+
+    def test_priority(self):
+        memory.add_reclaim_callback(self.drop_cache, priority=0)
+        memory.add_reclaim_callback(self.noop, priority=10)
+        self.cache.append(self.pool.malloc(self.unit * 4))
+        p = self.pool.malloc(self.unit * 2)
+        self.assertEqual(['noop', 'drop_cache'], [c[0] for c in self.calls])
+        del p
+
+    def test_stop_after_reclaimed(self):
+        memory.add_reclaim_callback(self.drop_cache, priority=10)
+        memory.add_reclaim_callback(self.noop, priority=0)
+        self.cache.append(self.pool.malloc(self.unit * 4))
+        p = self.pool.malloc(self.unit * 2)
+        self.assertEqual(['drop_cache'], [c[0] for c in self.calls])
+        del p
+
+    def test_out_of_memory(self):
+        memory.add_reclaim_callback(self.noop)
+        p = self.pool.malloc(self.unit * 4)
+        with self.assertRaises(memory.OutOfMemoryError):
+            self.pool.malloc(self.unit)
+        self.assertEqual(1, len(self.calls))
+        del p
+
+    def test_remove(self):
+        memory.add_reclaim_callback(self.noop)
+        memory.remove_reclaim_callback(self.noop)
+        with self.assertRaises(ValueError):
+            memory.remove_reclaim_callback(self.noop)
+
+
 @testing.parameterize(*testing.product({
     'allocator': [memory._malloc, memory.malloc_managed],
 }))
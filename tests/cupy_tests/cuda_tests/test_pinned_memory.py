@@ -1,5 +1,7 @@
+import time
 import unittest
 
+from cupy.cuda import memory
 from cupy.cuda import pinned_memory
 from cupy import testing
 
@@ -130,3 +132,111 @@ class TestSingleDeviceMemoryPool(unittest.TestCase):
     def test_n_free_blocks_without_malloc(self):
         # call directly without malloc/free_all_blocks.
         self.assertEqual(self.pool.n_free_blocks(), 0)
+
+    def test_no_power_of_two_rounding(self):
+        self.pool.malloc(1000 * 512 + 1)
+        self.assertEqual(1001 * 512, self.pool.total_bytes())
+
+    def test_alloc_split(self):
+        p = self.pool.malloc(2048)
+        ptr = p.ptr
+        del p
+        head = self.pool.malloc(1024)
+        tail = self.pool.malloc(1024)
+        self.assertEqual(ptr, head.ptr)
+        self.assertEqual(ptr + 1024, tail.ptr)
+        self.assertEqual(2048, self.pool.total_bytes())
+
+    def test_free_merge(self):
+        p = self.pool.malloc(2048)
+        ptr = p.ptr
+        del p
+        head = self.pool.malloc(1024)
+        tail = self.pool.malloc(1024)
+        del head
+        del tail
+        self.assertEqual(1, self.pool.n_free_blocks())
+        p = self.pool.malloc(2048)
+        self.assertEqual(ptr, p.ptr)
+
+    def test_best_fit(self):
+        p1 = self.pool.malloc(4096)
+        p2 = self.pool.malloc(1024)
+        ptr2 = p2.ptr
+        del p1, p2
+        p3 = self.pool.malloc(1000)
+        self.assertEqual(ptr2, p3.ptr)
+
+    def test_free_all_blocks_split(self):
+        # do not free split blocks
+        p = self.pool.malloc(2048)
+        del p
+        head = self.pool.malloc(1024)
+        tail = self.pool.malloc(1024)
+        tailptr = tail.ptr
+        del tail
+        self.pool.free_all_blocks()
+        p = self.pool.malloc(1024)
+        self.assertEqual(tailptr, p.ptr)
+        del head
+
+    def test_bytes(self):
+        p1 = self.pool.malloc(1024)
+        p2 = self.pool.malloc(2048)
+        self.assertEqual(3072, self.pool.used_bytes())
+        self.assertEqual(0, self.pool.free_bytes())
+        del p2
+        self.assertEqual(1024, self.pool.used_bytes())
+        self.assertEqual(2048, self.pool.free_bytes())
+        self.assertEqual(3072, self.pool.total_bytes())
+        del p1
+
+    def test_limit(self):
+        self.assertEqual(0, self.pool.get_limit())
+        self.pool.set_limit(2048)
+        self.assertEqual(2048, self.pool.get_limit())
+        p1 = self.pool.malloc(1024)
+        with self.assertRaises(memory.OutOfMemoryError):
+            self.pool.malloc(2048)
+        del p1
+
+    def test_limit_releases_free_blocks(self):
+        self.pool.set_limit(2048)
+        p1 = self.pool.malloc(1024)
+        del p1
+        p2 = self.pool.malloc(2048)
+        self.assertEqual(2048, self.pool.total_bytes())
+        self.assertEqual(0, self.pool.n_free_blocks())
+        del p2
+
+    def test_idle_release_timeout(self):
+        self.pool.set_idle_release(timeout=0.05)
+        p1 = self.pool.malloc(1024)
+        del p1
+        self.assertEqual(0, self.pool.trim())
+        time.sleep(0.1)
+        self.assertEqual(1024, self.pool.trim())
+        self.assertEqual(0, self.pool.total_bytes())
+        stats = self.pool.get_stats()
+        self.assertEqual(1, stats['n_trimmed_blocks'])
+        self.assertEqual(1024, stats['trimmed_bytes'])
+        self.pool.set_idle_release()
+
+    def test_idle_release_freed_before_enabled(self):
+        p1 = self.pool.malloc(1024)
+        del p1
+        self.pool.set_idle_release(timeout=1)
+        self.assertEqual(0, self.pool.trim())
+        self.assertEqual(1024, self.pool.total_bytes())
+        self.pool.set_idle_release()
+
+    def test_idle_release_high_water_mark(self):
+        self.pool.set_idle_release(high_water_mark=2048)
+        p1 = self.pool.malloc(1024)
+        p2 = self.pool.malloc(1024)
+        p3 = self.pool.malloc(1024)
+        del p1, p2
+        self.assertEqual(1024, self.pool.trim())
+        self.assertEqual(2048, self.pool.total_bytes())
+        del p3
+        self.pool.set_idle_release()
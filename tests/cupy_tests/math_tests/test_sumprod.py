@@ -255,6 +255,34 @@ class TestCumsum(unittest.TestCase):
         return xp.cumsum(a_numpy)
 
 
+@testing.parameterize(*testing.product({
+    'shape_axis': [((3, 1000), 1), ((1000, 3), 0), ((5, 6, 7), 1),
+                   ((20000, 4), 1), ((4, 3000), 1), ((100000,), 0),
+                   ((3000000,), 0)],
+}))
+@testing.gpu
+class TestCumsumLarge(unittest.TestCase):
+
+    @testing.for_dtypes('ilfd')
+    @testing.numpy_cupy_allclose(rtol=1e-4)
+    def test_cumsum(self, xp, dtype):
+        shape, axis = self.shape_axis
+        a = testing.shaped_random(shape, xp, dtype)
+        return xp.cumsum(a, axis=axis)
+
+    @testing.numpy_cupy_allclose()
+    def test_cumsum_transposed(self, xp):
+        shape, axis = self.shape_axis
+        a = testing.shaped_random(shape[::-1], xp, 'l').T
+        return xp.cumsum(a, axis=axis)
+
+    @testing.numpy_cupy_allclose()
+    def test_cumsum_strided(self, xp):
+        shape, axis = self.shape_axis
+        a = testing.shaped_random(shape, xp, 'l')[..., ::2]
+        return xp.cumsum(a, axis=axis)
+
+
 @testing.gpu
 class TestCumprod(unittest.TestCase):
 
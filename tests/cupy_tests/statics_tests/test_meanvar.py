@@ -179,3 +179,37 @@ class TestMeanVar(unittest.TestCase):
     def test_external_std_axis_ddof(self, xp, dtype):
         a = testing.shaped_arange((2, 3, 4), xp, dtype)
         return xp.std(a, axis=1, ddof=1)
+
+    @testing.for_all_dtypes(no_complex=True)
+    @testing.numpy_cupy_allclose()
+    def test_var_axis_keepdims(self, xp, dtype):
+        a = testing.shaped_arange((2, 3, 4), xp, dtype)
+        return a.var(axis=(0, 2), keepdims=True)
+
+    @testing.for_all_dtypes(no_complex=True)
+    @testing.numpy_cupy_allclose()
+    def test_var_out(self, xp, dtype):
+        a = testing.shaped_arange((2, 3, 4), xp, dtype)
+        out = xp.empty((2, 4), 'd')
+        a.var(axis=1, out=out)
+        return out
+
+    @testing.for_float_dtypes(no_float16=True)
+    @testing.numpy_cupy_allclose(rtol=1e-4)
+    def test_var_large(self, xp, dtype):
+        a = testing.shaped_random((1000000,), xp, dtype)
+        return a.var()
+
+    @testing.numpy_cupy_allclose(rtol=1e-4)
+    def test_var_offset(self, xp):
+        # The variance is small compared to the mean.
+        a = testing.shaped_random((3, 10000), xp, 'd') + 1e6
+        return a.var(axis=1, ddof=1)
+
+    @testing.numpy_cupy_allclose(rtol=1e-3)
+    def test_std_float16(self, xp):
+        a = testing.shaped_random((3, 10000), xp, 'e')
+        if xp is numpy:
+            # float16 is accumulated in float32.
+            return a.astype('f').std(axis=1).astype('e')
+        return a.std(axis=1)
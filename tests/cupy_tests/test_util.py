@@ -0,0 +1,76 @@
+import unittest
+
+import mock
+
+import cupy
+from cupy import util
+
+
+class TestMemoize(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def f(self, x, y=0):
+        self.calls.append((x, y))
+        return x + y
+
+    def test_memoize(self):
+        f = util.memoize()(self.f)
+        self.assertEqual(3, f(1, y=2))
+        self.assertEqual(3, f(1, y=2))
+        self.assertEqual(1, f(1))
+        self.assertEqual([(1, 2), (1, 0)], self.calls)
+        info = f.cache_info()
+        self.assertEqual(2, info['entries'])
+        self.assertEqual(1, info['hits'])
+        self.assertEqual(2, info['misses'])
+        self.assertIsNone(info['maxsize'])
+
+    def test_maxsize(self):
+        f = util.memoize(maxsize=2)(self.f)
+        f(1)
+        f(2)
+        f(1)
+        f(3)  # evicts 2
+        f(1)
+        f(2)
+        self.assertEqual([(1, 0), (2, 0), (3, 0), (2, 0)], self.calls)
+        info = f.cache_info()
+        self.assertEqual(2, info['entries'])
+        self.assertEqual(2, info['hits'])
+        self.assertEqual(4, info['misses'])
+        self.assertEqual(2, info['maxsize'])
+
+    def test_maxsize_zero(self):
+        f = util.memoize(maxsize=0)(self.f)
+        f(1)
+        f(1)
+        self.assertEqual(2, len(self.calls))
+        self.assertEqual(0, f.cache_info()['entries'])
+
+    def test_maxsize_env(self):
+        with mock.patch.dict('os.environ', {'CUPY_MEMOIZE_MAXSIZE': '1'}):
+            f = util.memoize()(self.f)
+        self.assertEqual(1, f.cache_info()['maxsize'])
+
+    def test_cache_clear(self):
+        f = util.memoize(maxsize=2)(self.f)
+        f(1)
+        f.cache_clear()
+        f(1)
+        self.assertEqual(2, len(self.calls))
+
+    def test_clear_memo(self):
+        f = util.memoize()(self.f)
+        f(1)
+        cupy.clear_memo()
+        f(1)
+        self.assertEqual(2, len(self.calls))
+
+    def test_get_memo_stats(self):
+        f = util.memoize()(self.f)
+        f(1)
+        self.assertIn(f.cache_info(), cupy.get_memo_stats())
+        self.assertEqual(
+            self.f.__module__ + '.f', f.cache_info()['name'])
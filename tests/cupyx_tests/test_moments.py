@@ -0,0 +1,74 @@
+import unittest
+
+import numpy
+
+import cupy
+from cupy import testing
+import cupyx
+
+
+@testing.parameterize(*testing.product({
+    'shape_axis': [((2, 3, 4), None), ((2, 3, 4), 1), ((2, 3, 4), (0, 2)),
+                   ((1000000,), None), ((3, 100000), 1)],
+    'ddof': [0, 1],
+    'keepdims': [True, False],
+}))
+@testing.gpu
+class TestMoments(unittest.TestCase):
+
+    def setUp(self):
+        self.shape, self.axis = self.shape_axis
+
+    @testing.for_all_dtypes(no_complex=True, no_float16=True)
+    def test_moments(self, dtype):
+        a = testing.shaped_random(self.shape, cupy, dtype)
+        mean, var = cupyx.moments(
+            a, axis=self.axis, ddof=self.ddof, keepdims=self.keepdims)
+        a_cpu = a.get()
+        testing.assert_allclose(
+            mean, a_cpu.mean(axis=self.axis, keepdims=self.keepdims),
+            rtol=1e-4)
+        testing.assert_allclose(
+            var, a_cpu.var(axis=self.axis, ddof=self.ddof,
+                           keepdims=self.keepdims), rtol=1e-4)
+
+    def test_float16(self):
+        a = testing.shaped_random(self.shape, cupy, 'e')
+        mean, var = cupyx.moments(
+            a, axis=self.axis, ddof=self.ddof, keepdims=self.keepdims)
+        self.assertEqual(mean.dtype, numpy.float16)
+        self.assertEqual(var.dtype, numpy.float16)
+        a_cpu = a.get().astype('f')
+        testing.assert_allclose(
+            mean, a_cpu.mean(axis=self.axis, keepdims=self.keepdims),
+            rtol=1e-3)
+        testing.assert_allclose(
+            var, a_cpu.var(axis=self.axis, ddof=self.ddof,
+                           keepdims=self.keepdims), rtol=1e-3)
+
+
+@testing.gpu
+class TestMomentsOrder(unittest.TestCase):
+
+    @testing.numpy_cupy_allclose()
+    def test_order1(self, xp):
+        a = testing.shaped_arange((2, 3), xp, 'f')
+        if xp is numpy:
+            return a.mean(axis=1),
+        return cupyx.moments(a, axis=1, order=1)
+
+    def test_dtype(self):
+        a = testing.shaped_arange((2, 3), cupy, 'i')
+        mean, var = cupyx.moments(a)
+        self.assertEqual(mean.dtype, numpy.float64)
+        self.assertEqual(var.dtype, numpy.float64)
+        mean, var = cupyx.moments(a, dtype='f')
+        self.assertEqual(mean.dtype, numpy.float32)
+        self.assertEqual(var.dtype, numpy.float32)
+
+    def test_invalid_order(self):
+        a = testing.shaped_arange((2, 3), cupy, 'f')
+        with self.assertRaises(ValueError):
+            cupyx.moments(a, order=0)
+        with self.assertRaises(NotImplementedError):
+            cupyx.moments(a, order=3)
@@ -0,0 +1,98 @@
+import unittest
+
+import numpy
+
+import cupy
+from cupy import testing
+import cupyx
+
+
+@testing.parameterize(*testing.product({
+    'shape_axis': [((10,), None), ((2, 3, 4), None), ((2, 3, 4), 1),
+                   ((2, 3, 4), -1), ((1000000,), None), ((3, 100000), 1),
+                   ((100000, 3), 0)],
+    'keepdims': [True, False],
+}))
+@testing.gpu
+class TestFusedReductions(unittest.TestCase):
+
+    def setUp(self):
+        self.shape, self.axis = self.shape_axis
+
+    @testing.for_all_dtypes(no_complex=True)
+    def test_max_argmax(self, dtype):
+        a = testing.shaped_random(self.shape, cupy, dtype)
+        m, i = cupyx.max_argmax(a, axis=self.axis, keepdims=self.keepdims)
+        a_cpu = a.get()
+        testing.assert_array_equal(
+            m, a_cpu.max(axis=self.axis, keepdims=self.keepdims))
+        i_cpu = a_cpu.argmax(axis=self.axis)
+        if self.keepdims:
+            i_cpu = i_cpu.reshape(m.shape)
+        testing.assert_array_equal(i, i_cpu)
+
+    @testing.for_all_dtypes(no_complex=True)
+    def test_min_argmin(self, dtype):
+        a = testing.shaped_random(self.shape, cupy, dtype)
+        m, i = cupyx.min_argmin(a, axis=self.axis, keepdims=self.keepdims)
+        a_cpu = a.get()
+        testing.assert_array_equal(
+            m, a_cpu.min(axis=self.axis, keepdims=self.keepdims))
+        i_cpu = a_cpu.argmin(axis=self.axis)
+        if self.keepdims:
+            i_cpu = i_cpu.reshape(m.shape)
+        testing.assert_array_equal(i, i_cpu)
+
+    @testing.for_all_dtypes()
+    def test_min_max(self, dtype):
+        a = testing.shaped_random(self.shape, cupy, dtype)
+        mn, mx = cupyx.min_max(a, axis=self.axis, keepdims=self.keepdims)
+        a_cpu = a.get()
+        testing.assert_array_equal(
+            mn, a_cpu.min(axis=self.axis, keepdims=self.keepdims))
+        testing.assert_array_equal(
+            mx, a_cpu.max(axis=self.axis, keepdims=self.keepdims))
+
+    @testing.for_all_dtypes(no_bool=True, no_float16=True)
+    def test_sum_sumsq(self, dtype):
+        a = testing.shaped_random(self.shape, cupy, dtype)
+        s, s2 = cupyx.sum_sumsq(a, axis=self.axis, keepdims=self.keepdims)
+        self.assertEqual(s.dtype, a.sum().dtype)
+        a_cpu = a.get().astype(s.dtype)
+        testing.assert_allclose(
+            s, a_cpu.sum(axis=self.axis, keepdims=self.keepdims), rtol=1e-4)
+        testing.assert_allclose(
+            s2, (a_cpu * a_cpu).sum(axis=self.axis, keepdims=self.keepdims),
+            rtol=1e-4)
+
+
+@testing.gpu
+class TestFusedReductionsMisc(unittest.TestCase):
+
+    def test_max_argmax_nan(self):
+        a = cupy.array([1, numpy.nan, 3, numpy.nan], 'd')
+        m, i = cupyx.max_argmax(a)
+        self.assertTrue(numpy.isnan(float(m)))
+        self.assertEqual(int(i), 1)
+
+    def test_min_max_nan(self):
+        a = cupy.array([1, numpy.nan, 3], 'd')
+        mn, mx = cupyx.min_max(a)
+        self.assertTrue(numpy.isnan(float(mn)))
+        self.assertTrue(numpy.isnan(float(mx)))
+
+    def test_min_max_empty(self):
+        with self.assertRaises(ValueError):
+            cupyx.min_max(cupy.ones((0,)))
+
+    def test_sum_sumsq_empty(self):
+        s, s2 = cupyx.sum_sumsq(cupy.ones((0, 3)), axis=0)
+        testing.assert_array_equal(s, numpy.zeros(3))
+        testing.assert_array_equal(s2, numpy.zeros(3))
+
+    def test_sum_sumsq_float16(self):
+        a = cupy.full(1000, 2, 'e')
+        s, s2 = cupyx.sum_sumsq(a)
+        self.assertEqual(s.dtype, numpy.float16)
+        self.assertEqual(float(s), 2000)
+        self.assertEqual(float(s2), 4000)
@@ -0,0 +1,107 @@
+import unittest
+
+import mock
+import numpy
+
+import cupy
+from cupy import testing
+import cupyx
+
+
+def _scan_cpu(a, axis, op, exclusive):
+    if axis is None:
+        a = a.ravel()
+        axis = 0
+    ufunc = {'sum': numpy.add, 'prod': numpy.multiply,
+             'max': numpy.maximum, 'min': numpy.minimum}[op]
+    ret = ufunc.accumulate(a, axis=axis, dtype=a.dtype)
+    if exclusive:
+        identity = {'sum': 0, 'prod': 1}.get(op)
+        if identity is None:
+            if a.dtype.kind == 'f':
+                identity = -numpy.inf if op == 'max' else numpy.inf
+            elif a.dtype.kind == 'b':
+                identity = op == 'min'
+            else:
+                info = numpy.iinfo(a.dtype)
+                identity = info.min if op == 'max' else info.max
+        ret = numpy.roll(ret, 1, axis=axis)
+        index = [slice(None)] * ret.ndim
+        index[axis] = 0
+        ret[tuple(index)] = identity
+    return ret
+
+
+@testing.parameterize(*testing.product({
+    'shape_axis': [((10,), None), ((2, 3, 4), 0), ((2, 3, 4), -1),
+                   ((3, 500), 1), ((500, 3), 0), ((50000,), 0)],
+    'op': ['sum', 'prod', 'max', 'min'],
+    'exclusive': [False, True],
+}))
+@testing.gpu
+class TestScan(unittest.TestCase):
+
+    @testing.for_dtypes('?ild')
+    def test_scan(self, dtype):
+        shape, axis = self.shape_axis
+        if self.op == 'prod':
+            a_cpu = numpy.ones(shape, dtype)
+            a_cpu.flat[::7] = 2
+            a_cpu.flat[::11] = 0
+        else:
+            a_cpu = testing.shaped_random(shape, numpy, dtype)
+        a = cupy.array(a_cpu)
+        ret = cupyx.scan(a, axis=axis, op=self.op, exclusive=self.exclusive)
+        testing.assert_allclose(
+            ret, _scan_cpu(a_cpu, axis, self.op, self.exclusive), rtol=1e-6)
+
+
+@testing.gpu
+class TestScanMisc(unittest.TestCase):
+
+    def test_inplace(self):
+        a = testing.shaped_random((4, 300), cupy, 'l')
+        expected = numpy.cumsum(a.get(), axis=1)
+        cupyx.scan(a, axis=1, out=a)
+        testing.assert_array_equal(a, expected)
+
+    def test_nan(self):
+        a = cupy.array([1, numpy.nan, 3], 'd')
+        testing.assert_array_equal(
+            cupyx.scan(a, op='max'), [1, numpy.nan, numpy.nan])
+
+    def test_dtype(self):
+        a = cupy.ones(300, 'b')
+        ret = cupyx.scan(a, dtype='l')
+        self.assertEqual(ret.dtype, numpy.int64)
+        testing.assert_array_equal(ret, numpy.arange(1, 301))
+
+    def _get_kinds(self, a, axis):
+        get_scan_kernel = cupy.core._routines_math._get_scan_kernel
+        with mock.patch('cupy.core._routines_math._get_scan_kernel',
+                        side_effect=get_scan_kernel) as m:
+            ret = cupyx.scan(a, axis=axis)
+        testing.assert_array_equal(ret, numpy.cumsum(a.get(), axis=axis))
+        return [call[0][-1] for call in m.call_args_list]
+
+    def test_many_segments(self):
+        # The serial kernel is used for many long segments only if its
+        # threads read adjacent elements.
+        a = testing.shaped_random((20000, 40), cupy, 'l')
+        self.assertEqual(['batch'], self._get_kinds(a, 1))
+        a = testing.shaped_random((40, 20000), cupy, 'l')
+        self.assertEqual(['serial'], self._get_kinds(a, 0))
+        a = testing.shaped_random((20000, 10), cupy, 'l')
+        self.assertEqual(['serial'], self._get_kinds(a, 1))
+
+    def test_invalid_op(self):
+        with self.assertRaises(ValueError):
+            cupyx.scan(cupy.ones(3), op='mean')
+
+    def test_complex_max(self):
+        with self.assertRaises(TypeError):
+            cupyx.scan(cupy.ones(3, 'D'), op='max')
+
+    def test_invalid_axis(self):
+        with self.assertRaises(cupy.core._AxisError):
+            cupyx.scan(cupy.ones((2, 3)), axis=2)
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+import six
+
+from cupy.cuda import compiler
+from cupyx.tools import kernel_cache
+
+
+class TestKernelCacheTool(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.cache_dir, '%d_2.cubin' % i)
+            cubin = b'x' * 68
+            with open(path, 'wb') as f:
+                f.write(six.b(hashlib.md5(cubin).hexdigest()))
+                f.write(cubin)
+            os.utime(path, (1000 + i, 1000 + i))
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def run_main(self, *args):
+        out = six.StringIO()
+        with mock.patch('sys.stdout', out):
+            ret = kernel_cache.main(['--cache-dir', self.cache_dir] +
+                                    list(args))
+        return ret, out.getvalue()
+
+    def test_list(self):
+        ret, out = self.run_main('list')
+        self.assertEqual(0, ret)
+        lines = out.splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[0].endswith('100 0_2.cubin'))
+
+    def test_verify(self):
+        with open(self.paths[1], 'wb') as f:
+            f.write(b'corrupted')
+        ret, out = self.run_main('verify')
+        self.assertEqual(1, ret)
+        self.assertEqual('corrupted 1_2.cubin\n', out)
+        ret, out = self.run_main('verify', '--remove')
+        self.assertEqual(0, ret)
+        self.assertEqual('removed 1_2.cubin\n', out)
+        self.assertFalse(os.path.exists(self.paths[1]))
+
+    def test_prune(self):
+        ret, out = self.run_main('prune', '--max-entries', '1')
+        self.assertEqual(0, ret)
+        self.assertEqual('removed 0_2.cubin\nremoved 1_2.cubin\n', out)
+        self.assertEqual(
+            self.paths[2:], [e[0] for e in compiler.list_cache(
+                self.cache_dir)])
+
+    def test_stats(self):
+        compiler._record_cache_lookup(self.cache_dir, True)
+        compiler._record_cache_lookup(self.cache_dir, False)
+        compiler._save_cache_stats()
+        ret, out = self.run_main('stats')
+        self.assertEqual(0, ret)
+        six.assertRegex(self, out, r'entries: +3\n')
+        six.assertRegex(self, out, r'size: +300\n')
+        six.assertRegex(self, out, r'hits: +1\n')
+        six.assertRegex(self, out, r'misses: +1\n')
+        six.assertRegex(self, out, r'hit rate: +0\.500\n')
+
+        self.run_main('stats', '--reset')
+        self.assertEqual({'hits': 0, 'misses': 0},
+                         compiler.get_cache_stats(self.cache_dir))